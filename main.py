@@ -1,18 +1,38 @@
 import argparse
+import sys
 from src.core.shell import Shell
-from src.gui.main_window import MainWindow
 
 def main():
     parser = argparse.ArgumentParser(description='Python Shell')
     parser.add_argument('--gui', action='store_true', help='Start in GUI mode')
+    parser.add_argument('-c', dest='command', help='Execute a command string and exit')
+    parser.add_argument('script', nargs='?', help='Script file to execute ("-" for stdin)')
+    parser.add_argument('arguments', nargs=argparse.REMAINDER,
+                        help='Positional parameters $1, $2, ... (with -c, $0 first)')
+    parser.add_argument('--stats-log', help='Append per-command timings to this file as JSON lines')
     args = parser.parse_args()
+    if args.stats_log:
+        Shell.STATS_LOG = args.stats_log
     
     if args.gui:
+        # Imported only here: tkinter, ttkthemes and Pillow are slow to load
+        from src.gui.main_window import MainWindow
+
         window = MainWindow()
         window.run()
+    elif args.command is not None:
+        # Nothing is read from a script with -c: its words are the parameters
+        arguments = ([args.script] if args.script is not None else []) + args.arguments
+        sys.exit(Shell(interactive=False).run_string(args.command, arguments))
+    elif args.script == '-' or (args.script is None and not sys.stdin.isatty()):
+        shell = Shell(interactive=False)
+        shell.parameters += args.arguments
+        sys.exit(shell.run_lines(sys.stdin))
+    elif args.script:
+        sys.exit(Shell(interactive=False).run_script(args.script, args.arguments))
     else:
         shell = Shell()
         shell.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,12 +1,60 @@
 import os
-import shutil
-import platform
-import sys
-from typing import List, Tuple
+import re
+import shlex
+import stat
+import time
+from typing import Dict, Iterator, Tuple
+from src.utils.history import HistoryManager
+
+# Entries formatted per chunk written by the streaming ls
+LS_BATCH = 1024
+
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+# Modification times older than this show the year instead of the time
+_SIX_MONTHS = 182 * 24 * 3600
+
+def _owner_names(st, cache: Dict) -> Tuple[str, str]:
+    """User and group names for a stat result, looked up once per id"""
+    key = (st.st_uid, st.st_gid)
+    names = cache.get(key)
+    if names is None:
+        user, group = str(st.st_uid), str(st.st_gid)
+        try:
+            import grp
+            import pwd
+
+            user = pwd.getpwuid(st.st_uid).pw_name
+            group = grp.getgrgid(st.st_gid).gr_name
+        except (ImportError, KeyError):
+            pass
+        names = cache[key] = (user, group)
+    return names
+
+def _long_format(entry, owners: Dict) -> str:
+    """One `ls -l` line, from the stat cached on the DirEntry"""
+    try:
+        st = entry.stat(follow_symlinks=False)
+    except OSError:
+        return f"?????????? ? ? ? ? ? {entry.name}"
+    user, group = _owner_names(st, owners)
+    if abs(time.time() - st.st_mtime) > _SIX_MONTHS:
+        when = time.strftime('%b %d  %Y', time.localtime(st.st_mtime))
+    else:
+        when = time.strftime('%b %d %H:%M', time.localtime(st.st_mtime))
+    name = entry.name
+    if entry.is_symlink():
+        try:
+            name += ' -> ' + os.readlink(entry.path)
+        except OSError:
+            pass
+    return f"{stat.filemode(st.st_mode)} {st.st_nlink:>2} {user} {group} {st.st_size:>8} {when} {name}"
 
 class BuiltInCommands:
-    # Store command history as a class variable
-    command_history: List[str] = []
+    # One history shared by the shell and the history builtin; in memory
+    # until an interactive shell attaches the history file
+    history_manager = HistoryManager(history_file=None)
+    command_history = history_manager.entries
     
     def __init__(self):
         pass
@@ -14,10 +62,7 @@ class BuiltInCommands:
     @staticmethod
     def add_to_history(command: str) -> None:
         """Add command to history"""
-        BuiltInCommands.command_history.append(command)
-        # Keep only last 1000 commands
-        if len(BuiltInCommands.command_history) > 1000:
-            BuiltInCommands.command_history.pop(0)
+        BuiltInCommands.history_manager.add_command(command)
 
     @staticmethod
     def cd(args):
@@ -44,19 +89,60 @@ class BuiltInCommands:
     @staticmethod
     def ls(args):
         """List directory contents"""
+        return BuiltInCommands.collect(BuiltInCommands.iter_ls(args))
+
+    @staticmethod
+    def iter_ls(args) -> Iterator[str]:
+        """Stream a directory listing in batches of lines; -l adds metadata"""
+        flags = ''.join(arg[1:] for arg in args if arg.startswith('-') and len(arg) > 1)
+        paths = [arg for arg in args if not arg.startswith('-') or arg == '-']
+        path = paths[0] if paths else '.'
         try:
-            path = args[0] if args else '.'
-            files = os.listdir(path)
-            return True, '\n'.join(sorted(files))
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
         except FileNotFoundError:
             return False, f"ls: cannot access '{path}': No such directory"
         except PermissionError:
             return False, f"ls: cannot open directory '{path}': Permission denied"
+        except NotADirectoryError:
+            yield path + '\n'
+            return True, ""
+
+        owners = {}
+        for start in range(0, len(entries), LS_BATCH):
+            batch = entries[start:start + LS_BATCH]
+            if 'l' in flags:
+                lines = [_long_format(entry, owners) for entry in batch]
+            else:
+                lines = [entry.name for entry in batch]
+            yield '\n'.join(lines) + '\n'
+        return True, ""
+
+    @staticmethod
+    def collect(stream: Iterator[str]) -> Tuple[bool, str]:
+        """Run a streaming builtin to completion as (success, output)"""
+        chunks = []
+        success, error = BuiltInCommands.write_stream(stream, chunks.append)
+        return success, ''.join(chunks).rstrip('\n') if success else error
+
+    @staticmethod
+    def write_stream(stream: Iterator[str], write) -> Tuple[bool, str]:
+        """Pass each chunk of a streaming builtin to write; (success, error)"""
+        try:
+            while True:
+                write(next(stream))
+        except StopIteration as stop:
+            return stop.value or (True, "")
+        finally:
+            # Lets the builtin clean up at once if write gave up
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
 
     @staticmethod
     def clear(_):
         """Clear the screen"""
-        if platform.system() == 'Windows':
+        if os.name == 'nt':
             os.system('cls')
         else:
             os.system('clear')
@@ -67,16 +153,26 @@ class BuiltInCommands:
         """Echo the arguments"""
         return True, ' '.join(args)
 
+    @staticmethod
+    def iter_echo(args) -> Iterator[str]:
+        """Stream the arguments as one line"""
+        yield ' '.join(args) + '\n'
+
     @staticmethod
     def history(args) -> Tuple[bool, str]:
-        """Show command history"""
+        """Show or search command history"""
         if not args:
             # Show all history with numbers
             history_text = "\n".join(
                 f"{idx:4d}  {cmd}" 
-                for idx, cmd in enumerate(BuiltInCommands.command_history, 1)
+                for idx, cmd in enumerate(BuiltInCommands.history_manager.get_history(), 1)
             )
             return True, history_text
+        if args[0] == '-s':
+            if len(args) < 2:
+                return False, "Usage: history -s PATTERN"
+            # Ranked matches from the full history, best first
+            return True, "\n".join(BuiltInCommands.history_manager.search(' '.join(args[1:])))
         return False, "history: too many arguments"
 
     @staticmethod
@@ -87,12 +183,33 @@ Available Commands:
 ------------------
 cd [dir]     - Change directory
 pwd          - Print working directory
-ls [dir]     - List directory contents
+ls [-l] [dir]     - List directory contents
 clear        - Clear screen
 echo [text]  - Display text
 exit         - Exit the shell
 help         - Show this help message
 history      - Show command history
+history -s PATTERN - Search history, best matches first
+hash [-r]    - Show remembered command locations (-r to forget them)
+jobs         - List background jobs
+fg [%n]      - Bring a background job to the foreground
+bg [%n]      - Continue a stopped job in the background
+wait [%n]    - Wait for background jobs to finish
+kill [-SIG] %n|pid - Send a signal to a job or process
+parallel [-j N] [-k] [--tag] [--joblog FILE] cmd {} ::: args...
+             - Run cmd once per argument, at most N at a time
+cp [-j N] [--resume] [--progress] src... dest
+             - Copy files and trees over N threads
+mv [-j N] [--progress] src... dest - Move files and directories
+rm [-r] [-j N] path... - Remove files, or trees with -r
+time pipeline - Run a pipeline and report where its time went
+NAME=value   - Set a shell variable
+export [NAME[=value]...] - Pass variables on to commands, or list them
+Redirections: < > >> 2> 2>&1 >&2 &> &>> n>&- <<< word, <<EOF ... EOF
+chunked cmd args... - Run cmd over batches of its arguments that fit the
+             argv limit; words before the first pattern repeat in each
+stats [-n N] [-r] [--log FILE]
+             - Timing percentiles of recent commands; -n lists the N slowest
 """
         return True, help_text.strip()
 
@@ -114,77 +231,341 @@ history      - Show command history
 
     @staticmethod
     def cp(args) -> Tuple[bool, str]:
-        """Copy files and directories"""
-        if len(args) != 2:
+        """Copy files and directory trees in parallel"""
+        from src.commands.file_operations import parse_transfer_args
+
+        engine, operands, _, error = parse_transfer_args('cp', args)
+        if engine is None:
+            return False, error
+        if len(operands) < 2:
             return False, "cp: requires source and destination arguments"
-        try:
-            source, dest = args
-            if os.path.isdir(source):
-                shutil.copytree(source, dest)
-            else:
-                shutil.copy2(source, dest)
-            return True, ""
-        except FileNotFoundError:
-            return False, f"cp: cannot stat '{source}': No such file or directory"
-        except PermissionError:
-            return False, f"cp: cannot create regular file '{dest}': Permission denied"
+        *sources, dest = operands
+        if os.path.isdir(dest):
+            # Sources go inside an existing directory, as in POSIX cp; an
+            # interrupted `cp src dest` is resumed with `cp --resume src/. dest`
+            for source in sources:
+                engine.copy(source, os.path.join(dest, os.path.basename(source.rstrip(os.sep))))
+        elif len(sources) == 1:
+            engine.copy(sources[0], dest)
+        else:
+            return False, f"cp: target '{dest}' is not a directory"
+        return not engine.errors, '\n'.join(engine.errors)
 
     @staticmethod
     def mv(args) -> Tuple[bool, str]:
         """Move/rename files and directories"""
-        if len(args) != 2:
+        from src.commands.file_operations import parse_transfer_args
+
+        engine, operands, _, error = parse_transfer_args('mv', args)
+        if engine is None:
+            return False, error
+        if len(operands) < 2:
             return False, "mv: requires source and destination arguments"
-        try:
-            source, dest = args
-            shutil.move(source, dest)
-            return True, ""
-        except FileNotFoundError:
-            return False, f"mv: cannot stat '{source}': No such file or directory"
-        except PermissionError:
-            return False, f"mv: cannot move '{source}': Permission denied"
+        *sources, dest = operands
+        if len(sources) > 1 and not os.path.isdir(dest):
+            return False, f"mv: target '{dest}' is not a directory"
+        for source in sources:
+            engine.move(source, dest)
+        return not engine.errors, '\n'.join(engine.errors)
 
     @staticmethod
     def rm(args) -> Tuple[bool, str]:
         """Remove files and directories"""
-        if not args:
+        from src.commands.file_operations import parse_transfer_args
+
+        engine, paths, recursive, error = parse_transfer_args('rm', args)
+        if engine is None:
+            return False, error
+        if not paths:
             return False, "rm: missing operand"
-        
-        recursive = "-r" in args or "-R" in args
-        args = [arg for arg in args if arg not in ("-r", "-R")]
-        
-        for path in args:
-            try:
-                if os.path.isdir(path):
-                    if recursive:
-                        shutil.rmtree(path)
-                    else:
-                        return False, f"rm: cannot remove '{path}': Is a directory"
-                else:
-                    os.remove(path)
-            except FileNotFoundError:
-                return False, f"rm: cannot remove '{path}': No such file or directory"
-            except PermissionError:
-                return False, f"rm: cannot remove '{path}': Permission denied"
-        
-        return True, ""
+        for path in paths:
+            engine.remove(path, recursive)
+        return not engine.errors, '\n'.join(engine.errors)
 
     @staticmethod
-    def aliases(args):
-        """Manage shell aliases"""
-        from src.core.shell import Shell  # Import here to avoid circular import
-        
+    def aliases(args, alias_manager) -> Tuple[bool, str]:
+        """Manage the aliases of one shell"""
         if not args:
             # List all aliases
-            if not Shell.alias_manager.aliases:
+            if not alias_manager.aliases:
                 return True, "No aliases defined"
             return True, "\n".join(f"{name}='{cmd}'" 
-                                 for name, cmd in Shell.alias_manager.aliases.items())
+                                 for name, cmd in alias_manager.aliases.items())
         
         if len(args) >= 2 and args[0] == '-s':
             # Set new alias: aliases -s name command
+            from src.core.command_parser import ParseError
+
             name = args[1]
             command = ' '.join(args[2:])
-            Shell.alias_manager.add_alias(name, command)
+            try:
+                alias_manager.add_alias(name, command)
+            except ParseError as e:
+                return False, f"aliases: {name}: {e}"
+            alias_manager.save()
             return True, f"Added alias: {name}='{command}'"
-            
-        return False, "Usage: aliases [-s name command]"
\ No newline at end of file
+
+        if len(args) == 2 and args[0] == '-u':
+            if not alias_manager.remove_alias(args[1]):
+                return False, f"aliases: {args[1]}: not found"
+            alias_manager.save()
+            return True, ""
+
+        return False, "Usage: aliases [-s name command | -u name]"
+
+    @staticmethod
+    def hash(args) -> Tuple[bool, str]:
+        """Show, add to or reset the remembered command locations"""
+        from src.core.shell import Shell  # Import here to avoid circular import
+
+        finder = Shell.executable_finder
+        if args == ['-r']:
+            finder.rehash()
+            return True, ""
+        for name in args:
+            if name.startswith('-'):
+                return False, "Usage: hash [-r] [name ...]"
+            if not finder.find_executable(name):
+                return False, f"hash: {name}: not found"
+
+        hashed = finder.hashed()
+        if not hashed:
+            return True, "hash: hash table empty"
+        lines = ["hits\tcommand"]
+        lines.extend(f"{finder.hits.get(name, 0):4d}\t{path}"
+                     for name, path in sorted(hashed.items()))
+        return True, "\n".join(lines)
+
+    @staticmethod
+    def jobs(args, job_control) -> Tuple[bool, str]:
+        """List background jobs"""
+        long_format = '-l' in args
+        job_control.reap()
+        lines = []
+        jobs = job_control.list_jobs()
+        for job in jobs:
+            mark = '+' if job is jobs[-1] else '-' if len(jobs) > 1 and job is jobs[-2] else ' '
+            status = job.status
+            command = job.command + (' &' if status == 'Running' else '')
+            if long_format:
+                stages = ', '.join(f"{p.pid} {s}" for p, s in zip(job.processes, job.stage_statuses()))
+                lines.append(f"[{job.job_id}]{mark}  {status:<24}{command}  ({stages})")
+            else:
+                lines.append(f"[{job.job_id}]{mark}  {status:<24}{command}")
+        # Jobs shown as finished have now been reported
+        job_control.take_finished()
+        return True, "\n".join(lines)
+
+    @staticmethod
+    def fg(args, job_control) -> Tuple[bool, str]:
+        """Bring a background job to the foreground"""
+        job = job_control.get_job(args[0] if args else None)
+        if job is None:
+            return False, f"fg: {args[0] if args else 'current'}: no such job"
+        print(job.command)
+        returncode = job_control.foreground(job)
+        return returncode == 0, ""
+
+    @staticmethod
+    def bg(args, job_control) -> Tuple[bool, str]:
+        """Continue a stopped job in the background"""
+        import signal
+
+        job = job_control.get_job(args[0] if args else None)
+        if job is None:
+            return False, f"bg: {args[0] if args else 'current'}: no such job"
+        if job.stopped:
+            job.stopped = False
+            job.signal(signal.SIGCONT)
+        return True, f"[{job.job_id}]+ {job.command} &"
+
+    @staticmethod
+    def wait(args, job_control) -> Tuple[bool, str]:
+        """Wait for background jobs to finish"""
+        if not args:
+            for job in job_control.list_jobs():
+                job_control.wait(job)
+            return True, ""
+        success = True
+        for spec in args:
+            job = job_control.get_job(spec)
+            if job is None:
+                return False, f"wait: {spec}: no such job"
+            success = job_control.wait(job) == 0 and success
+        return success, ""
+
+    @staticmethod
+    def kill(args, job_control) -> Tuple[bool, str]:
+        """Send a signal to jobs (%n) or processes (pid)"""
+        import signal
+
+        usage = "Usage: kill [-s SIGNAL | -SIGNAL] %job|pid ..."
+        signum = signal.SIGTERM
+        if args and args[0] == '-s':
+            if len(args) < 2:
+                return False, usage
+            name, args = args[1], args[2:]
+        elif args and args[0].startswith('-') and len(args[0]) > 1:
+            name, args = args[0][1:], args[1:]
+        else:
+            name = None
+        if name is not None:
+            try:
+                if name.isdigit():
+                    signum = signal.Signals(int(name))
+                else:
+                    name = name.upper()
+                    signum = signal.Signals[name if name.startswith('SIG') else 'SIG' + name]
+            except (KeyError, ValueError):
+                return False, f"kill: {name}: invalid signal specification"
+        if not args:
+            return False, usage
+
+        for target in args:
+            try:
+                if target.startswith('%'):
+                    job = job_control.get_job(target)
+                    if job is None:
+                        return False, f"kill: {target}: no such job"
+                    job.signal(signum)
+                    if signum in (getattr(signal, 'SIGSTOP', None), getattr(signal, 'SIGTSTP', None)):
+                        job.stopped = True
+                    elif signum == getattr(signal, 'SIGCONT', None):
+                        job.stopped = False
+                elif target.isdigit():
+                    os.kill(int(target), signum)
+                else:
+                    return False, f"kill: {target}: arguments must be process or job IDs"
+            except ProcessLookupError:
+                return False, f"kill: ({target}) - No such process"
+            except PermissionError:
+                return False, f"kill: ({target}) - Operation not permitted"
+        return True, ""
+
+    @staticmethod
+    def stats(args, instrumentation) -> Tuple[bool, str]:
+        """Show timing percentiles of the commands run so far"""
+        usage = "Usage: stats [-n N] [-r] [--log FILE]"
+        slowest = None
+        i = 0
+        while i < len(args):
+            option = args[i]
+            if option == '-r':
+                instrumentation.clear()
+                return True, ""
+            if option == '--log' and i + 1 < len(args):
+                instrumentation.open_log(args[i + 1])
+                return True, f"Logging command timings to {instrumentation.log_file}"
+            if option == '-n' and i + 1 < len(args) and args[i + 1].isdigit():
+                slowest = int(args[i + 1])
+                i += 2
+                continue
+            return False, usage
+
+        if slowest is not None:
+            return True, "\n".join(f"{timing.wall * 1000:10.3f}ms  {timing.command}"
+                                   for timing in instrumentation.slowest(slowest))
+
+        count = len(instrumentation.records)
+        if not count:
+            return True, "stats: no commands recorded"
+        lines = [f"{count} commands", f"{'':<8}{'p50':>12}{'p90':>12}{'p99':>12}{'max':>12}"]
+        for name, values in instrumentation.summary().items():
+            if name == 'max_rss':
+                cells = ''.join(f"{int(values[key]):>8} KiB" for key in ('p50', 'p90', 'p99', 'max'))
+            else:
+                cells = ''.join(f"{values[key] * 1000:>10.3f}ms" for key in ('p50', 'p90', 'p99', 'max'))
+            lines.append(f"{name:<8}{cells}")
+        return True, "\n".join(lines)
+
+    @staticmethod
+    def export(args, environment) -> Tuple[bool, str]:
+        """Export variables to the commands the shell starts"""
+        if not args or args == ['-p']:
+            return True, "\n".join(f"export {name}={shlex.quote(value)}"
+                                   for name, value in sorted(os.environ.items()))
+        for arg in args:
+            name, assign, value = arg.partition('=')
+            if not _IDENTIFIER.fullmatch(name):
+                return False, f"export: `{arg}': not a valid identifier"
+            environment.export(name, value if assign else None)
+        return True, ""
+
+    @staticmethod
+    def parallel(args, launcher=None) -> Tuple[bool, str]:
+        """Run a command for each argument over a bounded worker pool"""
+        return BuiltInCommands.collect(BuiltInCommands.iter_parallel(args, launcher))
+
+    @staticmethod
+    def iter_parallel(args, launcher=None) -> Iterator[str]:
+        """Stream each job's output as it finishes; jobs start through launcher"""
+        from src.commands.command_executor import ParallelExecutor
+        from src.core.shell import Shell  # Import here to avoid circular import
+
+        usage = "Usage: parallel [-j N] [-k] [--tag] [--joblog FILE] command ::: args..."
+        jobs = None
+        keep_order = tag = False
+        joblog = None
+        i = 0
+        try:
+            while i < len(args) and args[i].startswith('-'):
+                option = args[i]
+                if option in ('-j', '--jobs'):
+                    jobs = int(args[i + 1])
+                    i += 1
+                elif option.startswith('-j'):
+                    jobs = int(option[2:])
+                elif option in ('-k', '--keep-order'):
+                    keep_order = True
+                elif option == '--tag':
+                    tag = True
+                elif option == '--joblog':
+                    joblog = args[i + 1]
+                    i += 1
+                else:
+                    return False, usage
+                i += 1
+        except (IndexError, ValueError):
+            return False, usage
+
+        rest = args[i:]
+        if ':::' not in rest or rest.index(':::') == 0:
+            return False, usage
+        split = rest.index(':::')
+        template, groups = rest[:split], [[]]
+        for word in rest[split + 1:]:
+            if word == ':::':
+                groups.append([])
+            else:
+                groups[-1].append(word)
+        if not all(groups):
+            return True, ""
+
+        executable = Shell.executable_finder.find_executable(template[0])
+        if not executable:
+            return False, f"parallel: {template[0]}: command not found"
+
+        executor = ParallelExecutor(jobs, keep_order=keep_order, tag=tag, launcher=launcher)
+        commands = ((job_args, [executable] + argv[1:])
+                    for job_args, argv in executor.build_commands(template, groups))
+        results = []
+        jobs_done = executor.completed(commands)
+        try:
+            for job in jobs_done:
+                results.append(job)
+                output = executor.output_of(job)
+                if output:
+                    yield output.decode('utf-8', errors='surrogateescape')
+        finally:
+            # Kills the jobs still running if the output stops being read
+            jobs_done.close()
+        results.sort(key=lambda job: job.seq)
+        if joblog == '-':
+            yield executor.format_joblog(results)
+        elif joblog:
+            executor.write_joblog(joblog, results)
+
+        failed = sum(1 for job in results if job.returncode != 0)
+        if failed:
+            return False, f"parallel: {failed} of {len(results)} jobs failed"
+        return True, ""
@@ -0,0 +1,157 @@
+import itertools
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+from src.core.launcher import Launcher
+
+class ParallelJob(NamedTuple):
+    seq: int
+    args: Sequence[str]
+    argv: List[str]
+    returncode: int
+    start: float     # wall-clock start, seconds since the epoch
+    duration: float  # seconds
+    output: bytes    # stdout and stderr, interleaved as produced
+
+class ParallelExecutor:
+    """Run many independent external commands over a bounded pool.
+
+    At most ``jobs`` children run at once, started through the shell's
+    Launcher. Each job's combined output is collected separately and
+    handed on as soon as the job finishes, or in input order with
+    ``keep_order``, so output from different jobs never interleaves.
+    ``tag`` prefixes every output line with the job's arguments.
+    """
+
+    def __init__(self, jobs: Optional[int] = None, keep_order=False, tag=False,
+                 launcher: Optional[Launcher] = None):
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.keep_order = keep_order
+        self.tag = tag
+        self.launcher = launcher if launcher is not None else Launcher()
+        self._running: Dict[int, object] = {}
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    @staticmethod
+    def build_commands(template: List[str], arg_groups: List[List[str]]):
+        """Yield (args, argv) for every combination of the ::: argument groups.
+
+        ``{}`` in the template is replaced by the arguments and ``{#}`` by the
+        job number; without ``{}`` the arguments are appended.
+        """
+        for seq, args in enumerate(itertools.product(*arg_groups), 1):
+            joined = ' '.join(args)
+            if any('{}' in word for word in template):
+                argv = [word.replace('{}', joined) for word in template]
+            else:
+                argv = list(template) + list(args)
+            yield args, [word.replace('{#}', str(seq)) for word in argv]
+
+    def _run_one(self, seq: int, args, argv: List[str]) -> ParallelJob:
+        start = time.time()
+        began = time.monotonic()
+        try:
+            with self._lock:
+                if self._cancelled:
+                    raise OSError("cancelled")
+                process = self.launcher.spawn(argv, stdin=subprocess.DEVNULL,
+                                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+                self._running[seq] = process
+            try:
+                with process.stdout:
+                    output = process.stdout.read()
+                returncode = process.wait()
+            finally:
+                with self._lock:
+                    self._running.pop(seq, None)
+        except OSError as e:
+            output, returncode = f"parallel: {argv[0]}: {e}\n".encode(), 127
+        return ParallelJob(seq, args, argv, returncode, start, time.monotonic() - began, output)
+
+    def output_of(self, job: ParallelJob) -> bytes:
+        """A job's output as it is shown, tagged if asked to"""
+        output = job.output
+        if self.tag and output:
+            prefix = ' '.join(job.args).encode() + b'\t'
+            lines = output.splitlines(keepends=True)
+            output = b''.join(prefix + line for line in lines)
+        return output
+
+    def _emit(self, job: ParallelJob):
+        output = self.output_of(job)
+        if not output:
+            return
+        buffer = getattr(sys.stdout, 'buffer', None)
+        sys.stdout.flush()
+        if buffer is not None:
+            buffer.write(output)
+            buffer.flush()
+        else:
+            sys.stdout.write(output.decode('utf-8', errors='replace'))
+
+    def completed(self, commands) -> Iterator[ParallelJob]:
+        """Run (args, argv) commands, yielding each job in the order its
+        output is due; closing the iterator early kills what is still running
+        """
+        results: Dict[int, ParallelJob] = {}
+        next_seq = 1
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            futures = [pool.submit(self._run_one, seq, args, argv)
+                       for seq, (args, argv) in enumerate(commands, 1)]
+            try:
+                for future in as_completed(futures):
+                    job = future.result()
+                    if not self.keep_order:
+                        yield job
+                        continue
+                    results[job.seq] = job
+                    while next_seq in results:
+                        yield results.pop(next_seq)
+                        next_seq += 1
+            except BaseException:
+                self.cancel()
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    def run(self, commands) -> List[ParallelJob]:
+        """Run (args, argv) commands, writing their output to sys.stdout;
+        returns their results in input order
+        """
+        results = []
+        for job in self.completed(commands):
+            self._emit(job)
+            results.append(job)
+        return sorted(results, key=lambda job: job.seq)
+
+    def cancel(self):
+        """Stop scheduling new jobs and kill the running ones"""
+        with self._lock:
+            self._cancelled = True
+            for process in self._running.values():
+                try:
+                    process.kill()
+                except OSError:
+                    pass
+
+    @staticmethod
+    def format_joblog(results: List[ParallelJob]) -> str:
+        """Per-job timings and exit codes as tab-separated values"""
+        lines = ["Seq\tStarttime\tJobRuntime\tExitval\tCommand"]
+        lines.extend(f"{job.seq}\t{job.start:.3f}\t{job.duration:.3f}\t{job.returncode}\t{' '.join(job.argv)}"
+                     for job in results)
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def write_joblog(path: str, results: List[ParallelJob]):
+        """Write the job log to path, or to sys.stdout for '-'"""
+        text = ParallelExecutor.format_joblog(results)
+        if path == '-':
+            sys.stdout.write(text)
+        else:
+            with open(path, 'w') as f:
+                f.write(text)
@@ -0,0 +1,388 @@
+import errno
+import os
+import shutil
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Optional, Tuple
+
+# Bytes handed to the kernel per copy call; progress and cancellation are
+# checked between calls
+COPY_CHUNK = 8 * 1024 * 1024
+
+# Files per task: small trees are dominated by per-file syscalls, so work is
+# dispatched in batches rather than one future per file
+BATCH_SIZE = 64
+
+# Errors meaning the kernel-side copy is unsupported here, not that it failed
+_NO_KERNEL_COPY = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP,
+                   errno.ENOTSUP, errno.EBADF, errno.ETXTBSY}
+
+class FileOperations:
+    """Parallel copy, move and removal of file trees.
+
+    Trees are walked with os.scandir on the calling thread, which creates
+    directories in order, while batches of files are copied or unlinked by
+    ``jobs`` worker threads. File data is copied by the kernel with
+    copy_file_range, or sendfile where that is unavailable, falling back to
+    a read/write loop. With ``resume`` a file already copied (same size and
+    modification time) is skipped and a shorter one is continued from where
+    it stopped, so an interrupted copy can be rerun. Errors are collected
+    rather than aborting the whole operation.
+    """
+
+    def __init__(self, jobs: Optional[int] = None, resume=False, progress=False):
+        self.jobs = max(1, jobs or min(32, (os.cpu_count() or 1) * 4))
+        self.resume = resume
+        self.progress = progress
+        self.errors: List[str] = []
+        self.files = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._last_report = 0.0
+
+    # Copying
+
+    def copy(self, source: str, dest: str):
+        """Copy a file or a whole tree to dest, merging into existing directories"""
+        try:
+            st = os.stat(source)
+        except FileNotFoundError:
+            self._error(f"cp: cannot stat '{source}': No such file or directory")
+            return
+        except OSError as e:
+            self._error(f"cp: cannot stat '{source}': {e.strerror}")
+            return
+        try:
+            if os.path.samefile(source, dest):
+                self._error(f"cp: '{source}' and '{dest}' are the same file")
+                return
+        except OSError:
+            pass
+        if not stat.S_ISDIR(st.st_mode):
+            if os.path.isdir(dest):
+                dest = os.path.join(dest, os.path.basename(source))
+            self._copy_batch([(source, dest, st)])
+            self._finish_progress()
+            return
+        if os.path.abspath(dest).startswith(os.path.join(os.path.abspath(source), '')):
+            self._error(f"cp: cannot copy a directory, '{source}', into itself, '{dest}'")
+            return
+        directories = []
+        self._run(self._walk_copy(source, dest, directories), self._copy_batch)
+        # Directory times and modes last, once every file is written, deepest
+        # first: writing files changes them, and a read-only directory could
+        # not take its files
+        for src_dir, dst_dir in reversed(directories):
+            try:
+                shutil.copystat(src_dir, dst_dir)
+            except OSError:
+                pass
+        self._finish_progress()
+
+    def _walk_copy(self, source: str, dest: str, directories: List[Tuple[str, str]]):
+        """Create the directory tree and yield batches of files to copy,
+        recording each (source, destination) directory in walk order
+        """
+        stack = [(source, dest)]
+        batch = []
+        while stack:
+            src_dir, dst_dir = stack.pop()
+            try:
+                os.makedirs(dst_dir, exist_ok=True)
+                entries = list(os.scandir(src_dir))
+            except OSError as e:
+                self._error(f"cp: cannot copy '{src_dir}': {e.strerror}")
+                continue
+            directories.append((src_dir, dst_dir))
+            for entry in entries:
+                target = os.path.join(dst_dir, entry.name)
+                try:
+                    if entry.is_symlink():
+                        self._copy_symlink(entry.path, target)
+                    elif entry.is_dir():
+                        stack.append((entry.path, target))
+                    elif entry.is_file():
+                        batch.append((entry.path, target, entry.stat()))
+                        if len(batch) >= BATCH_SIZE:
+                            yield batch
+                            batch = []
+                    else:
+                        self._error(f"cp: skipping special file '{entry.path}'")
+                except OSError as e:
+                    self._error(f"cp: cannot copy '{entry.path}': {e.strerror}")
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _copy_symlink(source: str, dest: str):
+        if os.path.lexists(dest):
+            os.unlink(dest)
+        os.symlink(os.readlink(source), dest)
+
+    def _copy_batch(self, batch):
+        for source, dest, st in batch:
+            if self._cancelled:
+                return
+            try:
+                self._copy_file(source, dest, st)
+            except OSError as e:
+                self._error(f"cp: cannot copy '{source}' to '{dest}': {e.strerror}")
+
+    def _copy_file(self, source: str, dest: str, st: os.stat_result):
+        """Copy one file's data, mode and times, resuming a partial copy if asked"""
+        offset = 0
+        if self.resume:
+            try:
+                existing = os.stat(dest)
+            except FileNotFoundError:
+                existing = None
+            if existing is not None:
+                if existing.st_size == st.st_size and existing.st_mtime_ns == st.st_mtime_ns:
+                    self._advance(1, 0)
+                    return
+                if existing.st_size < st.st_size:
+                    offset = existing.st_size
+
+        # Raw descriptors and the stat from the walk: a file object or
+        # shutil.copystat would cost more syscalls than a small file's data
+        src = os.open(source, os.O_RDONLY)
+        try:
+            flags = os.O_WRONLY | os.O_CREAT | (0 if offset else os.O_TRUNC)
+            dst = os.open(dest, flags, 0o600)
+            try:
+                self._copy_data(src, dst, offset, st.st_size)
+                os.chmod(dst, stat.S_IMODE(st.st_mode))
+                os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+            finally:
+                os.close(dst)
+        finally:
+            os.close(src)
+        self._advance(1, 0)
+
+    def _copy_data(self, src: int, dst: int, offset: int, size: int):
+        """Copy src from offset up to size, in the kernel where it can"""
+        position = offset
+        for method in (_copy_file_range, _sendfile):
+            if method is None:
+                continue
+            try:
+                while position < size:
+                    if self._cancelled:
+                        raise InterruptedError(errno.EINTR, "cancelled")
+                    copied = method(src, dst, position, min(COPY_CHUNK, size - position))
+                    if copied == 0:
+                        # Some pseudo filesystems report nothing to copy
+                        break
+                    position += copied
+                    self._advance(0, copied)
+                else:
+                    return
+            except OSError as e:
+                if e.errno not in _NO_KERNEL_COPY:
+                    raise
+        os.lseek(src, position, os.SEEK_SET)
+        os.lseek(dst, position, os.SEEK_SET)
+        while True:
+            if self._cancelled:
+                raise InterruptedError(errno.EINTR, "cancelled")
+            data = os.read(src, COPY_CHUNK)
+            if not data:
+                break
+            view = memoryview(data)
+            while view:
+                view = view[os.write(dst, view):]
+            self._advance(0, len(data))
+
+    # Removing
+
+    def remove(self, path: str, recursive=False):
+        """Remove a file, or a directory tree when recursive"""
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            self._error(f"rm: cannot remove '{path}': No such file or directory")
+            return
+        if not stat.S_ISDIR(st.st_mode):
+            self._remove_batch([path])
+            return
+        if not recursive:
+            self._error(f"rm: cannot remove '{path}': Is a directory")
+            return
+        directories = []
+        self._run(self._walk_remove(path, directories), self._remove_batch)
+        if self._cancelled:
+            return
+        # Children were walked after their parents
+        for directory in reversed(directories):
+            try:
+                os.rmdir(directory)
+            except OSError as e:
+                self._error(f"rm: cannot remove '{directory}': {e.strerror}")
+
+    def _walk_remove(self, path: str, directories: List[str]):
+        """Yield batches of non-directories, recording directories in walk order"""
+        stack = [path]
+        batch = []
+        while stack:
+            directory = stack.pop()
+            directories.append(directory)
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                self._error(f"rm: cannot remove '{directory}': {e.strerror}")
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    batch.append(entry.path)
+                    if len(batch) >= BATCH_SIZE:
+                        yield batch
+                        batch = []
+        if batch:
+            yield batch
+
+    def _remove_batch(self, batch):
+        for path in batch:
+            if self._cancelled:
+                return
+            try:
+                os.unlink(path)
+                self._advance(1, 0)
+            except FileNotFoundError:
+                self._error(f"rm: cannot remove '{path}': No such file or directory")
+            except PermissionError:
+                self._error(f"rm: cannot remove '{path}': Permission denied")
+            except OSError as e:
+                self._error(f"rm: cannot remove '{path}': {e.strerror}")
+
+    # Moving
+
+    def move(self, source: str, dest: str):
+        """Rename source to dest, or copy then remove it across filesystems"""
+        if os.path.isdir(dest):
+            dest = os.path.join(dest, os.path.basename(source.rstrip(os.sep)))
+        try:
+            os.rename(source, dest)
+            return
+        except FileNotFoundError:
+            self._error(f"mv: cannot stat '{source}': No such file or directory")
+            return
+        except PermissionError:
+            self._error(f"mv: cannot move '{source}': Permission denied")
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                self._error(f"mv: cannot move '{source}' to '{dest}': {e.strerror}")
+                return
+        failed = len(self.errors)
+        self.copy(source, dest)
+        if len(self.errors) == failed and not self._cancelled:
+            self.remove(source, recursive=True)
+
+    # Scheduling
+
+    def _run(self, batches, work):
+        """Run work on every batch over the pool, keeping a bounded backlog"""
+        if self.jobs == 1:
+            for batch in batches:
+                work(batch)
+            return
+        pending = set()
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            try:
+                for batch in batches:
+                    pending.add(pool.submit(work, batch))
+                    if len(pending) >= self.jobs * 4:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+                for future in pending:
+                    future.result()
+            except BaseException:
+                self.cancel()
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    def cancel(self):
+        """Stop after the chunk each worker is copying"""
+        self._cancelled = True
+
+    def _error(self, message: str):
+        with self._lock:
+            self.errors.append(message)
+
+    def _advance(self, files: int, size: int):
+        with self._lock:
+            self.files += files
+            self.bytes += size
+            if not self.progress:
+                return
+            now = time.monotonic()
+            if now - self._last_report < 0.2:
+                return
+            self._last_report = now
+        sys.stderr.write(f"\r{self.files} files, {_format_size(self.bytes)}")
+        sys.stderr.flush()
+
+    def _finish_progress(self):
+        if self.progress:
+            sys.stderr.write(f"\r{self.files} files, {_format_size(self.bytes)}\n")
+            sys.stderr.flush()
+
+def _format_size(size: float) -> str:
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{int(size)} B"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+def _kernel_copy(name: str):
+    """copy_file_range or sendfile as copy(src, dst, offset, count), if the OS has it"""
+    if name == 'copy_file_range' and hasattr(os, 'copy_file_range'):
+        return lambda src, dst, offset, count: os.copy_file_range(src, dst, count, offset, offset)
+    if name == 'sendfile' and hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+        # Linux accepts a regular file as the destination; write at offset
+        def sendfile(src, dst, offset, count):
+            os.lseek(dst, offset, os.SEEK_SET)
+            return os.sendfile(dst, src, offset, count)
+        return sendfile
+    return None
+
+_copy_file_range = _kernel_copy('copy_file_range')
+_sendfile = _kernel_copy('sendfile')
+
+def parse_transfer_args(name: str, args: List[str]) -> Tuple[Optional[FileOperations], List[str], bool, str]:
+    """Split cp/mv/rm arguments into (engine, operands, recursive, error)"""
+    jobs = None
+    resume = progress = recursive = False
+    operands = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == '--':
+            operands.extend(args[i + 1:])
+            break
+        if arg in ('-j', '--jobs'):
+            if i + 1 >= len(args) or not args[i + 1].isdigit():
+                return None, [], False, f"{name}: -j requires a number"
+            jobs = int(args[i + 1])
+            i += 1
+        elif arg.startswith('-j') and arg[2:].isdigit():
+            jobs = int(arg[2:])
+        elif arg == '--resume' and name != 'rm':
+            resume = True
+        elif arg == '--progress':
+            progress = True
+        elif arg in ('-r', '-R', '--recursive'):
+            recursive = True
+        elif arg.startswith('-') and arg != '-':
+            return None, [], False, f"{name}: invalid option '{arg}'"
+        else:
+            operands.append(arg)
+        i += 1
+    return FileOperations(jobs, resume=resume, progress=progress), operands, recursive, ""
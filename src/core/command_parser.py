@@ -1,53 +1,369 @@
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+# Word part kinds: unquoted text is subject to expansion and globbing, text
+# from double quotes only to expansion, and single-quoted or escaped text to
+# neither.
+LITERAL = 'literal'
+DOUBLE = 'double'
+SINGLE = 'single'
+
+# Longest operators first so that e.g. '>>' wins over '>'
+OPERATORS = ('&>>', '<<<', '<<-', '&&', '||', '>>', '>&', '<&', '&>', '<<', '|', '&', ';', '<', '>')
+REDIRECT_OPS = frozenset(('<', '>', '>>', '>&', '<&', '&>', '&>>', '<<<', '<<', '<<-'))
+HEREDOC_OPS = frozenset(('<<', '<<-'))
+# Runs of characters with no special meaning, consumed in one step
+_PLAIN = re.compile(r'[^ \t\n|&;<>\\\'"`$]+')
+_BLANKS = re.compile(r'[ \t\n]+')
+
+DEFAULT_FDS = {'<': 0, '<&': 0, '<<<': 0, '<<': 0, '<<-': 0,
+               '>': 1, '>>': 1, '>&': 1, '&>': 1, '&>>': 1}
+
+class ParseError(ValueError):
+    """Raised when a command line is not valid shell syntax"""
+
+class IncompleteInput(ParseError):
+    """Raised when input ends inside a here-document; more lines complete it"""
+
+class Word(NamedTuple):
+    """A shell word as a sequence of (kind, text) parts"""
+    parts: Tuple[Tuple[str, str], ...]
+
+    @property
+    def value(self) -> str:
+        """The word with quotes removed"""
+        return ''.join(text for _, text in self.parts)
+
+    @property
+    def quoted(self) -> bool:
+        return any(kind != LITERAL for kind, _ in self.parts)
+
+class Token(NamedTuple):
+    kind: str  # 'word', 'op' or 'io_number'
+    value: object
+
+class Redirect(NamedTuple):
+    fd: int       # descriptor in the child the redirection applies to
+    op: str       # one of REDIRECT_OPS
+    target: Word  # file name, descriptor number, here-string or here-document body
+
+class SimpleCommand(NamedTuple):
+    words: Tuple[Word, ...]
+    redirects: Tuple[Redirect, ...] = ()
+
+    @property
+    def argv(self) -> List[str]:
+        return [word.value for word in self.words]
+
+class CommandPipeline(NamedTuple):
+    commands: Tuple[SimpleCommand, ...]
+
+class CommandList(NamedTuple):
+    """Pipelines paired with the operator that follows each one.
+
+    The operator is ';' for sequential execution, '&' to run the pipeline in
+    the background, or '&&' / '||' to make the next pipeline conditional.
+    """
+    items: Tuple[Tuple[CommandPipeline, str], ...]
+
+def _scan_balanced(line: str, i: int, open_ch: str, close_ch: str) -> int:
+    """Index just past the close_ch matching the open_ch before position i"""
+    depth = 1
+    quote = None
+    n = len(line)
+    while i < n:
+        ch = line[i]
+        if quote:
+            if ch == '\\' and quote == '"':
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch == '\\':
+            i += 1
+        elif ch in '\'"':
+            quote = ch
+        elif ch == open_ch:
+            depth += 1
+        elif ch == close_ch:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    raise ParseError(f"syntax error: missing '{close_ch}'")
+
+def _scan_substitution(line: str, i: int) -> int:
+    """Index just past a $(...), ${...} or `...` construct starting at i"""
+    if line[i] == '`':
+        end = line.find('`', i + 1)
+        if end == -1:
+            raise ParseError("syntax error: missing '`'")
+        return end + 1
+    if line.startswith('$(', i):
+        return _scan_balanced(line, i + 2, '(', ')')
+    return _scan_balanced(line, i + 2, '{', '}')
+
+def tokenize(line: str) -> List[Token]:
+    """Split a command line into word, operator and io-number tokens in one pass"""
+    tokens: List[Token] = []
+    parts: List[Tuple[str, str]] = []
+    literal: List[str] = []
+    in_word = False
+    # Here-documents whose bodies start after the next newline, as
+    # (operator, index of the delimiter token)
+    heredocs: List[Tuple[str, int]] = []
+    i = 0
+    n = len(line)
+
+    def flush_literal():
+        if literal:
+            parts.append((LITERAL, ''.join(literal)))
+            literal.clear()
+
+    def add_word(word):
+        if tokens and tokens[-1].kind == 'op' and tokens[-1].value in HEREDOC_OPS:
+            heredocs.append((tokens[-1].value, len(tokens)))
+        tokens.append(Token('word', word))
+
+    def end_word():
+        nonlocal in_word
+        if in_word:
+            flush_literal()
+            add_word(Word(tuple(parts)))
+            parts.clear()
+            in_word = False
+
+    while i < n:
+        ch = line[i]
+
+        if ch in ' \t\n':
+            if in_word:
+                end_word()
+            if heredocs and '\n' in line[i:_BLANKS.match(line, i).end()]:
+                i = _read_heredocs(line, line.index('\n', i) + 1, heredocs, tokens)
+                if line[i:].strip():
+                    # The bodies took the place of a line break between commands
+                    tokens.append(Token('op', ';'))
+                continue
+            i = _BLANKS.match(line, i).end()
+            continue
+
+        if ch == '#' and not in_word:
+            break
+
+        if ch in '|&;<>':
+            op = next(op for op in OPERATORS if line.startswith(op, i))
+            # A word made only of digits directly before a redirection is the fd
+            if (op in REDIRECT_OPS and op[0] != '&' and in_word and not parts
+                    and len(literal) == 1 and literal[0].isdigit()):
+                tokens.append(Token('io_number', int(literal[0])))
+                literal.clear()
+                in_word = False
+            elif in_word:
+                end_word()
+            tokens.append(Token('op', op))
+            i += len(op)
+            continue
+
+        match = _PLAIN.match(line, i)
+        if match:
+            end = match.end()
+            if not in_word and (end == n or line[end] in ' \t\n|&;'):
+                # Fast path: a whole word with no quoting or expansion
+                add_word(Word(((LITERAL, match.group()),)))
+            else:
+                in_word = True
+                literal.append(match.group())
+            i = end
+            continue
+
+        in_word = True
+        if ch == '\\':
+            flush_literal()
+            if i + 1 < n:
+                parts.append((SINGLE, line[i + 1]))
+            i += 2
+        elif ch == "'":
+            end = line.find("'", i + 1)
+            if end == -1:
+                raise ParseError("syntax error: unterminated quote")
+            flush_literal()
+            parts.append((SINGLE, line[i + 1:end]))
+            i = end + 1
+        elif ch == '"':
+            flush_literal()
+            i = _scan_double_quoted(line, i + 1, parts)
+        elif ch == '`' or (ch == '$' and line[i + 1:i + 2] in ('(', '{')):
+            end = _scan_substitution(line, i)
+            literal.append(line[i:end])
+            i = end
+        else:
+            literal.append(ch)
+            i += 1
+
+    end_word()
+    if heredocs:
+        _read_heredocs(line, n, heredocs, tokens)
+    return tokens
+
+def _read_heredocs(line: str, i: int, heredocs: List[Tuple[str, int]], tokens: List[Token]) -> int:
+    """Replace each pending delimiter token by the body of its here-document.
+
+    Bodies are the lines from i up to a line holding only the delimiter;
+    with <<- leading tabs are removed first. A quoted delimiter makes the
+    body literal, otherwise it is expanded as if in double quotes. Returns
+    the index after the last delimiter line.
+    """
+    n = len(line)
+    for op, index in heredocs:
+        word = tokens[index].value
+        delimiter = word.value
+        body = []
+        while True:
+            if i >= n:
+                raise IncompleteInput(f"syntax error: here-document not terminated (wanted '{delimiter}')")
+            end = line.find('\n', i)
+            if end == -1:
+                end = n
+            text = line[i:end]
+            i = end + 1
+            if op == '<<-':
+                text = text.lstrip('\t')
+            if text == delimiter:
+                break
+            body.append(text + '\n')
+        tokens[index] = Token('word', Word(((SINGLE if word.quoted else DOUBLE, ''.join(body)),)))
+    heredocs.clear()
+    return min(i, n)
+
+def _scan_double_quoted(line: str, i: int, parts: List[Tuple[str, str]]) -> int:
+    """Append the parts of a double-quoted string starting at i; returns its end"""
+    buf: List[str] = []
+    n = len(line)
+    while i < n:
+        ch = line[i]
+        if ch == '"':
+            # Appended even when empty so that "" still forms a word
+            parts.append((DOUBLE, ''.join(buf)))
+            return i + 1
+        if ch == '\\' and i + 1 < n and line[i + 1] in '$`"\\\n':
+            if buf:
+                parts.append((DOUBLE, ''.join(buf)))
+                buf = []
+            parts.append((SINGLE, line[i + 1]))
+            i += 2
+        elif ch == '`' or (ch == '$' and line[i + 1:i + 2] in ('(', '{')):
+            end = _scan_substitution(line, i)
+            buf.append(line[i:end])
+            i = end
+        else:
+            buf.append(ch)
+            i += 1
+    raise ParseError("syntax error: unterminated quote")
+
 class CommandParser:
-    def __init__(self):
-        pass
-    
+    """Parse command lines into a CommandList AST.
+
+    Parsed lines are kept in an LRU cache keyed by the raw input, so loops and
+    history re-execution skip lexing and parsing entirely. The AST is built
+    from immutable tuples and is safe to share between executions.
+
+    With an AliasManager, aliases are expanded on the tokens before parsing;
+    cached lines are dropped whenever an alias changes.
+    """
+
+    def __init__(self, cache_size: int = 512, aliases=None):
+        self.aliases = aliases
+        self.parse_line = lru_cache(maxsize=cache_size)(self._parse_line)
+        if aliases is not None:
+            aliases.watch(self.parse_line)
+
+    def _parse_line(self, line: str) -> CommandList:
+        tokens = tokenize(line)
+        if self.aliases is not None:
+            tokens = self.aliases.expand_tokens(tokens)
+        items: List[Tuple[CommandPipeline, str]] = []
+        pos = 0
+        while pos < len(tokens):
+            pipeline, pos = self._parse_pipeline(tokens, pos)
+            if pos < len(tokens):
+                op = tokens[pos].value
+                pos += 1
+                if op in ('&&', '||') and pos >= len(tokens):
+                    raise ParseError(f"syntax error: expected command after '{op}'")
+            else:
+                op = ';'
+            items.append((pipeline, op))
+        return CommandList(tuple(items))
+
+    def _parse_pipeline(self, tokens: List[Token], pos: int) -> Tuple[CommandPipeline, int]:
+        commands = []
+        while True:
+            command, pos = self._parse_command(tokens, pos)
+            if command is None:
+                if commands or (pos < len(tokens) and tokens[pos].value == '|'):
+                    raise ParseError("Invalid pipe syntax: empty command in pipeline")
+                token = tokens[pos].value if pos < len(tokens) else 'newline'
+                raise ParseError(f"syntax error near unexpected token '{token}'")
+            commands.append(command)
+            if pos < len(tokens) and tokens[pos].value == '|':
+                pos += 1
+                continue
+            return CommandPipeline(tuple(commands)), pos
+
+    def _parse_command(self, tokens: List[Token], pos: int) -> Tuple[Optional[SimpleCommand], int]:
+        words = []
+        redirects = []
+        while pos < len(tokens):
+            kind, value = tokens[pos]
+            if kind == 'word':
+                words.append(value)
+                pos += 1
+                continue
+            fd = None
+            if kind == 'io_number':
+                fd = value
+                pos += 1
+                kind, value = tokens[pos]
+            if value not in REDIRECT_OPS:
+                break
+            if pos + 1 >= len(tokens) or tokens[pos + 1].kind != 'word':
+                raise ParseError(f"syntax error: missing target for '{value}'")
+            if fd is None:
+                fd = DEFAULT_FDS[value]
+            redirects.append(Redirect(fd, value, tokens[pos + 1].value))
+            pos += 2
+        if not words and not redirects:
+            return None, pos
+        return SimpleCommand(tuple(words), tuple(redirects)), pos
+
     def parse(self, command_string):
-        """Parse command with redirections"""
-        if not command_string:
+        """Parse command with redirections.
+
+        Legacy interface returning the first pipeline as
+        (command, args, is_background, piped_commands, input_file, output_file).
+        """
+        if not command_string or not command_string.strip():
+            return None, [], False, None, None, None
+
+        items = self.parse_line(command_string).items
+        if not items:
             return None, [], False, None, None, None
-        
-        # Check for background process
-        is_background = command_string.strip().endswith('&')
-        if is_background:
-            command_string = command_string[:-1].strip()
-        
-        # Handle redirections
+        pipeline, op = items[0]
         input_file = output_file = None
-        parts = command_string.split()
-        new_parts = []
-        
-        i = 0
-        while i < len(parts):
-            if parts[i] == '>':
-                if i + 1 < len(parts):
-                    output_file = parts[i + 1]
-                    i += 2
-                    continue
-            elif parts[i] == '<':
-                if i + 1 < len(parts):
-                    input_file = parts[i + 1]
-                    i += 2
-                    continue
-            new_parts.append(parts[i])
-            i += 1
-            
-        command_string = ' '.join(new_parts)
-        
-        # Split on pipes
-        pipe_commands = [cmd.strip() for cmd in command_string.split('|')]
-        
-        if len(pipe_commands) == 1:
-            parts = new_parts
-            command = parts[0].lower() if parts else None
-            args = parts[1:] if len(parts) > 1 else []
-            return command, args, is_background, None, input_file, output_file
-            
         parsed_commands = []
-        for cmd in pipe_commands:
-            parts = cmd.strip().split()
-            if not parts:
-                continue
-            parsed_commands.append((parts[0].lower(), parts[1:] if len(parts) > 1 else []))
-            
-        return parsed_commands[0][0], parsed_commands[0][1], is_background, parsed_commands[1:], input_file, output_file
\ No newline at end of file
+        for command in pipeline.commands:
+            for redirect in command.redirects:
+                if redirect.op == '<':
+                    input_file = redirect.target.value
+                elif redirect.op in ('>', '>>') and redirect.fd == 1:
+                    output_file = redirect.target.value
+            argv = command.argv
+            if argv:
+                parsed_commands.append((argv[0].lower(), argv[1:]))
+
+        if not parsed_commands:
+            return None, [], op == '&', None, input_file, output_file
+        command, args = parsed_commands[0]
+        piped = parsed_commands[1:] or None
+        return command, args, op == '&', piped, input_file, output_file
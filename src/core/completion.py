@@ -0,0 +1,117 @@
+import bisect
+import os
+from collections import OrderedDict
+from typing import List, Mapping, Optional, Tuple
+
+# Words after which the next word is a command name
+COMMAND_SEPARATORS = ('|', '||', '&&', ';', '&')
+
+class CompletionEngine:
+    """Tab completion for command names and paths.
+
+    Candidates are computed once per Tab press (readline ``state`` 0) and
+    every further state is served from that list. Directory listings come
+    from a single ``os.scandir`` pass, kept sorted so a prefix is found by
+    bisection, and reused until the directory's mtime changes; ``DirEntry.is_dir`` supplies
+    the trailing slash without a stat per entry. The first word of a command
+    completes from builtins, aliases and the PATH index.
+    """
+
+    def __init__(self, executable_finder, builtins: Mapping[str, object] = None,
+                 aliases: Mapping[str, str] = None, max_directories=64):
+        self.executable_finder = executable_finder
+        self.builtins = builtins if builtins is not None else {}
+        self.aliases = aliases if aliases is not None else {}
+        self.max_directories = max_directories
+        # directory -> (mtime_ns, sorted names, names that are directories)
+        self._listings: "OrderedDict[str, Tuple[int, List[str], frozenset]]" = OrderedDict()
+        self._matches: List[str] = []
+
+    def complete(self, text: str, state: int) -> Optional[str]:
+        """readline completer: the state-th candidate for the word being completed"""
+        if state == 0:
+            import readline
+
+            self._matches = self.candidates(readline.get_line_buffer(), readline.get_begidx(), text)
+        try:
+            return self._matches[state]
+        except IndexError:
+            return None
+
+    def candidates(self, line: str, begidx: int, text: str) -> List[str]:
+        """All completions of text, the word starting at begidx in line"""
+        if self._in_command_position(line[:begidx]) and '/' not in text and not text.startswith('~'):
+            return self.complete_command(text)
+        return self.complete_path(text)
+
+    @staticmethod
+    def _in_command_position(before: str) -> bool:
+        words = before.split()
+        return not words or words[-1] in COMMAND_SEPARATORS
+
+    def complete_command(self, text: str) -> List[str]:
+        """Builtins, aliases and PATH commands starting with text"""
+        names = {name for name in self.builtins if name.startswith(text)}
+        names.update(name for name in self.aliases if name.startswith(text))
+        names.update(self.executable_finder.commands(text))
+        return [name + ' ' for name in sorted(names)]
+
+    def complete_path(self, text: str) -> List[str]:
+        """Paths starting with text; directories end in '/', files in a space"""
+        head, _, prefix = text.rpartition('/')
+        if text.startswith('/') and not head:
+            head = '/'
+        directory = os.path.expanduser(head) if head else '.'
+        names, directories = self._listing(directory)
+        if head and not head.endswith('/'):
+            head += '/'
+
+        matches = []
+        i = bisect.bisect_left(names, prefix)
+        while i < len(names) and names[i].startswith(prefix):
+            name = names[i]
+            i += 1
+            # Hidden files only when asked for, as in bash
+            if name.startswith('.') and not prefix.startswith('.'):
+                continue
+            matches.append(head + name + ('/' if name in directories else ' '))
+        return matches
+
+    def _listing(self, directory: str) -> Tuple[List[str], frozenset]:
+        """Sorted names in directory and the subset that are directories"""
+        # Keyed by absolute path: '.' means something else after a cd
+        directory = os.path.abspath(directory)
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            return [], frozenset()
+        cached = self._listings.get(directory)
+        if cached is not None and cached[0] == mtime:
+            self._listings.move_to_end(directory)
+            return cached[1], cached[2]
+
+        names = []
+        directories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    names.append(entry.name)
+                    try:
+                        if entry.is_dir():
+                            directories.append(entry.name)
+                    except OSError:
+                        pass
+        except OSError:
+            return [], frozenset()
+        names.sort()
+        listing = (mtime, names, frozenset(directories))
+        self._listings[directory] = listing
+        self._listings.move_to_end(directory)
+        if len(self._listings) > self.max_directories:
+            self._listings.popitem(last=False)
+        return listing[1], listing[2]
+
+    def invalidate(self):
+        """Forget cached listings and candidates"""
+        self._listings.clear()
+        self._matches = []
@@ -1,39 +1,151 @@
+import bisect
 import os
-import shutil
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
 class ExecutableFinder:
-    def __init__(self):
-        self.path = os.getenv('PATH', '').split(os.pathsep)
+    """Resolve command names against PATH through a cached index.
+
+    Each PATH directory is listed once and kept until its mtime changes, and
+    resolved commands are remembered (with hit counts, like bash's ``hash``)
+    until PATH or one of its directories changes or ``rehash`` is called.
+    Staleness is checked at most once per ``check_interval`` seconds on hits
+    and always on a miss, so newly installed programs are found immediately.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self.hits: Dict[str, int] = {}
+        self._cache: Dict[str, str] = {}
+        self._listings: Dict[str, Tuple[int, FrozenSet[str]]] = {}
+        # Sorted (name, directory) pairs over all of PATH, for completion
+        self._names: Optional[List[Tuple[str, str]]] = None
+        self._path_env: Optional[str] = None
+        self._last_check = 0.0
+        self.path: List[str] = []
+        self._load_path()
+
+    def _load_path(self):
+        self._path_env = os.getenv('PATH', '')
+        self.path = [d for d in self._path_env.split(os.pathsep) if d]
         # Add Windows System32 directory explicitly
         if os.name == 'nt':
             system32 = os.path.join(os.environ.get('SystemRoot', 'C:\\Windows'), 'System32')
             if system32 not in self.path:
                 self.path.append(system32)
 
-    def find_executable(self, command):
-        """Find the full path of an executable"""
-        if os.path.isabs(command):
-            return command if os.access(command, os.X_OK) else None
+    def _variants(self, command: str) -> List[str]:
+        """Names to look for in each directory, in priority order"""
+        if os.name != 'nt':
+            return [command]
+        command = command.lower()
+        exts = os.environ.get('PATHEXT', '.EXE').lower().split(';')
+        if any(command.endswith(ext) for ext in exts if ext):
+            return [command]
+        return [command] + [command + ext for ext in exts if ext]
 
-        # Handle Windows executables
-        if os.name == 'nt':
-            # Try with and without .exe extension
-            cmd_variants = [command]
-            if not command.lower().endswith('.exe'):
-                cmd_variants.append(f"{command}.exe")
-            
-            for cmd in cmd_variants:
-                # Try direct which() first
-                path = shutil.which(cmd)
-                if path:
-                    return path
-                
-                # Manual search in PATH
-                for directory in self.path:
-                    full_path = os.path.join(directory, cmd)
-                    if os.path.isfile(full_path):
+    def _listing(self, directory: str) -> FrozenSet[str]:
+        """Names in a PATH directory, read once per directory mtime"""
+        cached = self._listings.get(directory)
+        if cached is not None:
+            return cached[1]
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                if os.name == 'nt':
+                    names = frozenset(entry.name.lower() for entry in entries)
+                else:
+                    names = frozenset(entry.name for entry in entries)
+        except OSError:
+            mtime, names = -1, frozenset()
+        self._listings[directory] = (mtime, names)
+        return names
+
+    def _validate(self, force=False):
+        """Drop cached state for PATH entries that changed since the last check"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        if os.getenv('PATH', '') != self._path_env:
+            self.rehash()
+            self._load_path()
+            return
+
+        changed = False
+        for directory, (mtime, _) in list(self._listings.items()):
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                current = -1
+            if current != mtime:
+                del self._listings[directory]
+                changed = True
+        if changed:
+            self._cache.clear()
+            self._names = None
+
+    def _search(self, command: str) -> Optional[str]:
+        variants = self._variants(command)
+        for directory in self.path:
+            names = self._listing(directory)
+            for name in variants:
+                if name in names:
+                    full_path = os.path.join(directory, name)
+                    if os.path.isfile(full_path) and os.access(full_path, os.X_OK):
                         return full_path
+        return None
+
+    def find_executable(self, command):
+        """Find the full path of an executable"""
+        if not command:
+            return None
+        if os.path.isabs(command) or os.path.dirname(command):
+            if os.path.isfile(command) and os.access(command, os.X_OK):
+                return command
             return None
-        
-        # Unix-like systems
-        return shutil.which(command)
\ No newline at end of file
+
+        self._validate()
+        path = self._cache.get(command)
+        if path is None:
+            # A miss may mean something was just installed; re-check now
+            self._validate(force=True)
+            path = self._search(command)
+            if path is None:
+                return None
+            self._cache[command] = path
+        self.hits[command] = self.hits.get(command, 0) + 1
+        return path
+
+    def commands(self, prefix: str = '') -> List[str]:
+        """Names of executables on PATH that start with prefix"""
+        self._validate()
+        if self._names is None:
+            seen = {}
+            for directory in self.path:
+                for name in self._listing(directory):
+                    seen.setdefault(name, directory)
+            self._names = sorted(seen.items())
+        names = self._names
+        matches = []
+        i = bisect.bisect_left(names, (prefix,))
+        while i < len(names) and names[i][0].startswith(prefix):
+            name, directory = names[i]
+            i += 1
+            # Only the matches are checked, so a short prefix costs a few stats
+            full_path = os.path.join(directory, name)
+            if os.path.isfile(full_path) and os.access(full_path, os.X_OK):
+                matches.append(name)
+        return matches
+
+    def hashed(self) -> Dict[str, str]:
+        """Currently remembered command locations"""
+        return dict(self._cache)
+
+    def rehash(self):
+        """Forget every remembered location and directory listing"""
+        self._cache.clear()
+        self._listings.clear()
+        self._names = None
+        self.hits.clear()
@@ -0,0 +1,423 @@
+import ast
+import operator
+import os
+import re
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
+from src.core.command_parser import DOUBLE, LITERAL, SINGLE, ParseError, Word, _scan_substitution
+from src.core.globbing import Globber, brace_expand, escape, has_magic
+from src.utils.environment import Environment
+
+_NAME = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_SPECIAL = frozenset('?$!#@*0123456789')
+# ${NAME}, ${#NAME} or ${NAME<op>word}
+_BRACED = re.compile(r'(#?)([A-Za-z_][A-Za-z0-9_]*|[0-9]+|[?$!#@*])(?:(:?[-=+?])(.*))?\Z', re.DOTALL)
+_ASSIGNMENT = re.compile(r'[A-Za-z_][A-Za-z0-9_]*=')
+
+class ExpansionError(ValueError):
+    """Raised when a word cannot be expanded, e.g. by ${NAME:?message}"""
+
+def is_assignment(word: Word) -> bool:
+    """Whether a word has the form NAME=value, with NAME unquoted"""
+    kind, text = word.parts[0]
+    return kind == LITERAL and _ASSIGNMENT.match(text) is not None
+
+def _is_static(word: Word) -> bool:
+    return not any(kind != SINGLE and ('$' in text or '`' in text)
+                   or kind == LITERAL and any(ch in text for ch in '*?[{')
+                   for kind, text in word.parts)
+
+def is_pattern(word: Word) -> bool:
+    """Whether a word may expand to several paths by brace or pathname expansion"""
+    return any(kind == LITERAL and any(ch in text for ch in '*?[{') for kind, text in word.parts)
+
+class Expander:
+    """Expands parsed words into the argument strings of a command.
+
+    Handles $NAME and ${NAME} with the :- := :+ :? operators and ${#NAME},
+    the special parameters $? $$ $! $# $@ $* and the positional parameters
+    $0 $1 ... ${10}, arithmetic $((...)), and command substitution $(...)
+    and `...`. Variables come from an Environment, positional parameters
+    from ``parameters()``, which gives $0 followed by the arguments; a
+    quoted "$@" becomes one field per argument.
+    Results of expansions outside double quotes are split into fields on
+    whitespace. Brace expansion and then pathname expansion with a Globber
+    follow, for the unquoted parts of a word. Words with nothing to expand,
+    the common case, are served from a cache.
+
+    Command substitution is delegated to ``substitute(command) -> str``,
+    which the shell implements by running the command in-process with its
+    output captured.
+    """
+
+    def __init__(self, environment: Optional[Environment] = None,
+                 substitute: Optional[Callable[[str], str]] = None,
+                 status: Callable[[], int] = lambda: 0,
+                 last_background: Callable[[], Optional[int]] = lambda: None,
+                 globber: Optional[Globber] = None,
+                 parameters: Callable[[], List[str]] = lambda: ['myshell']):
+        self.environment = environment if environment is not None else Environment()
+        self.globber = globber if globber is not None else Globber()
+        self.substitute = substitute
+        self.status = status
+        self.last_background = last_background
+        self.parameters = parameters
+
+    def expand(self, words) -> List[str]:
+        """The argv for a sequence of words"""
+        argv: List[str] = []
+        # Directory listings shared by the patterns of one command
+        listings = {}
+        for word in words:
+            argv.extend(self.expand_word(word, listings))
+        return argv
+
+    def expand_word(self, word: Word, listings=None) -> List[str]:
+        """The fields one word expands to; none if it expanded to nothing unquoted"""
+        static = _static_fields(word)
+        if static is not None:
+            return list(static)
+        fields = _Fields()
+        for braced in _brace_words(word):
+            for kind, text in braced.parts:
+                if kind == LITERAL:
+                    self._expand_text(text, fields, split=True)
+                elif kind == DOUBLE:
+                    self._expand_quoted(text, fields)
+                else:
+                    fields.add(text)
+            fields.end_field()
+        texts = fields.finish()
+        if not any(fields.patterns):
+            return texts
+        if listings is None:
+            listings = {}
+        result = []
+        for text, pattern in zip(texts, fields.patterns):
+            # A pattern matching nothing is passed on as written
+            result.extend(pattern is not None and self.globber.glob(pattern, listings) or [text])
+        return result
+
+    def expand_unsplit(self, word: Word) -> str:
+        """A word expanded to one string, as for assignments and redirection targets"""
+        return ''.join(text if kind == SINGLE else self.expand_string(text)
+                       for kind, text in word.parts)
+
+    def expand_string(self, text: str) -> str:
+        """Expand text as inside double quotes, without field splitting"""
+        if '$' not in text and '`' not in text:
+            return text
+        fields = _Fields()
+        self._expand_text(text, fields, split=False)
+        return ''.join(fields.finish())
+
+    def _expand_quoted(self, text: str, fields: '_Fields'):
+        """Expand double-quoted text into fields, where "$@" gives one per argument"""
+        head, at, tail = text.partition('$@')
+        if not at:
+            fields.add(self.expand_string(text))
+            return
+        if head:
+            fields.add(self.expand_string(head))
+        for index, argument in enumerate(self.parameters()[1:]):
+            if index:
+                fields.end_field()
+            fields.add(argument)
+        if tail:
+            self._expand_quoted(tail, fields)
+
+    def _expand_text(self, text: str, fields: '_Fields', split: bool):
+        add = fields.add_split if split else fields.add
+        i = 0
+        n = len(text)
+        while i < n:
+            dollar = _next_expansion(text, i)
+            if dollar > i:
+                fields.add(text[i:dollar], quoted=not split)
+            if dollar == n:
+                break
+            value, i = self._expansion_at(text, dollar)
+            if value is None:
+                fields.add(text[dollar], quoted=not split)
+                i = dollar + 1
+            else:
+                add(value)
+
+    def _expansion_at(self, text: str, i: int) -> Tuple[Optional[str], int]:
+        """(value, end) of the expansion starting at i, or (None, i) for a plain '$'"""
+        if text[i] == '`':
+            end = _scan(text, i)
+            return self._substitute(text[i + 1:end - 1]), end
+        nxt = text[i + 1:i + 2]
+        if nxt == '(':
+            end = _scan(text, i)
+            if text.startswith('$((', i) and text[end - 2:end] == '))':
+                return str(self.arithmetic(text[i + 3:end - 2])), end
+            return self._substitute(text[i + 2:end - 1]), end
+        if nxt == '{':
+            end = _scan(text, i)
+            return self._braced(text[i + 2:end - 1]), end
+        if nxt and nxt in _SPECIAL:
+            return self._parameter(nxt), i + 2
+        match = _NAME.match(text, i + 1)
+        if match:
+            return self._parameter(match.group()), match.end()
+        return None, i
+
+    def _parameter(self, name: str) -> str:
+        if name == '?':
+            return str(self.status())
+        if name == '$':
+            return str(os.getpid())
+        if name == '!':
+            pid = self.last_background()
+            return '' if pid is None else str(pid)
+        if name.isdigit():
+            parameters = self.parameters()
+            return parameters[int(name)] if int(name) < len(parameters) else ''
+        if name == '#':
+            return str(len(self.parameters()) - 1)
+        if name in '@*':
+            return ' '.join(self.parameters()[1:])
+        value = self.environment.get(name)
+        return '' if value is None else str(value)
+
+    def _is_set(self, name: str) -> bool:
+        if name.isdigit():
+            return int(name) < len(self.parameters())
+        return name in _SPECIAL or self.environment.get(name) is not None
+
+    def _braced(self, body: str) -> str:
+        match = _BRACED.match(body)
+        if match is None:
+            raise ExpansionError(f"${{{body}}}: bad substitution")
+        length, name, op, word = match.groups()
+        if length:
+            if op:
+                raise ExpansionError(f"${{{body}}}: bad substitution")
+            return str(len(self._parameter(name)))
+        value = self._parameter(name)
+        if op is None:
+            return value
+        # With ':' an empty value counts as unset
+        is_set = bool(value) if op.startswith(':') else (
+            self._is_set(name))
+        kind = op[-1]
+        if kind == '-':
+            return value if is_set else self.expand_string(word)
+        if kind == '=':
+            if not is_set:
+                value = self.expand_string(word)
+                self.environment.set(name, value)
+            return value
+        if kind == '+':
+            return self.expand_string(word) if is_set else ''
+        if not is_set:
+            message = self.expand_string(word) or "parameter null or not set"
+            raise ExpansionError(f"{name}: {message}")
+        return value
+
+    def _substitute(self, command: str) -> str:
+        if self.substitute is None:
+            raise ExpansionError("command substitution is not available")
+        # Trailing newlines are removed, as in every shell
+        return self.substitute(command).rstrip('\n')
+
+    def arithmetic(self, expression: str) -> int:
+        """Evaluate the inside of $((...)) with shell integer semantics"""
+        expression = self.expand_string(expression).strip()
+        if not expression:
+            return 0
+        tree = _compile_arithmetic(expression)
+        return _evaluate(tree, self._variable_number, expression)
+
+    def _variable_number(self, name: str) -> int:
+        value = (self.environment.get(name) or '').strip()
+        if not value:
+            return 0
+        try:
+            return _integer(value)
+        except ValueError:
+            raise ExpansionError(f"{value}: invalid number in arithmetic expression")
+
+class _Fields:
+    """Accumulates the fields of one word as its parts are expanded.
+
+    Alongside its text each field keeps a glob pattern, with quoted text
+    escaped, while any of its unquoted text holds a glob character.
+    """
+
+    def __init__(self):
+        self.fields: List[str] = []
+        self.current: List[str] = []
+        self.started = False
+        # Per finished field, its pattern or None
+        self.patterns: List[Optional[str]] = []
+        self.pattern: List[str] = []
+        self.magic = False
+
+    def add(self, text: str, quoted: bool = True):
+        # Quoted text makes a field even when it is empty
+        self.current.append(text)
+        self.pattern.append(escape(text) if quoted else text)
+        if not quoted and not self.magic:
+            self.magic = has_magic(text)
+        self.started = True
+
+    def add_split(self, value: str):
+        if not value:
+            return
+        pieces = value.split()
+        if value[0].isspace():
+            self.end_field()
+        for index, piece in enumerate(pieces):
+            if index:
+                self.end_field()
+            self.add(piece, quoted=False)
+        if value[-1].isspace():
+            self.end_field()
+
+    def end_field(self):
+        if self.started:
+            self.fields.append(''.join(self.current))
+            self.patterns.append(''.join(self.pattern) if self.magic else None)
+            self.current = []
+            self.pattern = []
+            self.started = False
+            self.magic = False
+
+    def finish(self) -> List[str]:
+        self.end_field()
+        return self.fields
+
+def _next_expansion(text: str, start: int) -> int:
+    """Index of the next '$' or '`' from start, or len(text)"""
+    ends = [index for index in (text.find('$', start), text.find('`', start)) if index != -1]
+    return min(ends) if ends else len(text)
+
+def _scan(text: str, i: int) -> int:
+    try:
+        return _scan_substitution(text, i)
+    except ParseError as e:
+        raise ExpansionError(str(e))
+
+@lru_cache(maxsize=1024)
+def _brace_words(word: Word) -> Tuple[Word, ...]:
+    """The words brace expansion of the unquoted parts of a word produces"""
+    if not any(kind == LITERAL and '{' in text for kind, text in word.parts):
+        return (word,)
+    words = [()]
+    for kind, text in word.parts:
+        alternatives = brace_expand(text) if kind == LITERAL else [text]
+        words = [parts + ((kind, alternative),) for parts in words for alternative in alternatives]
+    return tuple(Word(parts) for parts in words)
+
+@lru_cache(maxsize=4096)
+def _static_fields(word: Word) -> Optional[Tuple[str, ...]]:
+    """The fields of a word with nothing to expand, or None if it has some"""
+    if not _is_static(word):
+        return None
+    return (word.value,)
+
+# Arithmetic: the expression is parsed as Python after translating the C
+# operators Python spells differently, then walked node by node, so only
+# integer arithmetic can run. Every value wraps to a signed 64-bit integer
+# as in other shells, so no expression can build an unbounded number.
+
+_BITS = 64
+_MODULUS = 1 << _BITS
+
+_BINARY = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Pow: lambda left, right: pow(left, right, _MODULUS),
+    # Shifting a 64-bit value by 64 or more leaves only its sign
+    ast.LShift: lambda left, right: left << right if right < _BITS else 0,
+    ast.RShift: lambda left, right: left >> min(right, _BITS),
+    ast.BitAnd: operator.and_, ast.BitOr: operator.or_, ast.BitXor: operator.xor,
+}
+_COMPARE = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt,
+    ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+}
+_C_OPERATORS = re.compile(r'&&|\|\||!(?!=)')
+# Numbers with a leading zero, which C reads as octal and Python rejects
+_LEADING_ZERO = re.compile(r'(?<![\w.])0[0-9]+\b')
+
+def _integer(text: str) -> int:
+    """A number as C writes it: 0x hexadecimal, a leading 0 for octal"""
+    sign, digits = (text[0], text[1:]) if text[:1] in ('-', '+') else ('', text)
+    if len(digits) > 1 and digits[0] == '0' and digits.isdigit():
+        value = int(digits, 8)
+    else:
+        value = int(digits, 0)
+    return -value if sign == '-' else value
+
+def _octal(match) -> str:
+    try:
+        return str(_integer(match.group()))
+    except ValueError:
+        raise ExpansionError(f"{match.group()}: value too great for base")
+
+@lru_cache(maxsize=512)
+def _compile_arithmetic(expression: str) -> ast.AST:
+    translated = _C_OPERATORS.sub(lambda m: {'&&': ' and ', '||': ' or ', '!': ' not '}[m.group()],
+                                  expression)
+    translated = _LEADING_ZERO.sub(_octal, translated)
+    try:
+        return ast.parse(translated.strip(), mode='eval').body
+    except SyntaxError:
+        raise ExpansionError(f"{expression}: syntax error in expression")
+
+def _wrap(value: int) -> int:
+    """value as a signed 64-bit integer"""
+    value &= _MODULUS - 1
+    return value - _MODULUS if value >> (_BITS - 1) else value
+
+def _evaluate(node: ast.AST, variable: Callable[[str], int], expression: str) -> int:
+    def walk(node) -> int:
+        return _wrap(value_of(node))
+
+    def value_of(node) -> int:
+        if isinstance(node, ast.Constant) and isinstance(node.value, int):
+            return int(node.value)
+        if isinstance(node, ast.Name):
+            return variable(node.id)
+        if isinstance(node, ast.UnaryOp):
+            value = walk(node.operand)
+            if isinstance(node.op, ast.USub):
+                return -value
+            if isinstance(node.op, ast.UAdd):
+                return value
+            if isinstance(node.op, ast.Invert):
+                return ~value
+            if isinstance(node.op, ast.Not):
+                return int(not value)
+        if isinstance(node, ast.BinOp):
+            left, right = walk(node.left), walk(node.right)
+            if isinstance(node.op, (ast.Div, ast.FloorDiv, ast.Mod)):
+                if right == 0:
+                    raise ExpansionError(f"{expression}: division by 0")
+                # C semantics: truncate towards zero
+                quotient = abs(left) // abs(right) * (1 if (left < 0) == (right < 0) else -1)
+                return quotient if not isinstance(node.op, ast.Mod) else left - right * quotient
+            if isinstance(node.op, ast.Pow) and right < 0:
+                raise ExpansionError(f"{expression}: exponent less than 0")
+            if isinstance(node.op, (ast.LShift, ast.RShift)) and right < 0:
+                raise ExpansionError(f"{expression}: negative shift count")
+            if type(node.op) in _BINARY:
+                return _BINARY[type(node.op)](left, right)
+        if isinstance(node, ast.BoolOp):
+            values = (walk(value) for value in node.values)
+            if isinstance(node.op, ast.And):
+                return int(all(values))
+            return int(any(values))
+        if isinstance(node, ast.Compare):
+            left = walk(node.left)
+            for op, comparator in zip(node.ops, node.comparators):
+                right = walk(comparator)
+                if type(op) not in _COMPARE or not _COMPARE[type(op)](left, right):
+                    return 0
+                left = right
+            return 1
+        raise ExpansionError(f"{expression}: syntax error in expression")
+    return walk(node)
@@ -0,0 +1,253 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from src.core.command_parser import ParseError, _scan_substitution
+
+_MAGIC = re.compile(r'(?<!\\)(?:\\\\)*[*?[]')
+_ESCAPED = re.compile(r'\\(.)', re.DOTALL)
+_SEQUENCE = re.compile(r'(-?\d+|[A-Za-z])\.\.(-?\d+|[A-Za-z])(?:\.\.(-?\d+))?\Z')
+
+# One directory's entries as (name, is_dir, is_symlink)
+Listing = List[Tuple[str, bool, bool]]
+
+def escape(text: str) -> str:
+    """Text with glob characters made literal, for quoted and expanded parts"""
+    if not any(ch in text for ch in '*?[\\'):
+        return text
+    return re.sub(r'([*?[\\])', r'\\\1', text)
+
+def unescape(pattern: str) -> str:
+    return _ESCAPED.sub(r'\1', pattern) if '\\' in pattern else pattern
+
+def has_magic(pattern: str) -> bool:
+    """Whether an escaped pattern contains an unescaped *, ? or ["""
+    return _MAGIC.search(pattern) is not None
+
+@lru_cache(maxsize=1024)
+def compile_component(component: str):
+    """Regex matching one path component against an escaped glob pattern.
+
+    As in other shells, a leading '.' has to be matched explicitly.
+    """
+    out = [] if component.startswith(('.', '\\.')) else [r'(?!\.)']
+    i = 0
+    n = len(component)
+    while i < n:
+        ch = component[i]
+        i += 1
+        if ch == '\\' and i < n:
+            out.append(re.escape(component[i]))
+            i += 1
+        elif ch == '*':
+            out.append('.*')
+        elif ch == '?':
+            out.append('.')
+        elif ch == '[':
+            end = i + 1 if component[i:i + 1] in ('!', '^') else i
+            # A ']' straight after the opening bracket is literal
+            end = component.find(']', end + 1)
+            if end == -1:
+                out.append(re.escape(ch))
+                continue
+            body = unescape(component[i:end])
+            negate = body[:1] in ('!', '^')
+            if negate:
+                body = body[1:]
+            body = body.replace('\\', '\\\\').replace('[', '\\[').replace('^', '\\^')
+            out.append(('[^' if negate else '[') + body + ']')
+            i = end + 1
+        else:
+            out.append(re.escape(ch))
+    return re.compile(''.join(out) + r'\Z', re.DOTALL)
+
+def brace_expand(text: str) -> List[str]:
+    """Expand {a,b} alternatives and {1..5} sequences, left to right.
+
+    $(...), ${...} and `...` are skipped, so ${A:-x,y} is left alone; text
+    without a complete brace group is returned unchanged.
+    """
+    group = _find_group(text)
+    if group is None:
+        return [text]
+    start, end, alternatives = group
+    prefix, suffix = text[:start], text[end + 1:]
+    results = []
+    for alternative in alternatives:
+        results.extend(brace_expand(prefix + alternative + suffix))
+    return results
+
+def _find_group(text: str) -> Optional[Tuple[int, int, List[str]]]:
+    """(start, end, alternatives) of the first brace group that expands"""
+    i = 0
+    n = len(text)
+    while True:
+        i = text.find('{', i)
+        if i == -1:
+            return None
+        if i and text[i - 1] == '$':
+            i = _skip(text, i - 1)
+            continue
+        end, commas = _match_brace(text, i)
+        if end is None:
+            return None
+        body = text[i + 1:end]
+        if commas:
+            parts = []
+            previous = i + 1
+            for comma in commas:
+                parts.append(text[previous:comma])
+                previous = comma + 1
+            parts.append(text[previous:end])
+            return i, end, parts
+        sequence = _sequence(body)
+        if sequence is not None:
+            return i, end, sequence
+        # Not a group itself, but one may be nested inside it
+        i += 1
+        if i >= n:
+            return None
+
+def _skip(text: str, i: int) -> int:
+    try:
+        return _scan_substitution(text, i)
+    except ParseError:
+        return i + 1
+
+def _match_brace(text: str, start: int) -> Tuple[Optional[int], List[int]]:
+    """Index of the brace closing the one at start, and its top-level commas"""
+    depth = 0
+    commas = []
+    i = start
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '$' and text[i + 1:i + 2] in ('(', '{') or ch == '`':
+            i = _skip(text, i)
+            continue
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return i, commas
+        elif ch == ',' and depth == 1:
+            commas.append(i)
+        i += 1
+    return None, commas
+
+def _sequence(body: str) -> Optional[List[str]]:
+    match = _SEQUENCE.match(body)
+    if match is None:
+        return None
+    first, last, step = match.groups()
+    step = abs(int(step)) if step and int(step) else 1
+    if first.lstrip('-').isdigit() and last.lstrip('-').isdigit():
+        a, b = int(first), int(last)
+        values = range(a, b + 1, step) if a <= b else range(a, b - 1, -step)
+        # Zero padding is kept when either end is written with it
+        padded = any(len(end.lstrip('-')) > 1 and end.lstrip('-')[0] == '0' for end in (first, last))
+        width = max(len(first), len(last)) if padded else 0
+        return [str(value).zfill(width) for value in values]
+    if first.isalpha() and last.isalpha():
+        a, b = ord(first), ord(last)
+        values = range(a, b + 1, step) if a <= b else range(a, b - 1, -step)
+        return [chr(value) for value in values]
+    return None
+
+class Globber:
+    """Pathname expansion of *, ?, [...] and ** patterns.
+
+    Each path component of a pattern is compiled once to a regex. Literal
+    components are joined on without listing their directory, so only the
+    directories a pattern can match in are read, each with one os.scandir.
+    Listings are kept in a dict the caller passes in, so several words of
+    one command share them. ** matches any number of directories, without
+    following symlinks; on large trees each level of the walk is listed
+    over a thread pool, since scandir releases the GIL.
+    """
+
+    def __init__(self, jobs: Optional[int] = None, parallel_threshold: int = 32):
+        self.jobs = jobs if jobs is not None else min(8, os.cpu_count() or 1)
+        self.parallel_threshold = parallel_threshold
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def glob(self, pattern: str, listings: Optional[Dict[str, Listing]] = None) -> List[str]:
+        """Sorted paths matching an escaped pattern; empty if none do"""
+        if listings is None:
+            listings = {}
+        components = pattern.split('/')
+        paths = ['/'] if pattern.startswith('/') else ['']
+        dir_only = len(components) > 1 and components[-1] == ''
+        components = [component for component in components if component]
+        last = len(components) - 1
+        for index, component in enumerate(components):
+            if not paths:
+                return []
+            if component == '**':
+                paths = self._walk(paths, listings, files=index == last)
+            elif not has_magic(component):
+                name = unescape(component)
+                paths = [_join(path, name) for path in paths]
+                if index == last:
+                    paths = [path for path in paths if os.path.lexists(path)]
+            else:
+                regex = compile_component(component)
+                paths = [_join(path, name)
+                         for path in paths
+                         for name, is_dir, _ in self._list(path, listings)
+                         if (is_dir or index == last) and regex.match(name)]
+        if dir_only:
+            paths = [path + '/' for path in paths if os.path.isdir(path)]
+        return sorted(paths)
+
+    def _list(self, path: str, listings: Dict[str, Listing]) -> Listing:
+        listing = listings.get(path)
+        if listing is None:
+            listing = listings[path] = _scan(path or '.')
+        return listing
+
+    def _walk(self, paths: List[str], listings: Dict[str, Listing], files: bool) -> List[str]:
+        """Every directory under paths, including them; with files, every entry below instead"""
+        found = [] if files else list(paths)
+        level = list(paths)
+        while level:
+            if len(level) >= self.parallel_threshold and self.jobs > 1:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.jobs)
+                scanned = self._executor.map(_scan, [path or '.' for path in level])
+                for path, listing in zip(level, scanned):
+                    listings[path] = listing
+            next_level = []
+            for path in level:
+                for name, is_dir, is_symlink in self._list(path, listings):
+                    if name.startswith('.'):
+                        continue
+                    child = _join(path, name)
+                    if is_dir and not is_symlink:
+                        next_level.append(child)
+                        found.append(child)
+                    elif files:
+                        found.append(child)
+            level = next_level
+        return found
+
+def _join(path: str, name: str) -> str:
+    if not path or path.endswith('/'):
+        return path + name
+    return path + '/' + name
+
+def _scan(directory: str) -> Listing:
+    try:
+        with os.scandir(directory) as entries:
+            listing = []
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                listing.append((entry.name, is_dir, entry.is_symlink()))
+            return listing
+    except OSError:
+        return []
@@ -0,0 +1,213 @@
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+from src.utils.environment import Environment
+from src.utils.job_control import process_group_kwargs
+
+# Signals Python ignores or handles that children expect at their defaults;
+# ignored signals would otherwise survive exec
+_DEFAULT_SIGNALS = tuple(
+    getattr(signal, name) for name in ('SIGPIPE', 'SIGXFSZ', 'SIGXFZ') if hasattr(signal, name)
+)
+
+# Bytes of the argument and environment strings a new process may get
+try:
+    ARG_MAX = os.sysconf('SC_ARG_MAX')
+except (AttributeError, ValueError, OSError):
+    ARG_MAX = 32767  # Windows command line limit
+# Room left for what the kernel adds, as xargs does
+_HEADROOM = 2048
+_POINTER = 8
+
+def argument_size(argv: List[str]) -> int:
+    """Bytes argv takes in a new process: the strings, terminators and pointers"""
+    return sum(len(os.fsencode(arg)) + 1 + _POINTER for arg in argv)
+
+def chunk_arguments(fixed: List[str], arguments: List[str], limit: int) -> Iterator[List[str]]:
+    """Split arguments into argvs starting with fixed, each within limit bytes"""
+    base = argument_size(fixed)
+    if base >= limit:
+        raise OSError(f"{fixed[0]}: argument list too long even without arguments")
+    chunk: List[str] = []
+    size = base
+    for arg in arguments:
+        arg_size = len(os.fsencode(arg)) + 1 + _POINTER
+        if base + arg_size > limit:
+            raise OSError(f"{fixed[0]}: argument too long: {arg[:40]}...")
+        if size + arg_size > limit and chunk:
+            yield fixed + chunk
+            chunk = []
+            size = base
+        chunk.append(arg)
+        size += arg_size
+    if chunk or not arguments:
+        yield fixed + chunk
+
+class SpawnedProcess:
+    """A child started with posix_spawn, with the parts of the Popen
+    interface the shell uses.
+    """
+
+    def __init__(self, pid: int, args: List[str], stdout=None, stderr=None):
+        self.pid = pid
+        self.args = args
+        self.stdin = None
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode: Optional[int] = None
+        # Resource usage reported when the child was reaped, where the OS has it
+        self.usage = None
+        # True once the child is gone; returncode stays None if it was reaped
+        # outside this object and its status is unknown
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def _reap(self, flags: int) -> Optional[int]:
+        if self.finished:
+            return self.returncode
+        try:
+            if hasattr(os, 'wait4'):
+                pid, status, usage = os.wait4(self.pid, flags)
+            else:
+                (pid, status), usage = os.waitpid(self.pid, flags), None
+        except ChildProcessError:
+            # Reaped by someone else: unlike Popen, do not claim success
+            self.finished = True
+            return self.returncode
+        if pid == self.pid:
+            self.returncode = os.waitstatus_to_exitcode(status)
+            self.usage = usage
+            self.finished = True
+        return self.returncode
+
+    def poll(self) -> Optional[int]:
+        # Called from the SIGCHLD handler, possibly while this same thread
+        # is blocked in wait(): never block on the lock
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            return self._reap(os.WNOHANG)
+        finally:
+            self._lock.release()
+
+    def wait(self, timeout=None) -> int:
+        if timeout is None:
+            with self._lock:
+                return self._reap(0)
+        deadline = time.monotonic() + timeout
+        delay = 0.0005
+        while self.poll() is None and not self.finished:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+        return self.returncode
+
+    def send_signal(self, sig):
+        if self.poll() is None and not self.finished:
+            os.kill(self.pid, sig)
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+class Launcher:
+    """Starts external commands, with os.posix_spawn where the OS has it.
+
+    posix_spawn runs the child through vfork on Linux, so starting a process
+    costs the same however large the shell has grown, where fork has to copy
+    its page tables. The environment is passed as an encoded block that
+    Environment rebuilds only when a variable changes. subprocess.Popen is
+    used where posix_spawn is unavailable, e.g. on Windows.
+    """
+
+    def __init__(self, environment: Optional[Environment] = None):
+        self.environment = environment if environment is not None else Environment()
+        self.use_posix_spawn = hasattr(os, 'posix_spawn')
+        self._sized_block = None
+        self._environment_size = 0
+
+    def argument_limit(self) -> int:
+        """Bytes left for a command's argv next to the current environment"""
+        block = self.environment.block()
+        if block is not self._sized_block:
+            self._environment_size = sum(len(name) + len(value) + 2 + _POINTER
+                                         for name, value in block.items())
+            self._sized_block = block
+        return ARG_MAX - self._environment_size - _HEADROOM
+
+    def spawn(self, argv: List[str], stdin=None, stdout=None, stderr=None,
+              process_group: Optional[int] = None, fds: Optional[Dict[int, Optional[int]]] = None):
+        """Start argv; stdin/stdout/stderr take the same values as for Popen,
+        and process_group puts the child in that group (0 for a new one).
+        fds maps further descriptors of the child to the descriptor dup2'd
+        there, subprocess.STDOUT for its stdout, or None to close them.
+        """
+        if not self.use_posix_spawn or stdin == subprocess.PIPE or any(
+                isinstance(spec, int) and spec < 0 and spec not in (subprocess.PIPE, subprocess.DEVNULL)
+                for spec in (stdin, stdout)) or (isinstance(stderr, int) and stderr < 0 and stderr not in (
+                    subprocess.PIPE, subprocess.DEVNULL, subprocess.STDOUT)):
+            # Writable stdin pipes are left to Popen
+            if fds:
+                raise OSError("redirecting descriptors other than 0-2 needs posix_spawn")
+            group = process_group_kwargs(process_group) if process_group is not None else {}
+            return subprocess.Popen(argv, stdin=stdin, stdout=stdout, stderr=stderr, **group)
+
+        file_actions = []
+        ours = []  # parent's ends of new pipes, as (fd, keep)
+        try:
+            streams = []
+            for target, spec in enumerate((stdin, stdout, stderr)):
+                if spec is None:
+                    streams.append(None)
+                    continue
+                if spec == subprocess.PIPE:
+                    parent, child = os.pipe()
+                    ours.append((child, False))
+                    ours.append((parent, True))
+                    streams.append(parent)
+                elif spec == subprocess.DEVNULL:
+                    child = os.open(os.devnull, os.O_RDWR)
+                    ours.append((child, False))
+                    streams.append(None)
+                elif spec == subprocess.STDOUT:
+                    # File actions run in order, so stdout is already in place
+                    child = 1
+                    streams.append(None)
+                else:
+                    child = spec if isinstance(spec, int) else spec.fileno()
+                    streams.append(None)
+                file_actions.append((os.POSIX_SPAWN_DUP2, child, target))
+            for target, source in (fds or {}).items():
+                if source is None:
+                    file_actions.append((os.POSIX_SPAWN_CLOSE, target))
+                elif source == target:
+                    # dup2 onto itself keeps close-on-exec
+                    os.set_inheritable(source, True)
+                else:
+                    file_actions.append((os.POSIX_SPAWN_DUP2, 1 if source == subprocess.STDOUT else source,
+                                         target))
+
+            spawn = os.posix_spawn if os.sep in argv[0] else os.posix_spawnp
+            kwargs = {'file_actions': file_actions, 'setsigdef': _DEFAULT_SIGNALS}
+            if process_group is not None:
+                kwargs['setpgroup'] = process_group
+            pid = spawn(argv[0], argv, self.environment.block(), **kwargs)
+        except BaseException:
+            for fd, _ in ours:
+                os.close(fd)
+            raise
+
+        # The child has its copies; the parent keeps only the read ends
+        for fd, keep in ours:
+            if not keep:
+                os.close(fd)
+        stdout_file = open(streams[1], 'rb') if streams[1] is not None else None
+        stderr_file = open(streams[2], 'rb') if streams[2] is not None else None
+        return SpawnedProcess(pid, argv, stdout_file, stderr_file)
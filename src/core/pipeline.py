@@ -0,0 +1,441 @@
+import codecs
+import contextvars
+import os
+import signal
+import subprocess
+import sys
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from src.core.launcher import Launcher, SpawnedProcess
+from src.core.redirection import COMMAND_STDOUT, SHELL_STDERR
+
+# Read size used when forwarding child output; large enough to keep syscall
+# count low on multi-GB streams, small enough to show output promptly.
+CHUNK_SIZE = 64 * 1024
+
+
+def _start_thread(target, *args) -> threading.Thread:
+    """Start a daemon thread in a copy of the caller's context, so output
+    routed through context variables (as in GUI sessions) follows it
+    """
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(target,) + args, daemon=True)
+    thread.start()
+    return thread
+
+
+def exit_status(returncode: Optional[int]) -> int:
+    """Shell status for a Popen-style return code: 128+N after signal N"""
+    if returncode is None:
+        return 1
+    return 128 - returncode if returncode < 0 else returncode
+
+
+class BuiltinStage(list):
+    """argv of a stage the shell runs itself instead of forking.
+
+    run(write) produces the stage's output through write(text) and returns
+    (success, error message).
+    """
+
+    def __init__(self, argv: List[str], run: Callable[[Callable[[str], None]], Tuple[bool, str]]):
+        super().__init__(argv)
+        self.run = run
+
+
+class _Cancelled(Exception):
+    pass
+
+
+class BuiltinProcess:
+    """A builtin stage running on a thread, with the parts of the Popen
+    interface that Pipeline and job control use.
+    """
+
+    def __init__(self, stage: BuiltinStage, sink: Callable[[str], None],
+                 close: Optional[Callable[[], None]] = None,
+                 error_sink: Optional[Callable[[str], None]] = None,
+                 error_close: Optional[Callable[[], None]] = None):
+        self.pid = os.getpid()
+        self.returncode: Optional[int] = None
+        self.stdout = None
+        self.stderr = None
+        self.error = ""
+        # Read end of the pipe this stage writes to, if the next stage reads it
+        self.pipe: Optional[int] = None
+        self._stage = stage
+        self._sink = sink
+        self._close = close
+        # Where the error message goes when stderr is redirected; otherwise
+        # it is left in error for the pipeline to report
+        self._error_sink = error_sink
+        self._error_close = error_close
+        self._cancelled = False
+        self._thread = _start_thread(self._run)
+
+    def _write(self, text):
+        if self._cancelled:
+            raise _Cancelled()
+        if text:
+            self._sink(text)
+
+    def _run(self):
+        returncode = 1
+        try:
+            success, self.error = self._stage.run(self._write)
+            returncode = 0 if success else 1
+        except BrokenPipeError:
+            # The next stage stopped reading, as with SIGPIPE
+            returncode = -signal.SIGPIPE if hasattr(signal, 'SIGPIPE') else 1
+        except _Cancelled:
+            returncode = -signal.SIGINT
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            if self.error and self._error_sink is not None:
+                try:
+                    self._error_sink(self.error + '\n')
+                    self.error = ""
+                except OSError:
+                    pass
+            for close in (self._error_close, self._close):
+                if close is not None:
+                    try:
+                        close()
+                    except OSError:
+                        pass
+            self.returncode = returncode
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout=None) -> Optional[int]:
+        self._thread.join(timeout)
+        return self.returncode
+
+    def send_signal(self, sig):
+        self._cancelled = True
+
+    def terminate(self):
+        self._cancelled = True
+
+    def kill(self):
+        self._cancelled = True
+
+
+class Pipeline:
+    """Chain of external processes connected by OS pipes.
+
+    When the shell's stdout is a real file descriptor the last stage writes to
+    it directly and its output never passes through Python. Otherwise (e.g.
+    the GUI's in-memory stream) output is forwarded chunk by chunk as raw
+    bytes, and only decoded when the target stream has no byte buffer. Every
+    stderr pipe is drained to sys.stderr on its own thread, so neither a large
+    output nor a full stderr pipe can stall the chain. Whether the pipeline
+    succeeded depends only on exit statuses, not on what went to stderr.
+
+    A stage whose argv is a BuiltinStage runs on a thread of the shell and
+    writes into an OS pipe like any other stage, so `ls | grep foo` forks
+    only grep. Builtins do not read their stdin.
+
+    redirections gives, per stage, the descriptors its redirections replace,
+    as in Redirections.fds; they take precedence over the pipes. A stage's
+    stdout sent to SHELL_STDERR goes through a pipe copied to sys.stderr.
+    """
+
+    def __init__(self, stages: List[Tuple[str, List[str]]], stdin=None, stdout=None,
+                 launcher: Optional[Launcher] = None,
+                 redirections: Optional[List[Dict[int, Optional[int]]]] = None):
+        self.stages = stages  # (display name, argv) for each stage
+        self.stdin = stdin
+        self.stdout = stdout
+        self.launcher = launcher if launcher is not None else Launcher()
+        self.redirections = redirections if redirections is not None else [{}] * len(stages)
+        self.processes = []
+        self.pgid = None
+        # Resource usage of every external stage reaped by wait(), where
+        # the OS reports it
+        self.usage = []
+        self._write_lock = threading.Lock()
+        # Stdout pipes of stages whose output goes to sys.stderr
+        self._to_stderr = []
+
+    def start(self, background=False):
+        """Spawn every stage, wiring stdout of each into stdin of the next.
+
+        Background pipelines get a process group of their own, led by the
+        first stage, so job control can signal all stages at once.
+        """
+        prev = self.stdin
+        # Read end of the previous stage's pipe, closed once its reader has it
+        owned = None
+        try:
+            for i, (_, argv) in enumerate(self.stages):
+                last = i == len(self.stages) - 1
+                fds = dict(self.redirections[i])
+                if isinstance(argv, BuiltinStage):
+                    process = self._start_builtin(argv, last, background, fds.get(1, self), fds.get(2, self))
+                    if owned is not None:
+                        # Nothing reads it: earlier stages see a closed pipe
+                        self._close(owned)
+                    owned = prev = None if last else process.pipe
+                    self.processes.append(process)
+                    continue
+
+                to_stderr = self._shell_stderr(fds, background)
+                stdin = fds.pop(0) if fds.get(0) is not None else prev
+                if to_stderr:
+                    stdout = subprocess.PIPE
+                elif fds.get(1) is not None:
+                    stdout = fds.pop(1)
+                elif not last:
+                    stdout = subprocess.PIPE
+                elif self.stdout is not None or background:
+                    stdout = self.stdout
+                else:
+                    stdout = self._terminal_fd()
+                    if stdout is None:
+                        stdout = subprocess.PIPE
+                if fds.get(2) is not None:
+                    stderr = fds.pop(2)
+                else:
+                    stderr = None if background else subprocess.PIPE
+
+                process = self.launcher.spawn(
+                    argv,
+                    stdin=stdin,
+                    stdout=stdout,
+                    stderr=stderr,
+                    process_group=(self.pgid or 0) if background else None,
+                    fds=fds,
+                )
+                if background and self.pgid is None:
+                    self.pgid = process.pid
+                # The child holds its own copy of the read end now
+                if owned is not None:
+                    self._close(owned)
+                self.processes.append(process)
+                if to_stderr:
+                    self._to_stderr.append(process.stdout)
+                    process.stdout = None
+                owned = prev = None if last else process.stdout
+                if not last and prev is None:
+                    # Output was redirected: the next stage reads nothing
+                    owned = prev = os.open(os.devnull, os.O_RDONLY)
+        except Exception:
+            if owned is not None:
+                self._close(owned)
+            self.kill()
+            raise
+        return self.processes
+
+    @staticmethod
+    def _shell_stderr(fds, background) -> bool:
+        """Resolve SHELL_STDERR sources in a stage's fds; True if its stdout
+        is to be copied to sys.stderr
+        """
+        to_stderr = False
+        for target, source in list(fds.items()):
+            if source != SHELL_STDERR:
+                continue
+            if target == 2 and not background:
+                # Unredirected stderr is drained to sys.stderr already
+                del fds[2]
+            elif target == 1 and not background:
+                del fds[1]
+                to_stderr = True
+            else:
+                # Nothing is left to copy it once a background job is
+                # detached; it writes to the shell's own descriptor 2
+                fds[target] = 2
+        return to_stderr
+
+    def _start_builtin(self, stage: BuiltinStage, last: bool, background: bool,
+                       redirected=None, error_redirected=None) -> BuiltinProcess:
+        """Run a builtin stage on a thread, writing to a pipe or the final output.
+
+        redirected and error_redirected are what its stdout and stderr are
+        redirected to, as in Redirections.fds, or the pipeline itself if they
+        are not redirected. An error message goes where its stderr does.
+        """
+        error_sink = error_close = None
+        if error_redirected is None:
+            error_sink = lambda text: None
+        elif error_redirected is not self and error_redirected not in (COMMAND_STDOUT, SHELL_STDERR):
+            errors = open(os.dup(error_redirected), 'wb')
+            error_sink, error_close = self._encoder(errors.write), errors.close
+
+        def start(sink, close=None) -> BuiltinProcess:
+            # 2>&1 sends the error along with the output
+            return BuiltinProcess(stage, sink, close,
+                                  sink if error_redirected == COMMAND_STDOUT else error_sink, error_close)
+
+        if redirected == SHELL_STDERR:
+            process = start(lambda text: self._write(text, sys.stderr))
+            if not last:
+                process.pipe = os.open(os.devnull, os.O_RDONLY)
+            return process
+        if redirected is not self:
+            # Writes are buffered, so large outputs take few system calls
+            sink = open(os.dup(redirected), 'wb', buffering=CHUNK_SIZE) if redirected is not None \
+                else open(os.devnull, 'wb')
+            process = start(self._encoder(sink.write), sink.close)
+            if not last:
+                process.pipe = os.open(os.devnull, os.O_RDONLY)
+            return process
+        if not last:
+            read_fd, write_fd = os.pipe()
+            sink = open(write_fd, 'wb', buffering=CHUNK_SIZE)
+            process = start(self._encoder(sink.write), sink.close)
+            process.pipe = read_fd
+            return process
+        if self.stdout is not None:
+            try:
+                # A copy of its own: the caller may close stdout before a
+                # background stage is done with it
+                sink = open(os.dup(self.stdout.fileno()), 'wb', buffering=CHUNK_SIZE)
+            except (AttributeError, OSError, ValueError):
+                return start(self._encoder(self.stdout.write))
+            return start(self._encoder(sink.write), sink.close)
+        return start(self._write)
+
+    @staticmethod
+    def _encoder(write):
+        return lambda text: write(text.encode('utf-8', errors='surrogateescape'))
+
+    @staticmethod
+    def _close(stream):
+        if isinstance(stream, int):
+            os.close(stream)
+        else:
+            stream.close()
+
+    def wait(self) -> bool:
+        """Stream output until every stage exits; True if the pipeline succeeded"""
+        drainers = []
+        for (name, _), process in zip(self.stages, self.processes):
+            if process.stderr is not None:
+                drainers.append(_start_thread(self._drain_stderr, name, process.stderr))
+        for stream in self._to_stderr:
+            drainers.append(_start_thread(self._forward, stream, sys.stderr))
+
+        try:
+            last = self.processes[-1]
+            if self.stdout is None and last.stdout is not None:
+                self._forward(last.stdout)
+            for process in self.processes:
+                self._reap(process)
+            for thread in drainers:
+                thread.join()
+        except BaseException:
+            self.kill()
+            raise
+
+        for (name, _), process in zip(self.stages, self.processes):
+            if isinstance(process, BuiltinProcess) and process.error:
+                label = f"Error in {name}: " if len(self.stages) > 1 else ""
+                self._write(f"{label}{process.error}\n", sys.stderr)
+
+        return self.processes[-1].returncode == 0
+
+    @property
+    def status(self) -> int:
+        """Exit status of the pipeline once waited for, as $? reports it"""
+        return exit_status(self.processes[-1].returncode) if self.processes else 0
+
+    def _reap(self, process):
+        """Wait for a stage, keeping its CPU time and peak memory if available"""
+        if isinstance(process, SpawnedProcess):
+            # It reaps itself, so the status job control records is the same
+            process.wait()
+            if process.usage is not None:
+                self.usage.append(process.usage)
+            return
+        if isinstance(process, BuiltinProcess) or not hasattr(os, 'wait4') or process.returncode is not None:
+            process.wait()
+            return
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            # Already reaped through the Popen object
+            process.wait()
+            return
+        process.returncode = os.waitstatus_to_exitcode(status)
+        self.usage.append(usage)
+
+    def kill(self):
+        """Kill any stage that is still running"""
+        for process in self.processes:
+            try:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+            except OSError:
+                pass
+
+    def interrupt(self):
+        """Send SIGINT to every running stage, as Ctrl-C in a terminal would"""
+        for process in self.processes:
+            try:
+                if process.poll() is None:
+                    if os.name == 'nt':
+                        process.terminate()
+                    else:
+                        process.send_signal(signal.SIGINT)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _terminal_fd():
+        """File descriptor behind sys.stdout, or None if it is not backed by one"""
+        try:
+            fd = sys.stdout.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+        # Anything already printed must land before the child's output
+        sys.stdout.flush()
+        return fd
+
+    def _forward(self, stream, target=None):
+        """Copy a child's stdout to sys.stdout, or target, as it arrives"""
+        buffer = getattr(sys.stdout, 'buffer', None) if target is None else None
+        decoder = None
+        if buffer is None:
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        fd = stream.fileno()
+        try:
+            while True:
+                chunk = os.read(fd, CHUNK_SIZE)
+                if not chunk:
+                    break
+                if decoder is None:
+                    self._write_bytes(buffer, chunk)
+                else:
+                    self._write(decoder.decode(chunk), target)
+            if decoder is not None:
+                self._write(decoder.decode(b'', final=True), target)
+        finally:
+            stream.close()
+
+    def _drain_stderr(self, name, stream):
+        """Report a stage's stderr line by line until it closes"""
+        label = f"Error in {name}: " if len(self.stages) > 1 else ""
+        try:
+            for line in iter(stream.readline, b''):
+                text = line.decode('utf-8', errors='replace').rstrip('\r\n')
+                self._write(f"{label}{text}\n", sys.stderr)
+        finally:
+            stream.close()
+
+    def _write_bytes(self, buffer, data):
+        with self._write_lock:
+            sys.stdout.flush()
+            buffer.write(data)
+            buffer.flush()
+
+    def _write(self, text, stream=None):
+        if not text:
+            return
+        with self._write_lock:
+            stream = stream if stream is not None else sys.stdout
+            stream.write(text)
+            stream.flush()
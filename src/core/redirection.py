@@ -0,0 +1,189 @@
+import codecs
+import os
+import subprocess
+import sys
+import threading
+from typing import Callable, Dict, List, Optional
+from src.core.command_parser import Redirect, Word
+
+# Source meaning "the command's own stdout", for 2>&1 before stdout is known
+COMMAND_STDOUT = subprocess.STDOUT
+# Source meaning "the shell's sys.stderr", for >&2 when sys.stderr is not
+# backed by descriptor 2, as in the GUI; output sent there is written to it
+SHELL_STDERR = -4
+# Buffer of builtin output written to a redirected descriptor
+WRITE_BUFFER = 64 * 1024
+# Here-documents up to this size are written before the command starts;
+# a pipe holds at least this much, so the write cannot block
+_INLINE_BODY = 4096
+
+_FILE_FLAGS = {
+    '<': os.O_RDONLY,
+    '>': os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+    '>>': os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+    '&>': os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+    '&>>': os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+}
+
+class RedirectionError(ValueError):
+    """Raised when a redirection cannot be set up, e.g. a file cannot be opened"""
+
+class Redirections:
+    """The descriptors one command's redirections give it.
+
+    fds maps each redirected descriptor of the command to the descriptor it
+    gets there through dup2, or to None if it is closed. Redirections apply
+    left to right, so '> out 2>&1' and '2>&1 > out' differ as in other
+    shells. Files are opened once with os.open; here-documents and
+    here-strings become pipes, fed by a thread when the body is too large
+    to write up front. Everything opened is closed by close(), once the
+    command has its own copies, however it ends.
+    """
+
+    def __init__(self):
+        self.fds: Dict[int, Optional[int]] = {}
+        self._owned: List[int] = []
+
+    @classmethod
+    def open(cls, redirects: List[Redirect], expand: Callable[[Word], str]) -> 'Redirections':
+        """Set up redirects, expanding their targets with expand"""
+        redirections = cls()
+        try:
+            for redirect in redirects:
+                redirections.add(redirect, expand)
+        except BaseException:
+            redirections.close()
+            raise
+        return redirections
+
+    def add(self, redirect: Redirect, expand: Callable[[Word], str]):
+        fd, op = redirect.fd, redirect.op
+        if op in ('<<', '<<-', '<<<'):
+            body = expand(redirect.target)
+            if op == '<<<':
+                body += '\n'
+            self.fds[fd] = self._feed(body.encode('utf-8', errors='surrogateescape'))
+            return
+        target = expand(redirect.target)
+        if op in ('>&', '<&'):
+            if target == '-':
+                self.fds[fd] = None
+                return
+            if target.isdigit():
+                self.fds[fd] = self._source(int(target))
+                if self.fds[fd] == fd:
+                    del self.fds[fd]
+                return
+            if op == '<&' or fd != 1:
+                raise RedirectionError(f"{target}: ambiguous redirect")
+            op = '&>'
+        opened = self._open(target, _FILE_FLAGS[op])
+        if op in ('&>', '&>>'):
+            self.fds[1] = self.fds[2] = opened
+        else:
+            self.fds[fd] = opened
+
+    def _source(self, fd: int) -> int:
+        """What duplicating fd refers to at this point of the redirections"""
+        if fd in self.fds:
+            source = self.fds[fd]
+            if source is None:
+                raise RedirectionError(f"{fd}: bad file descriptor")
+            return source
+        if fd == 1:
+            return COMMAND_STDOUT
+        if fd == 2 and not _stderr_is_fd():
+            return SHELL_STDERR
+        if fd > 2:
+            try:
+                os.fstat(fd)
+            except OSError:
+                raise RedirectionError(f"{fd}: bad file descriptor")
+        return fd
+
+    def _open(self, path: str, flags: int) -> int:
+        try:
+            fd = os.open(path, flags, 0o666)
+        except OSError as e:
+            raise RedirectionError(f"{path}: {e.strerror}")
+        self._owned.append(fd)
+        return fd
+
+    def _feed(self, data: bytes) -> int:
+        """Read end of a pipe that delivers data and then end of file"""
+        read_fd, write_fd = os.pipe()
+        self._owned.append(read_fd)
+        if len(data) <= _INLINE_BODY:
+            try:
+                os.write(write_fd, data)
+            finally:
+                os.close(write_fd)
+        else:
+            # The writer stops with EPIPE if the command exits without
+            # reading it all, once close() drops our read end
+            threading.Thread(target=_write_all, args=(write_fd, data), daemon=True).start()
+        return read_fd
+
+    def writer(self, fd: int):
+        """Buffered binary file for a builtin writing to fd, or None if fd
+        goes where it would anyway
+        """
+        if fd not in self.fds:
+            return None
+        source = self.fds[fd]
+        if source == COMMAND_STDOUT:
+            return None
+        if source is None:
+            return open(os.devnull, 'wb')
+        if source == SHELL_STDERR:
+            return StderrWriter()
+        return open(os.dup(source), 'wb', buffering=WRITE_BUFFER)
+
+    def close(self):
+        owned, self._owned = self._owned, []
+        for fd in owned:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class StderrWriter:
+    """Binary writer decoding what it is given into sys.stderr"""
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    def write(self, data: bytes) -> int:
+        text = self._decoder.decode(data)
+        if text:
+            sys.stderr.write(text)
+        return len(data)
+
+    def close(self):
+        text = self._decoder.decode(b'', final=True)
+        if text:
+            sys.stderr.write(text)
+        sys.stderr.flush()
+
+def _stderr_is_fd() -> bool:
+    """Whether sys.stderr writes to descriptor 2, so dup'ing 2 reaches it"""
+    try:
+        return sys.stderr.fileno() == 2
+    except (AttributeError, OSError, ValueError):
+        return False
+
+def _write_all(fd: int, data: bytes):
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
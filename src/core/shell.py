@@ -1,17 +1,28 @@
+import contextlib
+import io
 import os
 import subprocess
-import readline
-import glob
-import signal
-import argparse
-from typing import Dict, Optional
+import sys
+import time
+from functools import partial
+from typing import Dict, List, Optional
 from src.commands.built_ins import BuiltInCommands
-from src.core.command_parser import CommandParser
+from src.core.command_parser import CommandParser, IncompleteInput, ParseError
+from src.core.completion import CompletionEngine
 from src.core.executable_finder import ExecutableFinder
+from src.core.expansion import Expander, ExpansionError, is_assignment, is_pattern
+from src.core.launcher import Launcher, argument_size, chunk_arguments
+from src.core.pipeline import BuiltinStage, Pipeline, _Cancelled
+from src.core.redirection import COMMAND_STDOUT, RedirectionError, Redirections
 from src.utils.helpers import ShellPrompt
 from src.utils.aliases import AliasManager
+from src.utils.environment import Environment
+from src.utils.instrumentation import CommandTiming, Instrumentation
+from src.utils.job_control import JobControl
 
 def parse_args():
+    import argparse
+
     parser = argparse.ArgumentParser(description='Custom Python Shell')
     parser.add_argument('--init-file', help='Shell initialization file')
     parser.add_argument('--no-prompt', action='store_true', help='Disable custom prompt')
@@ -19,20 +30,29 @@ def parse_args():
     return parser.parse_args()
 
 class Shell:
-    # Add class variable for alias manager
-    alias_manager = AliasManager()
+    # PATH index shared with the `hash` builtin
+    executable_finder = ExecutableFinder()
+    HISTORY_FILE = os.environ.get('HISTFILE', '~/.myshell_history')
+    # Interactive sessions load and save aliases here
+    RC_FILE = os.environ.get('MYSHELLRC', '~/.myshellrc')
+    # Command timings are also appended here as JSON lines, if set
+    STATS_LOG = os.environ.get('MYSHELL_STATS_LOG')
     
-    def __init__(self):
+    def __init__(self, interactive=True):
         self.running = True
+        self.interactive = interactive
         self.prompt = "myshell> "  # Add this line
-        self.prompt_generator = ShellPrompt()
-        self.parser = CommandParser()
-        self.executor = ExecutableFinder()
+        # Batch mode never shows a prompt, so skip the user/host lookups
+        self.prompt_generator = ShellPrompt() if interactive else None
+        # Aliases belong to this shell; interactive ones load them from RC_FILE
+        self.alias_manager = AliasManager()
+        self.parser = CommandParser(aliases=self.alias_manager)
+        self.executor = self.executable_finder
         self.built_ins = {
             'cd': BuiltInCommands.cd,
             'pwd': BuiltInCommands.pwd,
             'exit': BuiltInCommands.exit,
-            'aliases': BuiltInCommands.aliases,  # Add aliases command
+            'aliases': partial(BuiltInCommands.aliases, alias_manager=self.alias_manager),
             'ls': BuiltInCommands.ls,
             'clear': BuiltInCommands.clear,
             'echo': BuiltInCommands.echo,
@@ -42,243 +62,530 @@ class Shell:
             'mkdir': BuiltInCommands.mkdir
         }
         
-        # Initialize readline with tab completion
-        readline.set_completer_delims(' \t\n=')
-        readline.set_completer(self._path_completer)
-        readline.parse_and_bind('tab: complete')
+        # Scripts are not recorded; interactive sessions share the history file
+        self.history = BuiltInCommands.history_manager
+        if interactive:
+            self.history.open(self.HISTORY_FILE, use_readline=True)
+            self.history.load_history()
+            from src.utils.config import ShellConfig
+
+            self.alias_manager.load(ShellConfig(self.RC_FILE))
+
+        # Commands complete from builtins, aliases and the PATH index; the
+        # dicts are shared, so builtins registered below are included
+        self.completer = CompletionEngine(self.executable_finder, self.built_ins,
+                                          self.alias_manager.aliases)
+        self._completions = []
+
+        # Initialize readline with tab completion; imported here so that
+        # batch mode never pays for it
+        if interactive:
+            import readline
+
+            readline.set_completer_delims(' \t\n=')
+            # readline appends nothing; candidates end in '/' or a space
+            readline.set_completer(self.completer.complete)
+            readline.parse_and_bind('tab: complete')
 
         self.built_ins.update({
             'cp': BuiltInCommands.cp,
             'mv': BuiltInCommands.mv,
             'rm': BuiltInCommands.rm,
-            'history': BuiltInCommands.history,
-            'aliases': BuiltInCommands.aliases
+            'hash': BuiltInCommands.hash,
+            'history': BuiltInCommands.history
         })
-        
-        self.background_processes: Dict[int, subprocess.Popen] = {}
+
+        # Builtins that produce output in chunks instead of one string
+        self.streaming_builtins = {
+            'ls': BuiltInCommands.iter_ls,
+            'echo': BuiltInCommands.iter_echo,
+        }
+
+        self.job_control = JobControl()
+        for name in ('jobs', 'fg', 'bg', 'wait', 'kill'):
+            self.built_ins[name] = partial(getattr(BuiltInCommands, name),
+                                           job_control=self.job_control)
+
+        # External commands are started through posix_spawn where possible
+        self.environment = Environment()
+        self.launcher = Launcher(self.environment)
+        self.built_ins['export'] = partial(BuiltInCommands.export, environment=self.environment)
+        # parallel starts its jobs the same way and streams their output
+        self.built_ins['parallel'] = partial(BuiltInCommands.parallel, launcher=self.launcher)
+        self.streaming_builtins['parallel'] = partial(BuiltInCommands.iter_parallel,
+                                                      launcher=self.launcher)
+        # Words are expanded against the same environment just before running
+        self.expander = Expander(self.environment, substitute=self.capture_output,
+                                 status=lambda: self.last_status,
+                                 last_background=lambda: self.last_background_pid,
+                                 parameters=lambda: self.parameters)
+        self.last_background_pid = None
+        # $0 followed by the positional parameters $1, $2, ...
+        self.parameters = ['myshell']
+
+        self.instrumentation = Instrumentation(log_file=self.STATS_LOG)
+        self.built_ins['stats'] = partial(BuiltInCommands.stats,
+                                          instrumentation=self.instrumentation)
+        # Timings being measured: the command line, and a timed pipeline
+        # within it; lookups, spawns and child usage count towards all
+        self._timings: List[CommandTiming] = []
+        self.last_status = 0
+        self.exit_status = None
+        # Wall time of the last interactive command, for the prompt
+        self.last_duration = None
+        # Foreground pipeline being waited on, so interrupt() can reach it
+        self.foreground: Optional[Pipeline] = None
+        # Whether a builtin running in the shell itself stops when interrupted
+        self._cancellable = False
+        self._interrupted = False
 
     def _path_completer(self, text, state):
         """Complete file and directory paths"""
-        # Get the current line and word being completed
-        line = readline.get_line_buffer()
-        
-        # Handle empty input
-        if not text:
-            text = '.'
-            
-        # Expand user paths (e.g. ~/)
-        if text.startswith('~'):
-            text = os.path.expanduser(text)
-            
-        # Get matching paths
-        matches = glob.glob(text + '*')
-        
-        # Add trailing slash to directories
-        matches = [f"{m}{'/' if os.path.isdir(m) else ' '}" for m in matches]
-        
-        # Return the state-th match or None if no more matches
+        if state == 0:
+            self._completions = self.completer.complete_path(text)
         try:
-            return matches[state]
+            return self._completions[state]
         except IndexError:
             return None
 
     def _command_completer(self, text, state):
-        """Complete built-in commands"""
-        commands = list(self.built_ins.keys())
-        matches = [cmd for cmd in commands if cmd.startswith(text)]
+        """Complete command names"""
+        if state == 0:
+            self._completions = self.completer.complete_command(text)
         try:
-            return matches[state]
+            return self._completions[state]
         except IndexError:
             return None
 
+    @property
+    def background_processes(self) -> Dict[int, subprocess.Popen]:
+        """Last process of every background job, keyed by pid"""
+        return {job.pid: job.processes[-1] for job in self.job_control.list_jobs()}
+
     def _check_background_processes(self):
-        """Check and clean up finished background processes"""
-        finished = []
-        for pid, process in self.background_processes.items():
-            if process.poll() is not None:
-                finished.append(pid)
-                print(f"[{pid}] Done")
-        
-        for pid in finished:
-            del self.background_processes[pid]
+        """Report background jobs that finished since the last prompt"""
+        for job in self.job_control.take_finished():
+            print(f"[{job.job_id}]+  {job.status:<24}{job.command}")
 
-    def execute_piped_commands(self, commands, is_background=False, stdin=None, stdout=None):
-        """Execute a series of piped commands with proper stream handling"""
-        processes = []
-        prev_pipe = stdin
-        
+    def _resolve_commands(self, commands):
+        """Look up every stage once; returns (name, argv) stages or None"""
+        stages = []
+        started = time.perf_counter()
         try:
-            # Validate all commands first
             for cmd, args in commands:
+                if cmd in self.built_ins:
+                    stages.append((cmd, self._builtin_stage(cmd, args)))
+                    continue
                 executable = self.executor.find_executable(cmd)
                 if not executable:
-                    print(f"Command not found: {cmd}")
-                    return False
+                    print(f"Command not found: {cmd}", file=sys.stderr)
+                    return None
+                stages.append((cmd, [executable] + args))
+            return stages
+        finally:
+            elapsed = time.perf_counter() - started
+            for timing in self._timings:
+                timing.lookup += elapsed
 
-            # Create pipes
-            for i, (cmd, args) in enumerate(commands):
-                executable = self.executor.find_executable(cmd)
-                
-                # Setup pipes
-                if i < len(commands) - 1:
-                    read_fd, write_fd = os.pipe()
-                    next_pipe = write_fd
-                else:
-                    next_pipe = stdout
+    def _builtin_stage(self, name, args) -> BuiltinStage:
+        """A builtin as a pipeline stage, run on a thread instead of forked"""
+        stream = self.streaming_builtins.get(name)
 
-                try:
-                    process = subprocess.Popen(
-                        [executable] + args,
-                        stdin=prev_pipe,
-                        stdout=next_pipe if next_pipe else subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True,
-                        bufsize=1  # Line buffered
-                    )
-                    
-                    processes.append(process)
-                    
-                    # Setup for next iteration
-                    if i < len(commands) - 1:
-                        os.close(write_fd)
-                        prev_pipe = read_fd
-
-                except Exception as e:
-                    print(f"Error starting process {cmd}: {e}")
-                    return False
-
-            # Background process handling
-            if is_background:
-                pid = processes[-1].pid
-                self.background_processes[pid] = processes[-1]
-                print(f"[{pid}] Running in background")
-                return True
-
-            # Wait and collect output
-            success = True
-            for i, process in enumerate(processes):
-                try:
-                    output, error = process.communicate()
-                    if error:
-                        print(f"Error in {commands[i][0]}: {error.strip()}")
-                        success = False
-                    if i == len(processes) - 1 and output and not stdout:
-                        print(output.strip())
-                except Exception as e:
-                    print(f"Error in process communication: {e}")
-                    success = False
+        def run(write):
+            if stream is not None:
+                return BuiltInCommands.write_stream(stream(args), write)
+            if name in ('cd', 'exit'):
+                # As in a subshell, these cannot affect the shell itself
+                return True, ""
+            success, output = self.built_ins[name](args)
+            if not success:
+                return False, output
+            if output:
+                write(output + '\n')
+            return True, ""
 
-            return success
+        return BuiltinStage([name] + args, run)
 
-        except Exception as e:
-            print(f"Pipe execution failed: {e}")
+    def execute_piped_commands(self, commands, is_background=False, stdin=None, stdout=None):
+        """Execute a series of piped commands, streaming output as it is produced"""
+        stages = self._resolve_commands(commands)
+        if stages is None:
             return False
-            
+        return self._run_stages(stages, is_background, stdin, stdout) == 0
+
+    def _run_stages(self, stages, is_background=False, stdin=None, stdout=None, redirections=None) -> int:
+        """Run already-resolved pipeline stages; returns their exit status"""
+        pipeline = Pipeline(stages, stdin=stdin, stdout=stdout, launcher=self.launcher,
+                            redirections=redirections)
+        started = time.perf_counter()
+        try:
+            processes = pipeline.start(background=is_background)
+        except Exception as e:
+            print(f"Error starting process: {e}", file=sys.stderr)
+            return 1
         finally:
-            # Clean up processes and file descriptors
-            for process in processes:
-                try:
-                    if process.poll() is None:
-                        process.kill()
-                except:
-                    pass
+            elapsed = time.perf_counter() - started
+            for timing in self._timings:
+                timing.spawn += elapsed
+
+        # Background process handling
+        if is_background:
+            command = ' | '.join(' '.join([name] + argv[1:]) for name, argv in stages)
+            job = self.job_control.add_job(processes, command, pipeline.pgid)
+            print(f"[{job.job_id}] {job.pid}")
+            self.last_background_pid = job.pid
+            return 0
+
+        self.foreground = pipeline
+        try:
+            pipeline.wait()
+            return pipeline.status
+        except Exception as e:
+            print(f"Pipe execution failed: {e}", file=sys.stderr)
+            return 1
+        finally:
+            self.foreground = None
+            for usage in pipeline.usage:
+                for timing in self._timings:
+                    timing.add_usage(usage)
+
+    def interrupt(self) -> bool:
+        """Interrupt the running command line from another thread; False if
+        nothing running could be interrupted
+        """
+        self._interrupted = True
+        pipeline = self.foreground
+        if pipeline is None:
+            # A streaming builtin stops at its next chunk of output
+            return self._cancellable
+        pipeline.interrupt()
+        return True
 
     def execute_command(self, user_input):
-        """Execute command with proper error handling"""
-        if not user_input.strip():
+        """Execute a command line with proper error handling"""
+        if not user_input or not user_input.strip():
             return
 
-        # Update unpacking to match parser return values
-        command, args, is_background, piped_commands, input_file, output_file = self.parser.parse(user_input)
-        
-        if not command:
-            return
-            
+        self._interrupted = False
+        timing = CommandTiming(user_input.strip())
+        self._timings.append(timing)
         try:
-            if piped_commands:
-                # Handle piped commands
-                for cmd, _ in [(command, args)] + piped_commands:
-                    if not self.executor.find_executable(cmd):
-                        print(f"Command not found: {cmd}")
-                        return
-                        
-                self.execute_piped_commands(
-                    [(command, args)] + piped_commands,
-                    is_background,
-                    input_file,
-                    output_file
-                )
+            self._execute_line(user_input, timing)
+        finally:
+            self._timings.remove(timing)
+            timing.finish(self.last_status)
+            self.instrumentation.record(timing)
+
+    def _execute_line(self, user_input, timing):
+        started = time.perf_counter()
+        try:
+            command_list = self.parser.parse_line(user_input)
+        except ParseError as e:
+            print(e, file=sys.stderr)
+            self.last_status = 2
+            return
+        finally:
+            timing.parse = time.perf_counter() - started
+
+        run_next = True
+        for pipeline, op in command_list.items:
+            if run_next:
+                self.execute_pipeline(pipeline, op == '&')
+            if self._interrupted:
+                # As with Ctrl-C in a terminal, the rest of the line is abandoned
+                self.last_status = 130
+                break
+            if not self.running:
+                # `exit` ends the line as well as the shell
+                break
+            # && and || make the next pipeline depend on this status
+            if op == '&&':
+                run_next = self.last_status == 0
+            elif op == '||':
+                run_next = self.last_status != 0
             else:
-                # Handle single command
-                if command in self.built_ins:
-                    success, output = self.built_ins[command](args)
-                    if output:
-                        if output_file:
-                            with open(output_file, 'w') as f:
-                                f.write(output)
-                        else:
-                            print(output)
-                    return
-
-                executable = self.executor.find_executable(command)
-                if not executable:
-                    print(f"Command not found: {command}")
-                    return
+                run_next = True
 
+    def capture_output(self, command) -> str:
+        """Run a command line and return what it printed to stdout, for $(...).
+
+        Builtins run in-process and write straight into the buffer; external
+        commands are read through a pipe since the buffer has no descriptor.
+        Errors still go to sys.stderr and are never part of the result.
+        As in a subshell, the working directory, variables and positional
+        parameters are put back afterwards, and `exit` leaves only the
+        substitution.
+        """
+        running, exit_status = self.running, self.exit_status
+        parameters = list(self.parameters)
+        variables = self.environment.snapshot()
+        try:
+            cwd = os.getcwd()
+        except OSError:
+            cwd = None
+        buffer = io.StringIO()
+        # GUI sessions route sys.stdout per session and redirect only their own
+        redirect = getattr(sys.stdout, 'redirect', contextlib.redirect_stdout)
+        try:
+            with redirect(buffer):
+                self.execute_command(command)
+        finally:
+            self.running, self.exit_status = running, exit_status
+            self.parameters = parameters
+            self.environment.restore(variables)
+            if cwd is not None:
                 try:
-                    process = subprocess.Popen(
-                        [executable] + args,
-                        stdin=open(input_file, 'r') if input_file else None,
-                        stdout=open(output_file, 'w') if output_file else subprocess.PIPE,
-                        stderr=subprocess.PIPE,
-                        text=True
-                    )
-
-                    if is_background:
-                        self.background_processes[process.pid] = process
-                        print(f"[{process.pid}] Running in background")
-                    else:
-                        output, error = process.communicate()
-                        if error:
-                            print(error.strip())
-                        if output and not output_file:
-                            print(output.strip())
-
-                except Exception as e:
-                    print(f"Error executing command: {e}")
-                    
+                    os.chdir(cwd)
+                except OSError:
+                    pass
+        return buffer.getvalue()
+
+    def execute_pipeline(self, pipeline, is_background=False):
+        """Execute one parsed pipeline and record its exit status"""
+        timing = None
+        first = pipeline.commands[0] if pipeline.commands else None
+        if first is not None and first.words and first.words[0].value == 'time' and not first.words[0].quoted:
+            # `time pipeline` reports on the whole pipeline, as in other shells
+            first = first._replace(words=first.words[1:])
+            pipeline = pipeline._replace(commands=(first,) + pipeline.commands[1:])
+            timing = CommandTiming(' | '.join(' '.join(command.argv) for command in pipeline.commands))
+            if self._timings:
+                timing.parse = self._timings[0].parse
+            self._timings.append(timing)
+        try:
+            self.last_status = self._execute_pipeline(pipeline, is_background)
         except Exception as e:
-            print(f"Error: {e}")
+            print(f"Error: {e}", file=sys.stderr)
+            self.last_status = 1
+        if timing is not None:
+            self._timings.remove(timing)
+            timing.finish(self.last_status)
+            sys.stdout.flush()
+            print(timing.report(), file=sys.stderr)
+
+    def _execute_pipeline(self, pipeline, is_background) -> int:
+        commands = []
+        redirects = []
+        expand = self.expander.expand
+        # With `chunked cmd ...`, argv index from which arguments are batched
+        chunk_from = None
+        try:
+            if len(pipeline.commands) == 1 and self._assign(pipeline.commands[0]):
+                return 0
+            for command in pipeline.commands:
+                words = command.words
+                if (len(pipeline.commands) == 1 and len(words) > 1 and words[0].value == 'chunked'
+                        and not words[0].quoted):
+                    # Words before the first pattern are repeated in every batch
+                    words = words[1:]
+                    split = next((i for i, word in enumerate(words) if is_pattern(word)), 1)
+                    fixed = expand(words[:split])
+                    argv = fixed + expand(words[split:])
+                    chunk_from = len(fixed)
+                else:
+                    argv = expand(words)
+                if argv:
+                    commands.append((argv[0], argv[1:]))
+                    redirects.append(command.redirects)
+                elif command.redirects:
+                    # As in other shells, `> file` alone creates or truncates file
+                    Redirections.open(command.redirects, self.expander.expand_unsplit).close()
+            if not commands:
+                return 0
+            with contextlib.ExitStack() as stack:
+                redirections = [stack.enter_context(Redirections.open(command_redirects,
+                                                                      self.expander.expand_unsplit))
+                                for command_redirects in redirects]
+                # Leaving the block closes every descriptor opened for the
+                # redirections; children and builtin threads have their own
+                return self._run_commands(commands, redirections, is_background, chunk_from)
+        except (ExpansionError, RedirectionError) as e:
+            print(e, file=sys.stderr)
+            return 1
+
+    def _run_commands(self, commands, redirections, is_background, chunk_from) -> int:
+        if len(commands) == 1 and commands[0][0] in self.built_ins:
+            # Handle single built-in command
+            command, args = commands[0]
+            if command == 'exit':
+                # Stop reading input; scripts exit with the given status
+                self.running = False
+                self.exit_status = int(args[0]) if args and args[0].isdigit() else self.last_status
+                return self.exit_status
+            return 0 if self._run_builtin(command, args, redirections[0]) else 1
+
+        stages = self._resolve_commands(commands)
+        if stages is None:
+            # As in other shells: 127 for a command that is not found
+            return 127
+        fds = [redirection.fds for redirection in redirections]
+        if chunk_from is not None:
+            return self._run_chunked(stages[0], chunk_from, fds[0])
+        if not self._check_arguments(stages):
+            # and 126 for one that cannot be executed
+            return 126
+        return self._run_stages(stages, is_background, redirections=fds)
+
+    def _run_builtin(self, command, args, redirections) -> bool:
+        """Run a builtin in the shell, its output going where its redirections say"""
+        out = redirections.writer(1)
+        err = redirections.writer(2)
+        try:
+            write = Pipeline._encoder(out.write) if out is not None else sys.stdout.write
+            if command in self.streaming_builtins:
+                # Chunks are written as they are produced; an interrupt stops
+                # the builtin at its next one
+                def write_chunk(text):
+                    if self._interrupted:
+                        raise _Cancelled()
+                    write(text)
+
+                self._cancellable = True
+                try:
+                    success, output = BuiltInCommands.write_stream(self.streaming_builtins[command](args),
+                                                                   write_chunk)
+                except _Cancelled:
+                    success, output = False, ""
+                finally:
+                    self._cancellable = False
+            else:
+                success, output = self.built_ins[command](args)
+                if success and output:
+                    write(output + '\n')
+            if not success and output:
+                if err is not None:
+                    err.write(output.encode('utf-8', errors='surrogateescape') + b'\n')
+                elif redirections.fds.get(2) == COMMAND_STDOUT:
+                    write(output + '\n')
+                else:
+                    print(output, file=sys.stderr)
+            return success
+        finally:
+            for f in (out, err):
+                if f is not None:
+                    f.close()
+
+    def _check_arguments(self, stages) -> bool:
+        """Refuse external commands whose argv would not fit in a new process"""
+        limit = None
+        for name, argv in stages:
+            if isinstance(argv, BuiltinStage) or len(argv) < 64:
+                continue
+            if limit is None:
+                limit = self.launcher.argument_limit()
+            size = argument_size(argv)
+            if size > limit:
+                print(f"{name}: argument list too long ({size} bytes, limit {limit}); "
+                      f"run it as 'chunked {name} ...' to split it into batches", file=sys.stderr)
+                return False
+        return True
+
+    def _run_chunked(self, stage, fixed, fds) -> int:
+        """Run a command once per batch of its arguments that fits in argv, like
+        xargs; the status is that of the last batch that failed, if any
+        """
+        name, argv = stage
+        if isinstance(argv, BuiltinStage):
+            # Builtins are not exec'd, so have no limit
+            return self._run_stages([stage], redirections=[fds])
+        status = 0
+        for batch in chunk_arguments(argv[:fixed], argv[fixed:], self.launcher.argument_limit()):
+            status = self._run_stages([(name, batch)], redirections=[fds]) or status
+            if self._interrupted:
+                break
+        return status
+
+    def _assign(self, command) -> bool:
+        """Apply a command made only of NAME=value words; False if it is not one"""
+        if not command.words or command.redirects or not all(map(is_assignment, command.words)):
+            return False
+        for word in command.words:
+            kind, text = word.parts[0]
+            name, _, first = text.partition('=')
+            value = word._replace(parts=((kind, first),) + word.parts[1:])
+            self.environment.set(name, self.expander.expand_unsplit(value))
+        return True
 
     def get_prompt(self):
         """Get the current prompt string"""
-        return self.prompt_generator.generate_prompt()
+        if self.prompt_generator is None:
+            self.prompt_generator = ShellPrompt()
+        return self.prompt_generator.generate_prompt(status=self.last_status,
+                                                     jobs=len(self.job_control.jobs),
+                                                     duration=self.last_duration)
 
     def stop(self):
         """Stop the shell and cleanup"""
         self.running = False
+        if self.interactive:
+            self.history.save_history()
         # Cleanup background processes
-        for process in self.background_processes.values():
-            try:
-                process.kill()
-            except:
-                pass
+        self.job_control.kill_all()
+        self.instrumentation.close_log()
 
     def run(self):
         print("Welcome to MyShell! Type 'exit' to quit.\n")
         
         while self.running:
             try:
-                prompt = self.prompt_generator.generate_prompt()
-                user_input = input(prompt).strip()
+                self._check_background_processes()
+                user_input = input(self.get_prompt()).strip()
+                while self._needs_more(user_input):
+                    user_input += '\n' + input('> ')
                 
                 if user_input:
+                    self.history.add_command(user_input)
                     if user_input.lower() == 'exit':
                         self.stop()
                         break
+                    started = time.monotonic()
                     self.execute_command(user_input)
+                    self.last_duration = time.monotonic() - started
             except KeyboardInterrupt:
                 print("\nUse 'exit' to quit.")
             except EOFError:
                 self.stop()
-                break
\ No newline at end of file
+                break
+
+    def _needs_more(self, text) -> bool:
+        """Whether text stops inside a here-document"""
+        if '<<' not in text:
+            return False
+        try:
+            self.parser.parse_line(text)
+        except IncompleteInput:
+            return True
+        except ParseError:
+            return False
+        return False
+
+    def run_lines(self, lines) -> int:
+        """Execute commands from an iterable of lines without prompting"""
+        lines = iter(lines)
+        for line in lines:
+            while self._needs_more(line):
+                # Here-document bodies follow on the next lines
+                more = next(lines, None)
+                if more is None:
+                    break
+                line = line.rstrip('\n') + '\n' + more.rstrip('\n')
+            self.execute_command(line)
+            if not self.running:
+                break
+        return self.exit_status if self.exit_status is not None else self.last_status
+
+    def run_script(self, path, arguments=()) -> int:
+        """Execute a script file, streaming it from disk line by line, with
+        arguments as $1, $2, ...
+        """
+        self.parameters = [path] + list(arguments)
+        with open(path, 'r') as f:
+            return self.run_lines(f)
+
+    def run_string(self, command, arguments=()) -> int:
+        """Execute a command string as given to -c; as in sh -c, the first
+        of arguments is $0 and the rest are $1, $2, ...
+        """
+        if arguments:
+            self.parameters = list(arguments)
+        return self.run_lines(command.splitlines())
@@ -0,0 +1,161 @@
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+# Standard and bright colors for SGR 30-37 / 90-97 (and 40-47 / 100-107)
+COLORS_16 = [
+    '#000000', '#FF0000', '#00FF00', '#FFFF00', '#0000FF', '#FF00FF', '#00FFFF', '#FFFFFF',
+    '#808080', '#FF5555', '#55FF55', '#FFFF55', '#5555FF', '#FF55FF', '#55FFFF', '#FFFFFF',
+]
+
+def _color_256(n: int) -> str:
+    """xterm 256-color palette entry"""
+    if n < 16:
+        return COLORS_16[n]
+    if n < 232:
+        n -= 16
+        levels = [0 if c == 0 else 55 + 40 * c for c in (n // 36, n // 6 % 6, n % 6)]
+        return '#%02X%02X%02X' % tuple(levels)
+    gray = 8 + 10 * (n - 232)
+    return '#%02X%02X%02X' % (gray, gray, gray)
+
+class Style(NamedTuple):
+    fg: Optional[str] = None
+    bg: Optional[str] = None
+    bold: bool = False
+    italic: bool = False
+    underline: bool = False
+    inverse: bool = False
+
+DEFAULT_STYLE = Style()
+
+# A complete escape sequence: CSI (group 1 = parameters, group 2 = final
+# byte), OSC terminated by BEL or ST, a charset designation, or a two-byte
+# escape
+_SEQUENCE = re.compile(
+    r'\x1b(?:\[([0-?]*)[ -/]*([@-~])'
+    r'|\][^\x07\x1b]*(?:\x07|\x1b\\)'
+    r'|[()*+][@-~]'
+    r'|[@-Z\\^_=>])'
+)
+# The start of a sequence that a later chunk may complete
+_PARTIAL = re.compile(r'\x1b(?:\[[0-?]*[ -/]*|\][^\x07\x1b]*\x1b?|[()*+])?\Z')
+# Longest sequence start kept for the next chunk; anything longer, such as
+# an unterminated OSC in binary output, is shown as text instead
+MAX_PARTIAL = 4096
+
+class AnsiParser:
+    """Streaming parser turning terminal output into (text, Style) spans.
+
+    SGR sequences update the current style; other control sequences (cursor
+    movement, erasing, window titles) are dropped. The style and any escape
+    sequence cut off at the end of a chunk carry over to the next feed(), so
+    output can be parsed as it streams in; a cut-off sequence longer than
+    MAX_PARTIAL is given up on and shown as text. Text without escapes takes a fast
+    path that returns it as one span.
+    """
+
+    def __init__(self):
+        self.style = DEFAULT_STYLE
+        self._partial = ''
+        # (style, SGR parameters) -> resulting style; real output uses few
+        self._transitions = {}
+
+    def feed(self, text: str) -> List[Tuple[str, Style]]:
+        """Spans for the next chunk of output; adjacent spans differ in style"""
+        if self._partial:
+            text = self._partial + text
+            self._partial = ''
+        if '\x1b' not in text:
+            return [(text, self.style)] if text else []
+
+        spans: List[Tuple[str, Style]] = []
+        pos = 0
+        for match in _SEQUENCE.finditer(text):
+            if match.start() > pos:
+                self._emit(spans, text[pos:match.start()])
+            pos = match.end()
+            if match.group(2) == 'm':
+                key = (self.style, match.group(1))
+                style = self._transitions.get(key)
+                if style is None:
+                    style = self._transitions[key] = self._apply_sgr(match.group(1))
+                self.style = style
+
+        tail = text[pos:]
+        escape = tail.find('\x1b')
+        while escape != -1:
+            if len(tail) - escape <= MAX_PARTIAL and _PARTIAL.match(tail, escape):
+                self._partial = tail[escape:]
+                tail = tail[:escape]
+                break
+            # Not a sequence we know and cannot become one, or too long to
+            # keep waiting for: drop the ESC
+            tail = tail[:escape] + tail[escape + 1:]
+            escape = tail.find('\x1b', escape)
+        if tail:
+            self._emit(spans, tail)
+        return spans
+
+    def _emit(self, spans, text):
+        if '\x1b' in text:
+            # Stray ESC from a malformed sequence
+            text = text.replace('\x1b', '')
+            if not text:
+                return
+        if spans and spans[-1][1] == self.style:
+            spans[-1] = (spans[-1][0] + text, self.style)
+        else:
+            spans.append((text, self.style))
+
+    def _apply_sgr(self, params: str) -> Style:
+        codes = [int(code) if code.isdigit() else 0 for code in params.split(';')] if params else [0]
+        style = self.style._asdict()
+        i = 0
+        while i < len(codes):
+            code = codes[i]
+            if code == 0:
+                style = DEFAULT_STYLE._asdict()
+            elif code == 1:
+                style['bold'] = True
+            elif code == 3:
+                style['italic'] = True
+            elif code == 4:
+                style['underline'] = True
+            elif code == 7:
+                style['inverse'] = True
+            elif code == 22:
+                style['bold'] = False
+            elif code == 23:
+                style['italic'] = False
+            elif code == 24:
+                style['underline'] = False
+            elif code == 27:
+                style['inverse'] = False
+            elif 30 <= code <= 37:
+                style['fg'] = COLORS_16[code - 30]
+            elif 90 <= code <= 97:
+                style['fg'] = COLORS_16[code - 90 + 8]
+            elif 40 <= code <= 47:
+                style['bg'] = COLORS_16[code - 40]
+            elif 100 <= code <= 107:
+                style['bg'] = COLORS_16[code - 100 + 8]
+            elif code == 39:
+                style['fg'] = None
+            elif code == 49:
+                style['bg'] = None
+            elif code in (38, 48):
+                # 38;5;n (256 colors) or 38;2;r;g;b (true color)
+                key = 'fg' if code == 38 else 'bg'
+                if i + 2 < len(codes) and codes[i + 1] == 5:
+                    style[key] = _color_256(codes[i + 2] % 256)
+                    i += 2
+                elif i + 4 < len(codes) and codes[i + 1] == 2:
+                    style[key] = '#%02X%02X%02X' % tuple(min(c, 255) for c in codes[i + 2:i + 5])
+                    i += 4
+            i += 1
+        return Style(**style)
+
+    def reset(self):
+        """Forget the current style and any partial sequence"""
+        self.style = DEFAULT_STYLE
+        self._partial = ''
@@ -2,31 +2,61 @@ import tkinter as tk
 from tkinter import ttk, font
 from ttkthemes import ThemedTk
 import platform
-import sys
-import io
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from src.core.shell import Shell
+from src.gui.ansi import COLORS_16, DEFAULT_STYLE, AnsiParser, Style
+from src.gui.scrollback import ScrollbackBuffer
+from src.gui.session import DONE, ShellSession, session_shell
 from src.utils.helpers import ShellPrompt
 
 class TerminalWidget(ttk.Frame):
-    ANSI_COLORS = {
-        '30': '#000000',  # Black
-        '31': '#FF0000',  # Red
-        '32': '#00FF00',  # Green
-        '33': '#FFFF00',  # Yellow
-        '34': '#0000FF',  # Blue
-        '35': '#FF00FF',  # Magenta
-        '36': '#00FFFF',  # Cyan
-        '37': '#FFFFFF',  # White
-    }
-
-    def __init__(self, parent, shell):
+    # Colors for write(text, color), keyed by SGR foreground code
+    ANSI_COLORS = {str(30 + i): color for i, color in enumerate(COLORS_16[:8])}
+
+    # Lines of output kept before the oldest are dropped
+    MAX_SCROLLBACK = 100000
+    # How often queued command output is rendered while a command runs
+    POLL_INTERVAL_MS = 30
+    # Lines moved per mouse wheel step
+    WHEEL_LINES = 3
+
+    def __init__(self, parent, shell, max_scrollback=MAX_SCROLLBACK):
         super().__init__(parent)
         self.shell = shell  # Store shell reference
+        # Commands run on the session's worker thread, never on Tk's
+        self.session = ShellSession(shell)
+        self._poll_id = None
+        # Called instead of quitting the application when `exit` is typed
+        self.on_exit = None
         self.prompt_generator = ShellPrompt()
+        # All output lives here; the Text widget only ever holds the lines
+        # on screen plus the command being typed
+        self.buffer = ScrollbackBuffer(max_lines=max_scrollback)
+        # Writes waiting for the next idle cycle, as (tag, pieces) runs
+        self._pending: List[Tuple[Optional[str], List[str]]] = []
+        self._flush_id = None
+        self._tags = set()
+        # Escape sequences in command output become styled spans; each style
+        # gets one Tk tag, created the first time it is seen
+        self.ansi = AnsiParser()
+        self._style_tags: Dict[Style, Optional[str]] = {DEFAULT_STYLE: None}
+        self._fonts: Dict[Tuple[bool, bool, bool], font.Font] = {}
+        # First buffer line on screen, or None to follow the end of output
+        self.top: Optional[int] = None
+        self.visible_lines = 24
+        # Text typed after the prompt, kept while scrolled away from it
+        self._typed = ""
+        self._showing_input = False
+        # Last scrollback search and the line it matched
+        self._find_pattern = None
+        self._find_line: Optional[int] = None
         self.setup_ui()
         self.command_history: List[str] = []
         self.history_index = 0
+        # Ctrl-R state: the query and its matches, best first
+        self.search_query = None
+        self.search_results: List[str] = []
+        self.search_pos = 0
         self.input_start = "1.0"
         
     def setup_ui(self):
@@ -35,6 +65,7 @@ class TerminalWidget(ttk.Frame):
             term_font = font.Font(family='Consolas', size=10)
         else:
             term_font = font.Font(family='DejaVu Sans Mono', size=10)
+        self.term_font = term_font
             
         # Terminal output area
         self.output = tk.Text(
@@ -49,11 +80,12 @@ class TerminalWidget(ttk.Frame):
             padx=5
         )
         self.output.grid(row=0, column=1, sticky='nsew')
+        self.output.tag_configure('search_match', background='#515C6A')
         
         # Line numbers
         self.linenumbers = tk.Text(
             self,
-            width=4,
+            width=6,
             bg='#2D2D2D',
             fg='#858585',
             font=term_font,
@@ -63,10 +95,9 @@ class TerminalWidget(ttk.Frame):
         self.linenumbers.grid(row=0, column=0, sticky='nsew')
         self.linenumbers.config(state='disabled')
         
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.output.yview)
-        scrollbar.grid(row=0, column=2, sticky='ns')
-        self.output['yscrollcommand'] = scrollbar.set
+        # Scrollbar over the whole scrollback, not just the Text contents
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.yview)
+        self.scrollbar.grid(row=0, column=2, sticky='ns')
         
         # Configure grid
         self.grid_columnconfigure(1, weight=1)
@@ -76,59 +107,95 @@ class TerminalWidget(ttk.Frame):
         self.output.bind('<Return>', self.handle_return)
         self.output.bind('<Up>', self.history_up)
         self.output.bind('<Down>', self.history_down)
+        self.output.bind('<Control-r>', self.history_search)
+        self.output.bind('<Control-c>', self.interrupt)
+        self.output.bind('<Control-f>', self.prompt_find)
+        self.output.bind('<Prior>', lambda event: self.yview('scroll', -1, 'pages'))
+        self.output.bind('<Next>', lambda event: self.yview('scroll', 1, 'pages'))
+        self.output.bind('<MouseWheel>', self.on_mousewheel)
+        self.output.bind('<Button-4>', self.on_mousewheel)
+        self.output.bind('<Button-5>', self.on_mousewheel)
+        self.output.bind('<Key>', self.on_key, add='+')
+        self.output.bind('<Configure>', self.on_resize)
         
     def clear_terminal(self):
         """Clear terminal output"""
-        self.output.delete("1.0", tk.END)
-        self.update_line_numbers()
+        self._pending.clear()
+        self.ansi.reset()
+        self.buffer.clear()
+        self.top = None
+        self._typed = ""
+        self._showing_input = False
+        self.render()
         self.show_prompt()
         
     def handle_return(self, event=None):
-        current_line = self.output.get("insert linestart", "insert lineend")
-        command = current_line.replace(self.prompt_generator.generate_prompt(), "").strip()
+        self.flush()
+        self.scroll_to_end()
+        command = self.output.get(self.input_start, "end-1c").strip()
         
         if command:
             # Add to history BEFORE executing
             self.command_history.append(command)
             self.history_index = len(self.command_history)
+            self.shell.history.add_command(command)
+            self.search_query = None
             
             if command.lower() == 'clear':
                 self.clear_terminal()
                 return "break"
-                
-            # Execute command using shell instance
-            try:
-                if command.lower() == 'exit':
+
+            if command.lower() == 'exit':
+                if self.on_exit is not None:
+                    self.on_exit()
+                else:
                     self.master.quit()
-                    return "break"
-                    
-                stdout = sys.stdout
-                output_capture = io.StringIO()
-                sys.stdout = output_capture
-                
-                self.shell.execute_command(command)
-                
-                sys.stdout = stdout
-                output = output_capture.getvalue()
-                if output:
-                    self.write(output)
-            except Exception as e:
-                self.write(f"Error: {str(e)}\n", '31')
-            finally:
+                return "break"
+
+            # The typed command becomes part of the scrollback
+            self.output.delete(self.input_start, "end-1c")
+            self._typed = ""
+            self.write(command + "\n")
+
+            # Run off the Tk thread; output arrives through poll_output
+            self.session.submit(command)
+            self.poll_output()
+
+        return "break"
+
+    def poll_output(self):
+        """Render output queued by the session; reschedules itself while busy"""
+        if self._poll_id is not None:
+            self.after_cancel(self._poll_id)
+            self._poll_id = None
+        for item in self.session.drain():
+            if item is DONE:
                 self.write("\n")
                 self.show_prompt()
-                
-        return "break"
-        
+            else:
+                self.write(*item)
+        if self.session.running or not self.session.output.empty():
+            self._poll_id = self.after(self.POLL_INTERVAL_MS, self.poll_output)
+
+    def interrupt(self, event=None):
+        """Ctrl-C: interrupt the running command, or copy as usual when idle"""
+        if self.session.interrupt():
+            self.write("^C\n", '31')
+            return "break"
+        return None
+
     def history_up(self, event=None):
+        self.flush()
+        self.scroll_to_end()
         if self.command_history and self.history_index > 0:
             self.history_index -= 1
-            self.output.delete("insert linestart", "insert lineend")
-            self.output.insert("insert linestart", f"$ {self.command_history[self.history_index]}")
+            self.replace_current_line(self.command_history[self.history_index])
         return "break"
         
     def history_down(self, event=None):
         """Navigate command history down"""
+        self.flush()
+        self.scroll_to_end()
         if self.history_index < len(self.command_history) - 1:
             self.history_index += 1
             self.replace_current_line(self.command_history[self.history_index])
@@ -137,69 +204,289 @@ class TerminalWidget(ttk.Frame):
             self.replace_current_line("")
         return "break"
         
+    def history_search(self, event=None):
+        """Replace the current line with the best history match; repeat to cycle"""
+        self.flush()
+        self.scroll_to_end()
+        text = self.output.get(self.input_start, "end-1c").strip()
+        shown = self.search_results[self.search_pos] if self.search_results else None
+        if self.search_query is not None and text == shown:
+            self.search_pos = (self.search_pos + 1) % len(self.search_results)
+        else:
+            self.search_query = text
+            self.search_results = self.shell.history.search(text) if text else []
+            self.search_pos = 0
+        if self.search_results:
+            self.replace_current_line(self.search_results[self.search_pos])
+        else:
+            self.output.bell()
+        return "break"
+
     def replace_current_line(self, text):
-        """Replace current command line with text"""
-        self.output.delete("insert linestart", "insert lineend")
-        self.output.insert("insert linestart", f"$ {text}")
+        """Replace the command being typed with text"""
+        self.output.delete(self.input_start, "end-1c")
+        self.output.insert(self.input_start, text)
+        self.output.mark_set("insert", "end-1c")
         
     def write(self, text, color=None):
-        """Write text to terminal with optional color"""
-        tag = None
+        """Write text to terminal with optional color.
+
+        Text written without a color is parsed for ANSI escape sequences.
+        Writes are queued and added to the scrollback together on the next
+        idle cycle, so a command printing many lines costs a single redraw of
+        the visible lines instead of one insert and renumbering per write.
+        """
         if color:
             tag = f'color_{color}'
-            self.output.tag_configure(tag, foreground=self.ANSI_COLORS.get(color, '#FFFFFF'))
-            
-        self.output.insert(tk.END, text, tag)
-        self.output.see(tk.END)
-        self.update_line_numbers()
-        
-        # Update input start position
+            if tag not in self._tags:
+                self.output.tag_configure(tag, foreground=self.ANSI_COLORS.get(color, '#FFFFFF'))
+                self._tags.add(tag)
+            self._queue(text, tag)
+            return
+        for span, style in self.ansi.feed(text):
+            tag = self._style_tags.get(style, False)
+            if tag is False:
+                tag = self._style_tag(style)
+            self._queue(span, tag)
+
+    def _style_tag(self, style: Style) -> str:
+        """Create the Tk tag for an ANSI style"""
+        tag = f'ansi_{len(self._style_tags)}'
+        fg, bg = style.fg, style.bg
+        if style.inverse:
+            fg, bg = bg or self.output.cget('bg'), fg or self.output.cget('fg')
+        options = {}
+        if fg:
+            options['foreground'] = fg
+        if bg:
+            options['background'] = bg
+        key = (style.bold, style.italic, style.underline)
+        if any(key):
+            if key not in self._fonts:
+                styled = self.term_font.copy()
+                styled.configure(weight='bold' if style.bold else 'normal',
+                                 slant='italic' if style.italic else 'roman',
+                                 underline=style.underline)
+                self._fonts[key] = styled
+            options['font'] = self._fonts[key]
+        self.output.tag_configure(tag, **options)
+        # Search highlighting stays visible over colored backgrounds
+        self.output.tag_raise('search_match')
+        self._style_tags[style] = tag
+        return tag
+
+    def _queue(self, text, tag):
+        if not text:
+            return
+        if self._pending and self._pending[-1][0] == tag:
+            self._pending[-1][1].append(text)
+        else:
+            self._pending.append((tag, [text]))
+        if self._flush_id is None:
+            self._flush_id = self.after_idle(self.flush)
+
+    def flush(self):
+        """Add queued writes to the scrollback and redraw"""
+        if self._flush_id is not None:
+            self.after_cancel(self._flush_id)
+            self._flush_id = None
+        if not self._pending:
+            return
+        for tag, pieces in self._pending:
+            self.buffer.append(''.join(pieces), tag)
+        self._pending.clear()
+        self.render()
+
+    def render(self):
+        """Materialise the visible window of the scrollback into the Text widget"""
+        if self._showing_input:
+            self._typed = self.output.get(self.input_start, "end-1c")
+        total = len(self.buffer)
+        last_top = max(0, total - self.visible_lines)
+        top = last_top if self.top is None else min(self.top, last_top)
+        if self.top is not None:
+            self.top = top
+        stop = min(total, top + self.visible_lines)
+
+        chunks = []
+        for index in range(top, stop):
+            if index > top:
+                chunks.extend(("\n", ()))
+            for text, tag in self.buffer.spans(index):
+                chunks.extend((text, tag or ()))
+        self.output.delete("1.0", tk.END)
+        if chunks:
+            self.output.insert(tk.END, *chunks)
         self.input_start = self.output.index("end-1c")
-        
-    def update_line_numbers(self):
-        """Update line numbers"""
-        lines = self.output.get('1.0', tk.END).count('\n')
+
+        # The command being typed is only on screen with the end of output
+        self._showing_input = self.top is None
+        if self._showing_input:
+            if self._typed:
+                self.output.insert(tk.END, self._typed)
+            self.output.mark_set("insert", "end-1c")
+            self.output.see(tk.END)
+        else:
+            self.output.yview_moveto(0)
+            if self._find_line is not None and top <= self._find_line < stop:
+                row = self._find_line - top + 1
+                self.output.tag_add('search_match', f"{row}.0", f"{row}.end")
+
+        self.update_line_numbers(top, stop)
+        if total:
+            self.scrollbar.set(top / total, stop / total)
+
+    def update_line_numbers(self, start=None, stop=None):
+        """Number the lines on screen, counting from the start of the session"""
+        if start is None:
+            self.render()
+            return
         self.linenumbers.config(state='normal')
         self.linenumbers.delete('1.0', tk.END)
-        for i in range(1, lines + 1):
-            self.linenumbers.insert(tk.END, f'{i}\n')
+        self.linenumbers.insert('1.0', '\n'.join(str(self.buffer.line_number(index))
+                                                 for index in range(start, stop)))
         self.linenumbers.config(state='disabled')
+
+    def scroll_to(self, top: int):
+        """Show the scrollback from line top; the last page follows new output"""
+        last_top = max(0, len(self.buffer) - self.visible_lines)
+        top = max(0, min(top, last_top))
+        self.top = None if top >= last_top else top
+        self.render()
+
+    def scroll_to_end(self):
+        if self.top is not None:
+            self.top = None
+            self.render()
+
+    def yview(self, *args):
+        """Scrollbar command, in terms of scrollback lines rather than Text rows"""
+        total = len(self.buffer)
+        current = max(0, total - self.visible_lines) if self.top is None else self.top
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * total))
+        elif args[0] == 'scroll':
+            step = self.visible_lines if args[2] == 'pages' else 1
+            self.scroll_to(current + int(args[1]) * step)
+        return "break"
+
+    def on_mousewheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            return self.yview('scroll', -self.WHEEL_LINES, 'units')
+        return self.yview('scroll', self.WHEEL_LINES, 'units')
+
+    def on_key(self, event):
+        # Typing jumps back to the prompt, as in a terminal
+        if event.char and event.char.isprintable() and self.top is not None:
+            self.scroll_to_end()
+
+    def on_resize(self, event):
+        padding = 2 * int(self.output.cget('pady'))
+        rows = max(1, (event.height - padding) // self.term_font.metrics('linespace'))
+        if rows != self.visible_lines:
+            self.visible_lines = rows
+            self.render()
+
+    def find(self, pattern: str, backwards=True) -> Optional[int]:
+        """Scroll to the next line matching pattern anywhere in the scrollback.
+
+        Repeated searches for the same pattern continue from the last match,
+        by default towards older output.
+        """
+        self.flush()
+        start = self._find_line if pattern == self._find_pattern else None
+        if start is not None and not backwards:
+            start += 1
+        line = self.buffer.search(pattern, start=start, backwards=backwards)
+        self._find_pattern = pattern
+        self._find_line = line
+        if line is None:
+            self.output.bell()
+            return None
+        self.scroll_to(line - self.visible_lines // 2)
+        if self.top is None:
+            # The match is on the last page; highlight it there too
+            row = line - max(0, len(self.buffer) - self.visible_lines) + 1
+            self.output.tag_add('search_match', f"{row}.0", f"{row}.end")
+        return line
+
+    def prompt_find(self, event=None):
+        """Ctrl-F: ask for a pattern and search the scrollback for it"""
+        from tkinter import simpledialog
+
+        pattern = simpledialog.askstring("Find", "Search scrollback for:",
+                                         initialvalue=self._find_pattern or "", parent=self)
+        if pattern:
+            self.find(pattern)
+        return "break"
         
     def show_prompt(self):
         """Display shell prompt"""
-        prompt = self.prompt_generator.generate_prompt()
+        prompt = self.prompt_generator.generate_prompt(status=self.shell.last_status,
+                                                       jobs=len(self.shell.job_control.jobs),
+                                                       duration=self.shell.last_duration)
         self.write(prompt, '36')  # Cyan color
 
 class MainWindow:
     def __init__(self):
         self.root = ThemedTk(theme="equilux")
         self.root.title("PyShell Terminal")
-        self.shell = Shell()
+        self.shell = session_shell()
+        self.terminals: List[TerminalWidget] = []
         self.setup_ui()
         
     def setup_ui(self):
         self.root.configure(bg='#1E1E1E')
         self.root.geometry('800x600')
-        
-        # Pass shell instance directly to TerminalWidget
-        self.terminal = TerminalWidget(self.root, self.shell)
-        self.terminal.pack(fill=tk.BOTH, expand=True)
-        
-        self.terminal.write("Welcome to PyShell Terminal\n", '32')
-        self.terminal.write("Type 'exit' to quit\n\n", '33')
-        self.terminal.show_prompt()
+
+        # One tab per session; each has its own shell and worker thread
+        self.notebook = ttk.Notebook(self.root)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+        self.new_tab(self.shell)
+        self.root.bind('<Control-t>', lambda event: self.new_tab())
+        self.root.bind('<Control-w>', lambda event: self.close_tab(self.terminal))
+
+    @property
+    def terminal(self) -> TerminalWidget:
+        """Terminal in the selected tab"""
+        selected = self.notebook.select()
+        for terminal in self.terminals:
+            if str(terminal) == selected:
+                return terminal
+        return self.terminals[0]
+
+    def new_tab(self, shell: Optional[Shell] = None) -> TerminalWidget:
+        """Open a tab running an independent shell session"""
+        terminal = TerminalWidget(self.notebook, shell if shell is not None else session_shell())
+        terminal.on_exit = lambda: self.close_tab(terminal)
+        self.terminals.append(terminal)
+        self.notebook.add(terminal, text=f"Shell {len(self.terminals)}")
+        self.notebook.select(terminal)
+
+        terminal.write("Welcome to PyShell Terminal\n", '32')
+        terminal.write("Type 'exit' to quit\n\n", '33')
+        terminal.show_prompt()
+        terminal.output.focus_set()
+        return terminal
+
+    def close_tab(self, terminal: TerminalWidget):
+        """Close a tab, stopping its command and jobs; the last one closes the window"""
+        terminal.session.close()
+        self.terminals.remove(terminal)
+        self.notebook.forget(terminal)
+        terminal.destroy()
+        if not self.terminals:
+            self.root.quit()
         
     def run(self):
         self.root.mainloop()
         
     def cleanup(self):
         """Clean up resources before closing"""
-        if hasattr(self, 'shell'):
-            for process in self.shell.background_processes.values():
-                try:
-                    process.kill()
-                except:
-                    pass
+        for terminal in self.terminals:
+            terminal.session.close()
+        # The tabs' shells are not interactive, so stop() would not save it
+        self.shell.history.flush()
         if hasattr(self, 'root'):
             self.root.quit()
-            self.root.destroy()
\ No newline at end of file
+            self.root.destroy()
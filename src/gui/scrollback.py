@@ -0,0 +1,170 @@
+import bisect
+import re
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+# Offset arrays are compacted once this many dropped entries have built up
+_COMPACT_AFTER = 4096
+
+class ScrollbackBuffer:
+    """Terminal output as lines in one bytearray, oldest dropped first.
+
+    Text is stored UTF-8 encoded, newlines included, in a single bytearray.
+    Line starts and style changes are kept as absolute byte offsets in
+    arrays, so a line costs eight bytes of bookkeeping instead of a Python
+    object. Once max_lines or max_bytes is exceeded the oldest lines are cut
+    from the front of the bytearray, which CPython does without copying the
+    rest. Line numbers keep counting from the first line ever written.
+    """
+
+    def __init__(self, max_lines=100000, max_bytes=64 * 1024 * 1024):
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.clear()
+
+    def clear(self):
+        """Drop every line"""
+        self._data = bytearray()
+        self._base = 0  # absolute offset of _data[0]
+        self._starts = array('Q', [0])  # absolute offset of every line start
+        self._first = 0  # index in _starts of the oldest retained line
+        self._run_offsets = array('Q')  # absolute offsets where the style changes
+        self._run_styles = array('H')
+        self._run_first = 0
+        self._styles: List[Optional[str]] = []
+        self._style_ids: Dict[Optional[str], int] = {}
+        self.dropped = 0  # lines discarded from the front so far
+
+    def __len__(self) -> int:
+        """Number of retained lines, counting the unfinished last one"""
+        return len(self._starts) - self._first
+
+    @property
+    def size(self) -> int:
+        """Bytes of retained text"""
+        return self._base + len(self._data) - self._starts[self._first]
+
+    def line_number(self, index: int) -> int:
+        """Session-wide, 1-based number of the line at index"""
+        return self.dropped + index + 1
+
+    def append(self, text: str, style: Optional[str] = None):
+        """Add output; newlines start new lines"""
+        data = text.encode('utf-8', errors='replace')
+        if not data:
+            return
+        start = self._base + len(self._data)
+        style_id = self._style_ids.get(style)
+        if style_id is None:
+            style_id = self._style_ids[style] = len(self._styles)
+            self._styles.append(style)
+        if len(self._run_styles) == self._run_first or self._run_styles[-1] != style_id:
+            self._run_offsets.append(start)
+            self._run_styles.append(style_id)
+
+        self._data += data
+        pos = data.find(b'\n')
+        while pos != -1:
+            self._starts.append(start + pos + 1)
+            pos = data.find(b'\n', pos + 1)
+        self._trim()
+
+    def _trim(self):
+        starts = self._starts
+        first = max(self._first, len(starts) - self.max_lines)
+        end = self._base + len(self._data)
+        if end - starts[first] > self.max_bytes:
+            # First line that starts within the last max_bytes; the
+            # unfinished last line is always kept
+            first = min(bisect.bisect_left(starts, end - self.max_bytes, first), len(starts) - 1)
+        if first == self._first:
+            return
+        self.dropped += first - self._first
+        self._first = first
+        # Dropped text is cut in bulk, once it outweighs the text kept:
+        # cutting a little on every append would move the rest each time
+        dead = starts[first] - self._base
+        if dead > len(self._data) - dead:
+            del self._data[:dead]
+            self._base = starts[first]
+
+        runs = self._run_offsets
+        run_first = bisect.bisect_right(runs, starts[first], self._run_first) - 1
+        self._run_first = max(self._run_first, run_first)
+
+        if self._first >= _COMPACT_AFTER:
+            del starts[:self._first]
+            self._first = 0
+        if self._run_first >= _COMPACT_AFTER:
+            del runs[:self._run_first]
+            del self._run_styles[:self._run_first]
+            self._run_first = 0
+
+    def _bounds(self, index: int) -> Tuple[int, int]:
+        """Absolute byte range of a line, without its newline"""
+        i = self._first + index
+        start = self._starts[i]
+        if i + 1 < len(self._starts):
+            return start, self._starts[i + 1] - 1
+        return start, self._base + len(self._data)
+
+    def line(self, index: int) -> str:
+        start, end = self._bounds(index)
+        return self._data[start - self._base:end - self._base].decode('utf-8', errors='replace')
+
+    def lines(self, start: int, stop: int) -> List[str]:
+        return [self.line(index) for index in range(start, stop)]
+
+    def spans(self, index: int) -> List[Tuple[str, Optional[str]]]:
+        """A line as (text, style) runs"""
+        start, end = self._bounds(index)
+        runs = self._run_offsets
+        run = max(bisect.bisect_right(runs, start, self._run_first) - 1, self._run_first)
+        spans = []
+        pos = start
+        while pos < end:
+            next_run = runs[run + 1] if run + 1 < len(runs) else end
+            stop = min(next_run, end)
+            if stop > pos:
+                text = self._data[pos - self._base:stop - self._base].decode('utf-8', errors='replace')
+                spans.append((text, self._styles[self._run_styles[run]]))
+            pos = stop
+            run += 1
+        return spans
+
+    def _line_at(self, offset: int) -> int:
+        """Index of the line containing a relative byte offset"""
+        return bisect.bisect_right(self._starts, self._base + offset, self._first) - 1 - self._first
+
+    def _compile(self, pattern: str, regex: bool, ignore_case: bool):
+        source = pattern.encode('utf-8') if regex else re.escape(pattern.encode('utf-8'))
+        return re.compile(source, re.IGNORECASE if ignore_case else 0)
+
+    def search(self, pattern: str, start: Optional[int] = None, backwards=False,
+               regex=False, ignore_case=False) -> Optional[int]:
+        """Index of the nearest line matching pattern, or None.
+
+        Searches forwards from line start, or backwards from just before it;
+        by default from the beginning or the end of the buffer.
+        """
+        compiled = self._compile(pattern, regex, ignore_case)
+        first = self._starts[self._first] - self._base
+        if backwards:
+            end = len(self._data) if start is None else self._bounds(start)[0] - self._base
+            found = None
+            for match in compiled.finditer(self._data, first, end):
+                found = match
+            return None if found is None else self._line_at(found.start())
+        begin = first if start is None else self._bounds(start)[0] - self._base
+        match = compiled.search(self._data, begin)
+        return None if match is None else self._line_at(match.start())
+
+    def search_all(self, pattern: str, regex=False, ignore_case=False) -> List[int]:
+        """Indexes of every line matching pattern"""
+        compiled = self._compile(pattern, regex, ignore_case)
+        found = []
+        for match in compiled.finditer(self._data, self._starts[self._first] - self._base):
+            index = self._line_at(match.start())
+            if not found or found[-1] != index:
+                found.append(index)
+        return found
@@ -0,0 +1,170 @@
+import contextlib
+import contextvars
+import io
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+from src.core.shell import Shell
+from src.utils.config import ShellConfig
+
+# Put on a session's output queue when a command line has finished
+DONE = object()
+
+# (stdout, stderr) of the session whose command is running in this context
+_session_streams: contextvars.ContextVar = contextvars.ContextVar('session_streams', default=None)
+_install_lock = threading.Lock()
+_history_lock = threading.Lock()
+
+class _QueueWriter(io.TextIOBase):
+    """Text stream that puts everything written to it on a queue"""
+
+    def __init__(self, output: queue.Queue, color: Optional[str] = None):
+        self.output = output
+        self.color = color
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if text:
+            self.output.put((text, self.color))
+        return len(text)
+
+class _SessionStream(io.TextIOBase):
+    """sys.stdout or sys.stderr while sessions exist: writes go to the
+    session running in the writer's context, or to the original stream.
+
+    sys.stdout belongs to the whole process, so sessions running at the same
+    time cannot each install their own; this routes instead. Threads the
+    shell starts for a command run in a copy of its context.
+    """
+
+    def __init__(self, index: int, fallback):
+        self.index = index
+        self.fallback = fallback
+
+    def _target(self):
+        streams = _session_streams.get()
+        return streams[self.index] if streams is not None else self.fallback
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    @contextlib.contextmanager
+    def redirect(self, stream):
+        """Send this context's writes to stream, e.g. for $(...), leaving
+        other sessions alone
+        """
+        streams = list(_session_streams.get() or (sys.stdout.fallback, sys.stderr.fallback))
+        streams[self.index] = stream
+        token = _session_streams.set(tuple(streams))
+        try:
+            yield stream
+        finally:
+            _session_streams.reset(token)
+
+def _install_streams():
+    with _install_lock:
+        if not isinstance(sys.stdout, _SessionStream):
+            sys.stdout = _SessionStream(0, sys.stdout)
+        if not isinstance(sys.stderr, _SessionStream):
+            sys.stderr = _SessionStream(1, sys.stderr)
+
+def session_shell() -> Shell:
+    """A Shell for a GUI tab.
+
+    It is not interactive: readline belongs to the terminal the process was
+    started from, and a new tab must not reload the history. All tabs record
+    into the one history every Shell shares, attached to HISTORY_FILE by the
+    first tab and read once, on first use; aliases come from RC_FILE.
+    """
+    shell = Shell(interactive=False)
+    history_file = os.path.expanduser(Shell.HISTORY_FILE)
+    with _history_lock:
+        if shell.history.history_file != history_file or shell.history.use_readline:
+            shell.history.open(history_file, use_readline=False)
+    shell.alias_manager.load(ShellConfig(Shell.RC_FILE))
+    return shell
+
+class ShellSession:
+    """An independent shell for one GUI tab, run off the Tk thread.
+
+    Command lines run one at a time on a worker thread of the session, and
+    sessions run at the same time as each other. Everything a command line
+    prints, including the output of child processes, is streamed as
+    (text, color) items through a thread-safe queue that the widget drains
+    from Tk's event loop, followed by DONE when the line finishes. Each
+    session has its own Shell and working directory; the directory is
+    restored before each command line, but the process has only one, so a
+    cd in one tab applies to relative paths of another tab's command still
+    running.
+    """
+
+    def __init__(self, shell: Optional[Shell] = None):
+        self.shell = shell if shell is not None else session_shell()
+        self.cwd = os.getcwd()
+        self.output: queue.Queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shell-session')
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        """Whether a command line is queued or running"""
+        return self._pending > 0
+
+    def submit(self, command: str) -> Future:
+        """Run a command line in the background"""
+        with self._lock:
+            self._pending += 1
+        return self._executor.submit(self._run, command)
+
+    def _run(self, command: str):
+        # Checked every time, in case something else replaced sys.stdout
+        _install_streams()
+        token = _session_streams.set((_QueueWriter(self.output), _QueueWriter(self.output, '31')))
+        try:
+            os.chdir(self.cwd)
+            started = time.monotonic()
+            self.shell.execute_command(command)
+            self.shell.last_duration = time.monotonic() - started
+        except Exception as e:
+            self.output.put((f"Error: {str(e)}\n", '31'))
+        finally:
+            self.cwd = os.getcwd()
+            _session_streams.reset(token)
+            with self._lock:
+                self._pending -= 1
+            self.output.put(DONE)
+
+    def interrupt(self) -> bool:
+        """Interrupt the running command line; False if nothing running could be"""
+        if not self.running:
+            return False
+        return self.shell.interrupt()
+
+    def drain(self, limit=1000) -> List[object]:
+        """Up to limit queued output items, without blocking"""
+        items = []
+        try:
+            while len(items) < limit:
+                items.append(self.output.get_nowait())
+        except queue.Empty:
+            pass
+        return items
+
+    def close(self):
+        """Stop the running command and every background job"""
+        self.interrupt()
+        self._executor.shutdown(wait=False)
+        self.shell.job_control.kill_all()
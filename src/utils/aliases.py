@@ -1,9 +1,130 @@
+import json
+import weakref
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from src.core.command_parser import LITERAL, Token, Word, tokenize
+
+# Operators after which the next word is a command name again
+_COMMAND_SEPARATORS = frozenset(('|', '&&', '||', ';', '&'))
+CONFIG_SECTION = 'aliases'
+
+def _name(word: Word) -> Optional[str]:
+    """The word as an alias name, or None if any of it is quoted"""
+    if len(word.parts) == 1 and word.parts[0][0] == LITERAL:
+        return word.parts[0][1]
+    return None
+
+def _stored(body: str) -> str:
+    """An alias body as written to the rc file. configparser strips
+    surrounding whitespace and joins continuation lines, so bodies it would
+    change, or that look quoted already, are kept as a JSON string
+    """
+    if body != body.strip() or '\n' in body or (body.startswith('"') and body.endswith('"')):
+        return json.dumps(body)
+    return body
+
+def _loaded(value: str) -> str:
+    """The alias body an rc file value stands for"""
+    if len(value) >= 2 and value.startswith('"') and value.endswith('"'):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return value
+
 class AliasManager:
+    """Aliases, expanded on the tokens of a command line before it is parsed.
+
+    Bodies are tokenized once and the fully expanded tokens of each alias are
+    memoized until an alias changes, so a command costs one dict lookup per
+    command word. Expansion is recursive: the first word of a body may be an
+    alias itself, and a body ending in a blank makes the following word
+    eligible too, as in bash. An alias is never expanded inside its own
+    expansion, which ends cycles such as ls='ls -F' or a='b', b='a'.
+    """
+
     def __init__(self):
-        self.aliases = {}
-        
+        self.aliases: Dict[str, str] = {}
+        self._tokens: Dict[str, Tuple[Token, ...]] = {}
+        self._expanded: Dict[Tuple[str, FrozenSet[str]], Tuple[Tuple[Token, ...], bool]] = {}
+        # Caches of parsed lines, cleared whenever an alias changes
+        self._caches = weakref.WeakSet()
+        # ShellConfig the aliases are saved to, once loaded from one
+        self.config = None
+
     def add_alias(self, name, command):
+        """Define an alias; raises ParseError if the body cannot be tokenized"""
+        self._tokens[name] = tuple(tokenize(command))
         self.aliases[name] = command
-        
+        self._changed()
+
+    def remove_alias(self, name) -> bool:
+        if self.aliases.pop(name, None) is None:
+            return False
+        self._tokens.pop(name, None)
+        self._changed()
+        return True
+
     def expand_alias(self, command):
-        return self.aliases.get(command, command)
\ No newline at end of file
+        return self.aliases.get(command, command)
+
+    def watch(self, cache):
+        """Clear an lru_cache of expanded lines whenever the aliases change"""
+        self._caches.add(cache)
+
+    def _changed(self):
+        self._expanded.clear()
+        for cache in list(self._caches):
+            cache.cache_clear()
+
+    def expand_tokens(self, tokens: List[Token]) -> List[Token]:
+        """The tokens of a command line with aliases in command position expanded"""
+        if not self.aliases:
+            return tokens
+        return self._expand(tokens, frozenset())
+
+    def _expand(self, tokens, active: FrozenSet[str]) -> List[Token]:
+        result: List[Token] = []
+        command_position = True
+        for token in tokens:
+            if command_position and token.kind == 'word':
+                name = _name(token.value)
+                if name in self.aliases and name not in active:
+                    expanded, command_position = self._expansion(name, active)
+                    result.extend(expanded)
+                    continue
+            result.append(token)
+            command_position = token.kind == 'op' and token.value in _COMMAND_SEPARATORS
+        return result
+
+    def _expansion(self, name: str, active: FrozenSet[str]) -> Tuple[Tuple[Token, ...], bool]:
+        """Expanded body of an alias, and whether the word after it is expanded too"""
+        key = (name, active)
+        cached = self._expanded.get(key)
+        if cached is None:
+            tokens = self._tokens.get(name)
+            if tokens is None:
+                # Loaded from the rc file: tokenized on first use
+                tokens = self._tokens[name] = tuple(tokenize(self.aliases[name]))
+            body = self.aliases[name]
+            cached = (tuple(self._expand(tokens, active | {name})),
+                      body[-1:] in (' ', '\t'))
+            self._expanded[key] = cached
+        return cached
+
+    def load(self, config):
+        """Add the aliases stored in a ShellConfig and save future changes to it"""
+        self.config = config
+        if config.config.has_section(CONFIG_SECTION):
+            # Bodies are tokenized lazily, keeping startup cheap with many aliases
+            for name, command in config.config[CONFIG_SECTION].items():
+                self.aliases[name] = _loaded(command)
+                self._tokens.pop(name, None)
+            self._changed()
+
+    def save(self) -> bool:
+        """Write the aliases to the ShellConfig they were loaded from, if any"""
+        if self.config is None:
+            return False
+        self.config.config[CONFIG_SECTION] = {name: _stored(body) for name, body in self.aliases.items()}
+        self.config.save_config()
+        return True
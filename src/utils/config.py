@@ -3,7 +3,9 @@ import configparser
 
 class ShellConfig:
     def __init__(self, config_file='~/.myshellrc'):
-        self.config = configparser.ConfigParser()
+        # Values such as alias bodies are stored verbatim, names keep their case
+        self.config = configparser.ConfigParser(interpolation=None)
+        self.config.optionxform = str
         self.config_file = os.path.expanduser(config_file)
         self.load_config()
         
@@ -11,6 +13,8 @@ class ShellConfig:
         self.config.read(self.config_file)
         
     def save_config(self):
-        os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
+        directory = os.path.dirname(self.config_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
         with open(self.config_file, 'w') as f:
             self.config.write(f)
\ No newline at end of file
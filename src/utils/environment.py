@@ -1,12 +1,79 @@
 import os
+from typing import Dict, Optional
 
 class Environment:
+    """Shell variables, and the environment new processes get.
+
+    set() changes a shell variable; new processes see it only once it is
+    exported, as everything inherited from the parent already is.
+    """
+
+    # Encoded copy of os.environ handed to new processes, shared by every
+    # instance since the environment belongs to the process
+    _block: Optional[Dict[bytes, bytes]] = None
+
     def __init__(self):
         self.variables = {}
-        
+        # Names exported before they were given a value
+        self.exported = set()
+
     def set(self, name, value):
         self.variables[name] = value
+        if name in os.environ or name in self.exported:
+            self._export(name, value)
+
+    def export(self, name, value=None):
+        """Export name to new processes, setting it first if value is given"""
+        if value is not None:
+            self.variables[name] = value
+        value = self.get(name)
+        if value is None:
+            self.exported.add(name)
+        else:
+            self._export(name, value)
+
+    def _export(self, name, value):
+        self.exported.discard(name)
         os.environ[name] = str(value)
+        Environment._block = None
+
+    def snapshot(self):
+        """The variables and exports, for restore() to bring back"""
+        return dict(self.variables), set(self.exported), dict(os.environ)
+
+    def restore(self, snapshot):
+        """Undo every change made since snapshot() was taken"""
+        variables, exported, environ = snapshot
+        self.variables.clear()
+        self.variables.update(variables)
+        self.exported = exported
+        if os.environ != environ:
+            os.environ.clear()
+            os.environ.update(environ)
+            Environment._block = None
+
+    def unset(self, name):
+        self.variables.pop(name, None)
+        self.exported.discard(name)
+        os.environ.pop(name, None)
+        Environment._block = None
         
     def get(self, name):
-        return self.variables.get(name, os.getenv(name))
\ No newline at end of file
+        return self.variables.get(name, os.getenv(name))
+
+    @classmethod
+    def block(cls) -> Dict[bytes, bytes]:
+        """The environment for new processes, encoded once per change.
+
+        Only changes made through set() and unset() are seen; call
+        invalidate() after changing os.environ directly.
+        """
+        if cls._block is None:
+            cls._block = dict(os.environb) if os.supports_bytes_environ else {
+                name.encode(): value.encode() for name, value in os.environ.items()
+            }
+        return cls._block
+
+    @classmethod
+    def invalidate(cls):
+        cls._block = None
@@ -1,25 +1,181 @@
 import os
-import socket
-import getpass
+import subprocess
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+
+_UNKNOWN = object()
 
 class ShellPrompt:
-    def __init__(self):
+    """Renders ``[user@host:cwd (branch*) jobs:N 3.2s !1]$ `` from cached segments.
+
+    The user and host are looked up once. Every other segment is cached with
+    the inputs it was built from and rebuilt only when those change: the cwd
+    when the working directory does, the git branch when ``.git/HEAD`` does.
+    Whether the work tree is dirty comes from ``git status``, which runs on a
+    background thread with a timeout; the prompt shows the last known answer
+    and never waits for it. Segments that have nothing to say (no repository,
+    no jobs, a quick successful command) render as nothing.
+    """
+
+    SEGMENTS = ('cwd', 'git', 'jobs', 'duration', 'status')
+
+    def __init__(self, segments: Sequence[str] = SEGMENTS, git_timeout=1.0, min_duration=2.0):
+        # Only needed once a prompt is shown, so kept off the batch startup path
+        import getpass
+        import socket
+
         self.username = getpass.getuser()
         self.hostname = socket.gethostname()
-        
-    def generate_prompt(self):
+        self.segments = list(segments)
+        self.git_timeout = git_timeout
+        self.min_duration = min_duration
+        self.home = os.path.expanduser("~")
+        self.last_prompt = ""
+        # segment name -> (inputs, rendered text)
+        self._cache: Dict[str, Tuple[object, str]] = {}
+        # cwd -> (work tree, git directory) of its repository, or None
+        self._repositories: Dict[str, Optional[Tuple[str, str]]] = {}
+        # ((HEAD path, mtime), branch) as last read
+        self._head = None
+        # git directory -> whether the work tree has changes
+        self._git_dirty: Dict[str, bool] = {}
+        self._git_refreshing = set()
+        self._git_too_slow = set()
+        self._git_lock = threading.Lock()
+
+    def generate_prompt(self, status=0, jobs=0, duration: Optional[float] = None):
         """Generate shell prompt with [user@host:path]$ format"""
         cwd = os.getcwd()
-        home = os.path.expanduser("~")
-        
-        # Replace home directory with ~
-        if cwd.startswith(home):
-            cwd = "~" + cwd[len(home):]
-            
+        inputs = {
+            'cwd': cwd,
+            'git': self._git_inputs(cwd) if 'git' in self.segments else None,
+            'jobs': jobs,
+            'duration': duration if duration is not None and duration >= self.min_duration else None,
+            'status': status,
+        }
+        parts = []
+        for name in self.segments:
+            key = inputs[name]
+            cached = self._cache.get(name)
+            if cached is None or cached[0] != key:
+                cached = (key, getattr(self, f'_render_{name}')(key))
+                self._cache[name] = cached
+            parts.append(cached[1])
+        self.last_prompt = f"[{self.username}@{self.hostname}{''.join(parts)}]$ "
+        return self.last_prompt
+
+    def _render_cwd(self, cwd: str) -> str:
+        # Replace home directory with ~, but not in /home/alice2 for /home/alice
+        if cwd == self.home or cwd.startswith(os.path.join(self.home, '')):
+            cwd = "~" + cwd[len(self.home):]
+
         # Shorten path if too long
         if len(cwd) > 30:
             parts = cwd.split(os.sep)
             if len(parts) > 3:
                 cwd = os.path.join("...", *parts[-2:])
-                
-        return f"[{self.username}@{self.hostname}:{cwd}]$ "
\ No newline at end of file
+        return f":{cwd}"
+
+    def _render_git(self, key) -> str:
+        if key is None:
+            return ""
+        _, branch, dirty = key
+        return f" ({branch}{'*' if dirty else ''})"
+
+    @staticmethod
+    def _render_jobs(jobs: int) -> str:
+        return f" jobs:{jobs}" if jobs else ""
+
+    @staticmethod
+    def _render_duration(duration: Optional[float]) -> str:
+        if duration is None:
+            return ""
+        if duration < 60:
+            return f" {duration:.1f}s"
+        minutes, seconds = divmod(int(duration), 60)
+        return f" {minutes}m{seconds:02d}s"
+
+    @staticmethod
+    def _render_status(status: int) -> str:
+        return f" !{status}" if status else ""
+
+    def _find_repository(self, cwd: str) -> Optional[Tuple[str, str]]:
+        """(work tree, git directory) of the repository containing cwd"""
+        # Cached per cwd; re-walked only if the cached answer went stale
+        cached = self._repositories.get(cwd, _UNKNOWN)
+        if cached is None and not os.path.exists(os.path.join(cwd, '.git')):
+            return None
+        if cached not in (None, _UNKNOWN) and os.path.isdir(cached[1]):
+            return cached
+
+        repository = None
+        directory = cwd
+        while True:
+            candidate = os.path.join(directory, '.git')
+            if os.path.isdir(candidate):
+                repository = (directory, candidate)
+                break
+            if os.path.isfile(candidate):
+                # Worktrees and submodules: .git is a file naming the real directory
+                try:
+                    with open(candidate) as f:
+                        line = f.readline().strip()
+                except OSError:
+                    line = ''
+                if line.startswith('gitdir:'):
+                    repository = (directory, os.path.join(directory, line[len('gitdir:'):].strip()))
+                break
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                break
+            directory = parent
+        self._repositories[cwd] = repository
+        return repository
+
+    def _git_inputs(self, cwd: str):
+        """(git dir, branch, dirty) for cwd, or None outside a repository"""
+        repository = self._find_repository(cwd)
+        if repository is None:
+            return None
+        work_tree, git_dir = repository
+        head_file = os.path.join(git_dir, 'HEAD')
+        try:
+            mtime = os.stat(head_file).st_mtime_ns
+        except OSError:
+            return None
+        if self._head is None or self._head[0] != (head_file, mtime):
+            try:
+                with open(head_file) as f:
+                    head = f.read().strip()
+            except OSError:
+                return None
+            # A detached HEAD holds a commit id rather than a ref
+            branch = head[len('ref: refs/heads/'):] if head.startswith('ref: refs/heads/') else head[:7]
+            self._head = ((head_file, mtime), branch)
+        self._refresh_git_status(git_dir, work_tree)
+        return git_dir, self._head[1], self._git_dirty.get(git_dir, False)
+
+    def _refresh_git_status(self, git_dir: str, work_tree: str):
+        """Start a background `git status` unless one is running or git was too slow"""
+        with self._git_lock:
+            if git_dir in self._git_refreshing or git_dir in self._git_too_slow:
+                return
+            self._git_refreshing.add(git_dir)
+        threading.Thread(target=self._git_status, args=(git_dir, work_tree), daemon=True).start()
+
+    def _git_status(self, git_dir: str, work_tree: str):
+        try:
+            result = subprocess.run(
+                ['git', '--no-optional-locks', 'status', '--porcelain', '--untracked-files=no'],
+                cwd=work_tree, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, timeout=self.git_timeout)
+            if result.returncode == 0:
+                self._git_dirty[git_dir] = bool(result.stdout.strip())
+        except (subprocess.TimeoutExpired, OSError):
+            # Too big to check on every prompt, or no git at all: show the
+            # branch alone from now on
+            with self._git_lock:
+                self._git_too_slow.add(git_dir)
+        finally:
+            with self._git_lock:
+                self._git_refreshing.discard(git_dir)
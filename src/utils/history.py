@@ -1,51 +1,363 @@
+import bisect
+import heapq
+import itertools
+import math
 import os
-import readline
-from typing import List, Optional
+import re
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+
+# Block size used when reading the history file backwards from its end
+_TAIL_BLOCK = 64 * 1024
+# Starts a line holding a command that spans several lines, such as one
+# with a here-document, with its newlines and backslashes escaped; other
+# commands are stored as typed, one per line
+_ESCAPED = '\x1e'
+
+def _encode(command: str) -> str:
+    """The history file line for a command"""
+    if '\n' not in command and not command.startswith(_ESCAPED):
+        return command
+    return _ESCAPED + command.replace('\\', '\\\\').replace('\n', '\\n')
+
+def _decode(line: str) -> str:
+    """The command stored in a history file line"""
+    if not line.startswith(_ESCAPED):
+        return line
+    return re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), line[1:])
+
+def _read_tail(path: str, count: int):
+    """Last count lines of a file and the file size, reading only the end"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = pos = f.tell()
+        data = b''
+        while pos > 0 and data.count(b'\n') <= count:
+            step = min(_TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    # Not splitlines(): it also splits at the _ESCAPED marker
+    lines = data.decode('utf-8', errors='replace').split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    if pos > 0:
+        lines = lines[1:]  # the first line read may be partial
+    return lines[-count:] if count else [], size
+
+def _lock(fd: int):
+    """Lock a file against other sessions until fd is closed, where the OS allows"""
+    try:
+        import fcntl
+    except ImportError:
+        return
+    fcntl.flock(fd, fcntl.LOCK_EX)
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class HistoryIndex:
+    """Search index over the distinct commands of a history.
+
+    Substring queries intersect trigram posting sets (smallest first) and
+    verify the few remaining candidates; prefix queries bisect a sorted list
+    of commands, re-sorted lazily after additions. Patterns too short for
+    trigrams and fuzzy (subsequence) matches are found by scanning commands
+    from most to least recently used, stopping once enough have been found.
+    Results are ranked by match quality (prefix, then substring, then fuzzy),
+    then by frequency and recency of use.
+    """
+
+    def __init__(self):
+        # command -> [count, last use], ordered from least to most recent
+        self.stats: Dict[str, List[int]] = {}
+        self.trigrams: Dict[str, Set[str]] = {}
+        self._sorted: List[str] = []
+        self._unsorted: List[str] = []
+        self.seq = 0
+
+    def add(self, command: str):
+        self.seq += 1
+        stats = self.stats.pop(command, None)
+        if stats is not None:
+            stats[0] += 1
+            stats[1] = self.seq
+            self.stats[command] = stats
+            return
+        self.stats[command] = [1, self.seq]
+        for gram in _trigrams(command):
+            postings = self.trigrams.get(gram)
+            if postings is None:
+                self.trigrams[gram] = {command}
+            else:
+                postings.add(command)
+        self._unsorted.append(command)
+
+    def prefix(self, prefix: str) -> List[str]:
+        """Commands starting with prefix, in sorted order"""
+        if self._unsorted:
+            # Timsort merges the sorted run and the new tail in linear time
+            self._sorted.extend(self._unsorted)
+            self._sorted.sort()
+            self._unsorted.clear()
+        commands = self._sorted
+        i = bisect.bisect_left(commands, prefix)
+        matches = []
+        while i < len(commands) and commands[i].startswith(prefix):
+            matches.append(commands[i])
+            i += 1
+        return matches
+
+    # Fuzzy matching only looks at this many of the most recently used commands
+    FUZZY_SCAN_LIMIT = 50000
+
+    def _scan_recent(self, matches, wanted: Optional[int], scan_limit: Optional[int] = None) -> Set[str]:
+        """Most recently used commands satisfying matches(), up to wanted of them"""
+        found = set()
+        for command in itertools.islice(reversed(self.stats), scan_limit):
+            if matches(command):
+                found.add(command)
+                if wanted is not None and len(found) >= wanted:
+                    break
+        return found
+
+    def substring(self, pattern: str, wanted: Optional[int] = None) -> Set[str]:
+        """Commands containing pattern"""
+        if len(pattern) < 3:
+            return self._scan_recent(lambda command: pattern in command, wanted)
+        postings = []
+        for gram in _trigrams(pattern):
+            found = self.trigrams.get(gram)
+            if not found:
+                return set()
+            postings.append(found)
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        return {command for command in candidates if pattern in command}
+
+    def fuzzy(self, pattern: str, wanted: Optional[int] = None) -> Set[str]:
+        """Commands containing the characters of pattern in order, ignoring case"""
+        regex = re.compile('.*?'.join(map(re.escape, pattern)), re.IGNORECASE)
+        return self._scan_recent(regex.search, wanted, self.FUZZY_SCAN_LIMIT)
+
+    def _frecency(self, command: str) -> float:
+        count, last = self.stats[command]
+        return math.log1p(count) + 4.0 * last / self.seq
+
+    def search(self, pattern: str, limit: Optional[int] = 20, fuzzy=True) -> List[str]:
+        """Best matches for pattern, best first"""
+        if not pattern:
+            return []
+        # Scans stop early, but collect a few times the limit so ranking by
+        # frequency still has candidates to choose from
+        wanted = None if limit is None else limit * 4
+        ranked = {command: 2 for command in self.substring(pattern, wanted)}
+        for command in self.prefix(pattern):
+            ranked[command] = 3
+        if fuzzy and (limit is None or len(ranked) < limit):
+            for command in self.fuzzy(pattern, wanted):
+                ranked.setdefault(command, 1)
+
+        def key(command):
+            return ranked[command], self._frecency(command)
+
+        if limit is None:
+            return sorted(ranked, key=key, reverse=True)
+        return heapq.nlargest(limit, ranked, key=key)
 
 class HistoryManager:
-    def __init__(self, history_file='~/.myshell_history'):
+    """Command history shared by the shell and the history builtin.
+
+    Entries live in a bounded ring buffer. The history file is only ever
+    appended to: new commands are queued and written in batches with a single
+    fsync, lines appended by other sessions are merged in before each write
+    under an exclusive lock on the file, and loading reads just the tail of
+    the file, so neither startup nor exit cost grows with the size of the
+    file. Searches go through a HistoryIndex over the whole file, built on
+    the first search and kept up to date as commands are added. Pass
+    history_file=None for an in-memory history.
+    """
+
+    def __init__(self, history_file='~/.myshell_history', max_entries=1000,
+                 batch_size=32, sync_interval=1.0, use_readline=False):
+        self.entries: Deque[str] = deque(maxlen=max_entries)
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self.use_readline = use_readline
+        self.history_file: Optional[str] = None
+        self._pending: List[str] = []
+        self._offset = 0
+        self._loaded = True
+        self._index: Optional[HistoryIndex] = None
+        self._last_flush = time.monotonic()
+        if history_file:
+            self.open(history_file)
+
+    def open(self, history_file, use_readline=None):
+        """Attach a history file; it is read on first use"""
+        self.flush()
         self.history_file = os.path.expanduser(history_file)
-        self.load_history()
-        
+        if use_readline is not None:
+            self.use_readline = use_readline
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load_history()
+
     def load_history(self):
-        """Load command history from file"""
+        """Load the most recent commands from the history file"""
+        self._loaded = True
+        self._index = None
+        self.entries.clear()
+        self._offset = 0
+        if self.history_file:
+            try:
+                lines, self._offset = _read_tail(self.history_file, self.entries.maxlen)
+                self.entries.extend(_decode(line) for line in lines if line)
+            except FileNotFoundError:
+                pass
+        if self.use_readline:
+            import readline
+
+            readline.clear_history()
+            for command in self.entries:
+                readline.add_history(command)
+
+    def _read_new_lines(self, fd: int) -> List[str]:
+        """Lines other sessions appended since we last read or wrote the file"""
+        size = os.fstat(fd).st_size
+        if size < self._offset:
+            # Truncated or replaced: nothing we have read is there any more
+            self._offset = 0
+        os.lseek(fd, self._offset, os.SEEK_SET)
+        chunks = []
+        remaining = size - self._offset
+        while remaining > 0:
+            chunk = os.read(fd, min(remaining, _TAIL_BLOCK))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        data = b''.join(chunks)
+        # Leave a partially written last line for the next read
+        end = data.rfind(b'\n') + 1
+        self._offset += end
+        return [_decode(line) for line in data[:end].decode('utf-8', errors='replace').split('\n') if line]
+
+    def flush(self):
+        """Write queued commands to the history file"""
+        if not self._pending or not self.history_file:
+            self._pending.clear()
+            return
+        directory = os.path.dirname(self.history_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        data = ''.join(_encode(command) + '\n' for command in self._pending).encode('utf-8')
+        fd = os.open(self.history_file, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o600)
         try:
-            with open(self.history_file, 'r') as f:
-                for line in f:
-                    readline.add_history(line.strip())
-        except FileNotFoundError:
-            pass
-            
+            # Other sessions cannot append between reading their lines and
+            # writing ours, so the offset covers exactly what was merged
+            _lock(fd)
+            others = self._read_new_lines(fd)
+            if others:
+                # Keep the ring buffer in file order: their commands, then ours
+                ours = [self.entries.pop() for _ in range(min(len(self._pending), len(self.entries)))]
+                self.entries.extend(others)
+                self.entries.extend(reversed(ours))
+                if self._index is not None:
+                    for command in others:
+                        self._index.add(command)
+            end = os.fstat(fd).st_size
+            if end > self._offset:
+                # A line cut short by a session that died mid-write
+                data = b'\n' + data
+            os.write(fd, data)
+            os.fsync(fd)
+            self._offset = end + len(data)
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+        self._pending.clear()
+        self._last_flush = time.monotonic()
+
     def save_history(self):
         """Save command history to file"""
-        os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
-        with open(self.history_file, 'w') as f:
-            for i in range(readline.get_current_history_length()):
-                f.write(readline.get_history_item(i + 1) + '\n')
-                
+        self.flush()
+
     def add_command(self, command: str):
         """Add a command to history"""
-        if command.strip():  # Don't add empty commands
+        if not command.strip():  # Don't add empty commands
+            return
+        self._ensure_loaded()
+        self.entries.append(command)
+        if self._index is not None:
+            self._index.add(command)
+        if self.use_readline:
+            import readline
+
             readline.add_history(command)
-        
+        if self.history_file:
+            self._pending.append(command)
+            if (len(self._pending) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.sync_interval):
+                self.flush()
+
     def get_history(self) -> List[str]:
         """Get all commands in history"""
-        return [
-            readline.get_history_item(i + 1)
-            for i in range(readline.get_current_history_length())
-        ]
-        
+        self._ensure_loaded()
+        return list(self.entries)
+
     def clear_history(self):
         """Clear command history"""
-        readline.clear_history()
-        if os.path.exists(self.history_file):
+        self.entries.clear()
+        self._pending.clear()
+        self._offset = 0
+        self._loaded = True
+        self._index = HistoryIndex()
+        if self.use_readline:
+            import readline
+
+            readline.clear_history()
+        if self.history_file and os.path.exists(self.history_file):
             os.remove(self.history_file)
-            
+
+    @property
+    def index(self) -> HistoryIndex:
+        """Search index over the full history, built on first use"""
+        if self._index is None:
+            self._ensure_loaded()
+            index = HistoryIndex()
+            if self.history_file:
+                # Everything up to _offset is in the file; newer commands are
+                # still queued in _pending
+                try:
+                    with open(self.history_file, 'rb') as f:
+                        data = f.read(self._offset)
+                    for line in data.decode('utf-8', errors='replace').split('\n'):
+                        if line:
+                            index.add(_decode(line))
+                except FileNotFoundError:
+                    pass
+                commands = self._pending
+            else:
+                commands = self.entries
+            for command in commands:
+                index.add(command)
+            self._index = index
+        return self._index
+
+    def search(self, pattern: str, limit: Optional[int] = 20, fuzzy=True) -> List[str]:
+        """Ranked search over the full history, best match first"""
+        return self.index.search(pattern, limit, fuzzy)
+
     def search_history(self, pattern: str) -> List[str]:
         """Search history for commands matching pattern"""
-        return [cmd for cmd in self.get_history() if pattern in cmd]
-        
+        return self.index.search(pattern, limit=None, fuzzy=False)
+
     def get_last_command(self) -> Optional[str]:
         """Get the most recent command"""
-        length = readline.get_current_history_length()
-        return readline.get_history_item(length) if length > 0 else None
\ No newline at end of file
+        self._ensure_loaded()
+        return self.entries[-1] if self.entries else None
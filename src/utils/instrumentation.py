@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+# Fields of CommandTiming that hold measurements, in report order
+METRICS = ('wall', 'parse', 'lookup', 'spawn', 'user', 'system', 'max_rss')
+
+# ru_maxrss is in kilobytes on Linux but in bytes on macOS
+_RSS_SCALE = 1024 if sys.platform == 'darwin' else 1
+
+class CommandTiming:
+    """Where the time of one command went.
+
+    Times are in seconds: wall is the whole command, parse the parser,
+    lookup the PATH search for every stage and spawn the time to start the
+    processes. user and system are CPU time of the shell and its children,
+    max_rss the peak resident size of any child, in KiB.
+    """
+
+    __slots__ = ('command', 'started') + METRICS + ('status', '_clock', '_cpu')
+
+    def __init__(self, command: str):
+        self.command = command
+        self.started = time.time()
+        self.wall = self.parse = self.lookup = self.spawn = 0.0
+        self.user = self.system = 0.0
+        self.max_rss = 0
+        self.status: Optional[int] = None
+        self._clock = time.perf_counter()
+        times = os.times()
+        self._cpu = (times.user, times.system)
+
+    def add_usage(self, usage):
+        """Account a child's resource usage, as reported by os.wait4"""
+        self.user += usage.ru_utime
+        self.system += usage.ru_stime
+        self.max_rss = max(self.max_rss, usage.ru_maxrss // _RSS_SCALE)
+
+    def finish(self, status: int):
+        """Stop the clock, adding the shell's own CPU time"""
+        self.wall = time.perf_counter() - self._clock
+        times = os.times()
+        self.user += times.user - self._cpu[0]
+        self.system += times.system - self._cpu[1]
+        self.status = status
+
+    def as_dict(self) -> Dict[str, object]:
+        record = {'command': self.command, 'started': round(self.started, 6), 'status': self.status}
+        for name in METRICS:
+            value = getattr(self, name)
+            record[name] = round(value, 6) if isinstance(value, float) else value
+        return record
+
+    def report(self) -> str:
+        """Summary in the format of the shell's time keyword"""
+        def clock(seconds):
+            minutes, seconds = divmod(seconds, 60)
+            return f"{int(minutes)}m{seconds:.3f}s"
+        lines = [f"real\t{clock(self.wall)}", f"user\t{clock(self.user)}", f"sys\t{clock(self.system)}"]
+        if self.max_rss:
+            lines.append(f"maxrss\t{self.max_rss} KiB")
+        lines.append(f"parse {self.parse * 1000:.3f}ms, lookup {self.lookup * 1000:.3f}ms, "
+                     f"spawn {self.spawn * 1000:.3f}ms")
+        return '\n'.join(lines)
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not ordered:
+        return 0.0
+    rank = max(1, int(fraction * len(ordered) + 0.999999))
+    return ordered[min(rank, len(ordered)) - 1]
+
+class Instrumentation:
+    """Timings of the most recent commands, optionally logged as JSON lines.
+
+    Keeps the last ``max_records`` CommandTimings for the stats builtin.
+    With a log file every timing is also appended to it as one JSON object
+    per line; the write happens on a background thread in batches, so
+    logging never blocks a command.
+    """
+
+    def __init__(self, max_records=10000, log_file: Optional[str] = None):
+        self.records: Deque[CommandTiming] = deque(maxlen=max_records)
+        self.log_file = None
+        self._logger = None
+        if log_file:
+            self.open_log(log_file)
+
+    def open_log(self, log_file: str):
+        """Append every further timing to log_file as JSON lines"""
+        from src.utils.logger import setup_json_logger
+
+        self.log_file = os.path.expanduser(log_file)
+        self._logger = setup_json_logger(self.log_file)
+
+    def close_log(self):
+        """Flush the log file and stop logging"""
+        if self._logger is not None:
+            from src.utils.logger import close_json_logger
+
+            close_json_logger(self._logger)
+            self._logger = None
+
+    def record(self, timing: CommandTiming):
+        self.records.append(timing)
+        if self._logger is not None:
+            self._logger.info(timing.as_dict())
+
+    def clear(self):
+        self.records.clear()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """p50, p90, p99 and max of every metric over the recorded commands"""
+        summary = {}
+        for name in METRICS:
+            values = sorted(getattr(timing, name) for timing in self.records)
+            summary[name] = {
+                'p50': percentile(values, 0.50),
+                'p90': percentile(values, 0.90),
+                'p99': percentile(values, 0.99),
+                'max': values[-1] if values else 0.0,
+            }
+        return summary
+
+    def slowest(self, count: int) -> List[CommandTiming]:
+        return sorted(self.records, key=lambda timing: timing.wall, reverse=True)[:count]
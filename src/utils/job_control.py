@@ -1,11 +1,229 @@
+import os
+import signal
+import sys
+import threading
+import weakref
+from typing import Dict, List, Optional
+
+# Every live job table, so one process-wide SIGCHLD handler can serve them all
+_tables: "weakref.WeakSet[JobControl]" = weakref.WeakSet()
+_previous_sigchld = None
+_sigchld_installed = False
+
+def _on_sigchld(signum, frame):
+    """Reap finished background children as soon as the kernel reports them"""
+    for table in list(_tables):
+        table.reap()
+    if callable(_previous_sigchld):
+        _previous_sigchld(signum, frame)
+
+def _install_sigchld_handler() -> bool:
+    """Install the SIGCHLD handler once; False where that is not possible"""
+    global _previous_sigchld, _sigchld_installed
+    if _sigchld_installed:
+        return True
+    if not hasattr(signal, 'SIGCHLD') or threading.current_thread() is not threading.main_thread():
+        return False
+    _previous_sigchld = signal.signal(signal.SIGCHLD, _on_sigchld)
+    _sigchld_installed = True
+    return True
+
+def process_group_kwargs(pgid: int) -> dict:
+    """Popen keyword arguments that place the child in process group pgid (0 = new)"""
+    if os.name == 'nt':
+        return {}
+    if sys.version_info >= (3, 11):
+        return {'process_group': pgid}
+    return {'preexec_fn': lambda: os.setpgid(0, pgid)}
+
+SIGNAL_DESCRIPTIONS = {'SIGTERM': 'Terminated', 'SIGKILL': 'Killed', 'SIGINT': 'Interrupt'}
+
+def describe_status(returncode: Optional[int]) -> str:
+    if returncode is None:
+        return 'Running'
+    if returncode == 0:
+        return 'Done'
+    if returncode < 0:
+        try:
+            name = signal.Signals(-returncode).name
+            return SIGNAL_DESCRIPTIONS.get(name, name)
+        except ValueError:
+            return f'Signal {-returncode}'
+    return f'Exit {returncode}'
+
+def _describe(process) -> str:
+    if process.returncode is None and getattr(process, 'finished', False):
+        # Reaped outside the shell, so its status was never seen
+        return 'Unknown'
+    return describe_status(process.returncode)
+
+class Job:
+    """A background pipeline: its processes, process group and status"""
+
+    def __init__(self, job_id: int, command: str, processes, pgid: Optional[int]):
+        self.job_id = job_id
+        self.command = command
+        self.processes = processes
+        self.pgid = pgid
+        self.stopped = False
+        # A plain flag rather than an Event: it is set from the SIGCHLD
+        # handler, which must never block on a lock
+        self.done = False
+
+    @property
+    def pid(self) -> int:
+        return self.processes[-1].pid
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.processes[-1].returncode
+
+    def stage_statuses(self) -> List[str]:
+        return [_describe(process) for process in self.processes]
+
+    @property
+    def status(self) -> str:
+        if self.done:
+            return _describe(self.processes[-1])
+        return 'Stopped' if self.stopped else 'Running'
+
+    def poll(self) -> bool:
+        """Reap any finished stages without blocking; True once all have exited"""
+        if not self.done:
+            self.done = all(process.poll() is not None or getattr(process, 'finished', False)
+                            for process in self.processes)
+        return self.done
+
+    def signal(self, signum: int):
+        if self.pgid is not None:
+            os.killpg(self.pgid, signum)
+        else:
+            for process in self.processes:
+                if process.poll() is None:
+                    process.send_signal(signum)
+
 class JobControl:
+    """Job table for background pipelines.
+
+    Finished children are reaped from a SIGCHLD handler when the table is
+    created on the main thread of a POSIX process, and otherwise by one
+    waiter thread per job that blocks in wait(). Either way nothing polls,
+    and children never linger as zombies until the shell exits. Completed
+    jobs stay in the table until reported once by take_finished().
+    """
+
     def __init__(self):
-        self.jobs = {}
-        
-    def add_job(self, pid, command):
-        """Add background job"""
-        self.jobs[pid] = {'command': command, 'status': 'running'}
-        
-    def list_jobs(self):
+        self.jobs: Dict[int, Job] = {}
+        # Reentrant: the SIGCHLD handler runs on the main thread, possibly
+        # while the main thread itself holds the lock
+        self._lock = threading.RLock()
+        self._use_sigchld = _install_sigchld_handler()
+        _tables.add(self)
+
+    def add_job(self, processes, command: str, pgid: Optional[int] = None) -> Job:
+        """Add a background job made of the given pipeline processes"""
+        with self._lock:
+            job_id = max(self.jobs, default=0) + 1
+            job = Job(job_id, command, processes, pgid)
+            self.jobs[job_id] = job
+        if not self._use_sigchld:
+            threading.Thread(target=self._wait_for, args=(job,), daemon=True).start()
+        # The child may have exited before the handler could see the job
+        self.reap()
+        return job
+
+    def _wait_for(self, job: Job):
+        for process in job.processes:
+            process.wait()
+        job.poll()
+
+    def reap(self):
+        """Collect exit statuses of finished jobs without blocking"""
+        for job in list(self.jobs.values()):
+            job.poll()
+
+    def list_jobs(self) -> List[Job]:
         """List all background jobs"""
-        return self.jobs
\ No newline at end of file
+        return [self.jobs[job_id] for job_id in sorted(self.jobs)]
+
+    def get_job(self, spec: Optional[str] = None) -> Optional[Job]:
+        """Find a job by %n, %+ / %% (current), or pid; None if unknown"""
+        if not self.jobs:
+            return None
+        if spec in (None, '%', '%%', '%+'):
+            return self.jobs[max(self.jobs)]
+        if spec.startswith('%'):
+            spec = spec[1:]
+            if spec.isdigit():
+                return self.jobs.get(int(spec))
+            # %name: most recent job whose command starts with name
+            for job_id in sorted(self.jobs, reverse=True):
+                if self.jobs[job_id].command.startswith(spec):
+                    return self.jobs[job_id]
+            return None
+        if spec.isdigit():
+            pid = int(spec)
+            for job in self.jobs.values():
+                if any(process.pid == pid for process in job.processes):
+                    return job
+        return None
+
+    def remove_job(self, job: Job):
+        with self._lock:
+            if self.jobs.get(job.job_id) is job:
+                del self.jobs[job.job_id]
+
+    def take_finished(self) -> List[Job]:
+        """Finished jobs not yet reported; they are removed from the table"""
+        self.reap()
+        with self._lock:
+            finished = [job for job in self.list_jobs() if job.done]
+            for job in finished:
+                del self.jobs[job.job_id]
+        return finished
+
+    def wait(self, job: Job) -> Optional[int]:
+        """Block until every stage of a job has exited"""
+        for process in job.processes:
+            process.wait()
+        job.poll()
+        self.remove_job(job)
+        return job.returncode
+
+    def foreground(self, job: Job) -> Optional[int]:
+        """Continue a job in the foreground, handing it the terminal if there is one"""
+        terminal = None
+        if job.pgid is not None and sys.stdin is not None and sys.stdin.isatty():
+            terminal = sys.stdin.fileno()
+            self._set_terminal_group(terminal, job.pgid)
+        try:
+            if job.stopped:
+                job.stopped = False
+                job.signal(signal.SIGCONT)
+            return self.wait(job)
+        finally:
+            if terminal is not None:
+                self._set_terminal_group(terminal, os.getpgrp())
+
+    @staticmethod
+    def _set_terminal_group(fd: int, pgid: int):
+        # A background process group calling tcsetpgrp receives SIGTTOU
+        previous = signal.signal(signal.SIGTTOU, signal.SIG_IGN)
+        try:
+            os.tcsetpgrp(fd, pgid)
+        except OSError:
+            pass
+        finally:
+            signal.signal(signal.SIGTTOU, previous)
+
+    def kill_all(self):
+        """Kill every job and empty the table"""
+        for job in self.list_jobs():
+            for process in job.processes:
+                try:
+                    if process.poll() is None:
+                        process.kill()
+                    process.wait()
+                except OSError:
+                    pass
+            self.remove_job(job)
@@ -1,9 +1,64 @@
+import atexit
+import json
 import logging
 
+# JSON-lines logger -> function that stops its listener and flushes it
+_closers = {}
+
 def setup_logger():
     logging.basicConfig(
         filename='myshell.log',
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s'
     )
-    return logging.getLogger('myshell')
\ No newline at end of file
+    return logging.getLogger('myshell')
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats a record whose message is a dict as one line of JSON"""
+
+    def format(self, record):
+        message = record.msg if isinstance(record.msg, dict) else {'message': record.getMessage()}
+        return json.dumps(message, separators=(',', ':'))
+
+def setup_json_logger(path: str, name='myshell.stats', capacity=64) -> logging.Logger:
+    """Logger appending one JSON object per record to path, off the caller's thread.
+
+    Records are formatted by the caller and put on a queue; a listener
+    thread buffers them and writes every ``capacity`` records, and whatever
+    is left when the interpreter exits.
+    """
+    import logging.handlers
+    import queue
+
+    logger = logging.getLogger(f"{name}:{path}")
+    if logger.handlers:
+        return logger
+    file_handler = logging.FileHandler(path, encoding='utf-8', delay=True)
+    file_handler.setFormatter(logging.Formatter('%(message)s'))
+    buffered = logging.handlers.MemoryHandler(capacity, flushLevel=logging.CRITICAL, target=file_handler)
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(records)
+    handler.setFormatter(JsonLinesFormatter())
+    listener = logging.handlers.QueueListener(records, buffered)
+    listener.start()
+
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    def close():
+        logger.removeHandler(handler)
+        listener.stop()
+        buffered.close()
+        file_handler.close()
+    _closers[logger] = close
+    # Registered after logging's own exit handler, so it runs first
+    atexit.register(close_json_logger, logger)
+    return logger
+
+def close_json_logger(logger: logging.Logger):
+    """Write out everything logged so far and stop the logger's thread"""
+    close = _closers.pop(logger, None)
+    if close is not None:
+        close()
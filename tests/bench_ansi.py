@@ -0,0 +1,39 @@
+"""Throughput of AnsiParser on large colored logs, fed in streaming chunks.
+
+Run with: python -m tests.bench_ansi
+"""
+import time
+from src.gui.ansi import AnsiParser
+
+LEVELS = ["\x1b[32mINFO\x1b[0m", "\x1b[33mWARN\x1b[0m", "\x1b[1;31mERROR\x1b[0m", "\x1b[2mDEBUG\x1b[0m"]
+
+def colored_log(lines=200000):
+    return "".join(
+        f"\x1b[90m2024-01-01 12:00:{i % 60:02d}\x1b[0m {LEVELS[i % 4]} "
+        f"\x1b[36mworker-{i % 8}\x1b[0m processed request {i} in {i % 97} ms\n"
+        for i in range(lines)
+    )
+
+def plain_log(lines=200000):
+    return "".join(f"2024-01-01 12:00:{i % 60:02d} INFO worker-{i % 8} processed request {i}\n"
+                   for i in range(lines))
+
+def megabytes_per_second(text, chunk_size=4096):
+    parser = AnsiParser()
+    started = time.perf_counter()
+    spans = 0
+    for i in range(0, len(text), chunk_size):
+        spans += len(parser.feed(text[i:i + chunk_size]))
+    seconds = time.perf_counter() - started
+    return len(text) / seconds / 1e6, spans
+
+def run():
+    results = {}
+    for name, text in (('plain log', plain_log()), ('colored log', colored_log())):
+        rate, spans = megabytes_per_second(text)
+        results[name] = rate
+        print(f"{name:<12} {len(text) / 1e6:6.1f} MB  {rate:8.1f} MB/sec  {spans:>9,} spans")
+    return results
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,73 @@
+"""Parse throughput of CommandParser against the original split-based parser.
+
+Run with: python -m tests.bench_command_parser
+"""
+import timeit
+from src.core.command_parser import CommandParser
+
+LINES = [
+    "ls -l",
+    "ls -l /home | grep .py | sort",
+    "cat < input.txt > output.txt",
+    "sleep 10 &",
+    "find . -name build -type d | xargs rm -rf",
+    "echo hello world > greeting.txt",
+    "grep -r TODO src | wc -l",
+    "python main.py --gui",
+]
+
+def legacy_parse(command_string):
+    """The str.split() based parser this module replaced, kept for comparison"""
+    if not command_string:
+        return None, [], False, None, None, None
+    is_background = command_string.strip().endswith('&')
+    if is_background:
+        command_string = command_string[:-1].strip()
+    input_file = output_file = None
+    parts = command_string.split()
+    new_parts = []
+    i = 0
+    while i < len(parts):
+        if parts[i] == '>':
+            if i + 1 < len(parts):
+                output_file = parts[i + 1]
+                i += 2
+                continue
+        elif parts[i] == '<':
+            if i + 1 < len(parts):
+                input_file = parts[i + 1]
+                i += 2
+                continue
+        new_parts.append(parts[i])
+        i += 1
+    command_string = ' '.join(new_parts)
+    pipe_commands = [cmd.strip() for cmd in command_string.split('|')]
+    if len(pipe_commands) == 1:
+        command = new_parts[0].lower() if new_parts else None
+        return command, new_parts[1:], is_background, None, input_file, output_file
+    parsed_commands = []
+    for cmd in pipe_commands:
+        parts = cmd.strip().split()
+        if parts:
+            parsed_commands.append((parts[0].lower(), parts[1:]))
+    return (parsed_commands[0][0], parsed_commands[0][1], is_background,
+            parsed_commands[1:], input_file, output_file)
+
+def lines_per_second(parse, rounds=2000):
+    seconds = timeit.timeit(lambda: [parse(line) for line in LINES], number=rounds)
+    return rounds * len(LINES) / seconds
+
+def run():
+    uncached = CommandParser(cache_size=0)
+    cached = CommandParser()
+    results = {
+        'legacy split parser': lines_per_second(legacy_parse),
+        'lexer + AST (uncached)': lines_per_second(uncached.parse_line),
+        'lexer + AST (cached)': lines_per_second(cached.parse_line),
+    }
+    for name, rate in results.items():
+        print(f"{name:<26} {rate:>12,.0f} lines/sec")
+    return results
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,43 @@
+"""Copy and delete throughput of the cp/rm engine against shutil.
+
+Run with: python -m tests.bench_file_operations
+"""
+import os
+import shutil
+import tempfile
+import time
+from src.commands.file_operations import FileOperations
+
+DIRECTORIES = 100
+FILES_PER_DIRECTORY = 200
+
+def make_tree(root):
+    for i in range(DIRECTORIES):
+        directory = os.path.join(root, f"dir{i}")
+        os.makedirs(directory)
+        for j in range(FILES_PER_DIRECTORY):
+            with open(os.path.join(directory, f"file{j}"), 'wb') as f:
+                f.write(b'x' * 4096)
+
+def timed(action):
+    started = time.perf_counter()
+    action()
+    return time.perf_counter() - started
+
+def run():
+    files = DIRECTORIES * FILES_PER_DIRECTORY
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, 'source')
+        make_tree(source)
+        results = {
+            'shutil.copytree': timed(lambda: shutil.copytree(source, os.path.join(root, 'a'))),
+            'engine copy': timed(lambda: FileOperations().copy(source, os.path.join(root, 'b'))),
+            'shutil.rmtree': timed(lambda: shutil.rmtree(os.path.join(root, 'a'))),
+            'engine remove': timed(lambda: FileOperations().remove(os.path.join(root, 'b'), recursive=True)),
+        }
+    for name, seconds in results.items():
+        print(f"{name:<16} {files / seconds:>12,.0f} files/sec")
+    return results
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,356 @@
+"""Benchmarks for the shell's hot paths, with stored baselines.
+
+Every benchmark reports a rate, so higher is always better. Results can be
+saved as a baseline and later runs compared against it; a benchmark slower
+than the baseline by more than the threshold is reported as a regression
+and makes the run exit with status 1.
+
+    python -m tests.bench_suite                      # run and print
+    python -m tests.bench_suite --save               # store as the baseline
+    python -m tests.bench_suite --compare            # report against it
+    python -m tests.bench_suite --compare -k parser --threshold 15
+
+Baselines are machine specific: compare runs from the same machine.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+DEFAULT_BASELINE = os.path.join('.benchmarks', 'baseline.json')
+DEFAULT_THRESHOLD = 10.0  # percent
+
+class Benchmark(NamedTuple):
+    name: str
+    unit: str
+    run: Callable[[], float]
+
+BENCHMARKS: List[Benchmark] = []
+
+class Skipped(Exception):
+    """Raised by a benchmark that cannot run here, e.g. without a display"""
+
+def benchmark(name: str, unit: str):
+    def register(func):
+        BENCHMARKS.append(Benchmark(name, unit, func))
+        return func
+    return register
+
+def rate(func: Callable[[], object], units: float = 1, repeat: int = 5) -> float:
+    """Best rate of func over repeat timings, each long enough to be stable"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return units * number / best
+
+class _Discard(io.RawIOBase):
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return len(data)
+
+@contextlib.contextmanager
+def _quiet():
+    """Send sys.stdout to a byte sink without a file descriptor"""
+    stream = io.TextIOWrapper(io.BufferedWriter(_Discard()), encoding='utf-8')
+    with contextlib.redirect_stdout(stream):
+        yield
+
+# Parsing and lookup
+
+@benchmark('parser.parse_line', 'lines/sec')
+def bench_parser():
+    from src.core.command_parser import CommandParser
+    from tests.bench_command_parser import LINES
+
+    parser = CommandParser(cache_size=0)
+    return rate(lambda: [parser.parse_line(line) for line in LINES], len(LINES))
+
+@benchmark('parser.parse_line (cached)', 'lines/sec')
+def bench_parser_cached():
+    from src.core.command_parser import CommandParser
+    from tests.bench_command_parser import LINES
+
+    parser = CommandParser()
+    return rate(lambda: [parser.parse_line(line) for line in LINES], len(LINES))
+
+@benchmark('parser.parse_line (300 aliases)', 'lines/sec')
+def bench_parser_aliases():
+    from src.core.command_parser import CommandParser
+    from src.utils.aliases import AliasManager
+    from tests.bench_command_parser import LINES
+
+    aliases = AliasManager()
+    for i in range(300):
+        aliases.add_alias(f"a{i}", f"git log --oneline -n {i}")
+    aliases.add_alias('ls', 'ls --color=auto')
+    aliases.add_alias('grep', 'grep --color=auto')
+    parser = CommandParser(cache_size=0, aliases=aliases)
+    return rate(lambda: [parser.parse_line(line) for line in LINES], len(LINES))
+
+@benchmark('executable_finder.find_executable', 'lookups/sec')
+def bench_find_executable():
+    from src.core.executable_finder import ExecutableFinder
+
+    finder = ExecutableFinder()
+    names = ['ls', 'grep', 'python3', 'git', 'nonexistentcommand123']
+    return rate(lambda: [finder.find_executable(name) for name in names], len(names))
+
+@benchmark('executable_finder.rehash', 'rehashes/sec')
+def bench_rehash():
+    from src.core.executable_finder import ExecutableFinder
+
+    finder = ExecutableFinder()
+
+    def cold_lookup():
+        finder.rehash()
+        finder.find_executable('ls')
+    return rate(cold_lookup, repeat=3)
+
+# Execution
+
+@benchmark('shell.execute_command builtin', 'commands/sec')
+def bench_execute_builtin():
+    from src.core.shell import Shell
+
+    shell = Shell(interactive=False)
+    with _quiet():
+        return rate(lambda: shell.execute_command('pwd'))
+
+@benchmark('shell.execute_command external', 'commands/sec')
+def bench_execute_external():
+    from src.core.shell import Shell
+
+    shell = Shell(interactive=False)
+    if not shell.executor.find_executable('true'):
+        raise Skipped("needs 'true'")
+    with _quiet():
+        return rate(lambda: shell.execute_command('true'), repeat=3)
+
+@benchmark('launcher.spawn', 'spawns/sec')
+def bench_launcher_spawn():
+    from src.core.launcher import Launcher
+
+    if not os.path.exists('/bin/true'):
+        raise Skipped("needs /bin/true")
+    launcher = Launcher()
+    return rate(lambda: launcher.spawn(['/bin/true']).wait(), repeat=3)
+
+def _pipeline_rate(size: int, to_file: bool) -> float:
+    from src.core.pipeline import Pipeline
+
+    stages = [('head', ['head', '-c', str(size), '/dev/zero']), ('cat', ['cat'])]
+
+    def run():
+        if to_file:
+            with open(os.devnull, 'wb') as sink:
+                pipeline = Pipeline(stages, stdout=sink)
+                pipeline.start()
+                pipeline.wait()
+        else:
+            with _quiet():
+                pipeline = Pipeline(stages)
+                pipeline.start()
+                pipeline.wait()
+    return rate(run, size / 1e6, repeat=3)
+
+@benchmark('pipeline throughput (fd passthrough)', 'MB/sec')
+def bench_pipeline_passthrough():
+    if not os.path.exists('/dev/zero'):
+        raise Skipped("needs /dev/zero")
+    return _pipeline_rate(64 * 1024 * 1024, to_file=True)
+
+@benchmark('pipeline throughput (forwarded)', 'MB/sec')
+def bench_pipeline_forwarded():
+    if not os.path.exists('/dev/zero'):
+        raise Skipped("needs /dev/zero")
+    return _pipeline_rate(64 * 1024 * 1024, to_file=False)
+
+@benchmark('globbing **/*.py (20k files)', 'expansions/sec')
+def bench_glob_recursive():
+    from src.core.globbing import Globber
+
+    with tempfile.TemporaryDirectory() as root:
+        for i in range(200):
+            directory = os.path.join(root, f"pkg{i % 20}", f"mod{i}")
+            os.makedirs(directory)
+            for j in range(100):
+                open(os.path.join(directory, f"f{j}.py" if j % 2 else f"f{j}.txt"), 'w').close()
+        globber = Globber()
+        pattern = os.path.join(root, '**', '*.py')
+        return rate(lambda: globber.glob(pattern), repeat=3)
+
+# Interactive features
+
+@benchmark('completion.complete_path (20k entries)', 'completions/sec')
+def bench_completion():
+    from src.core.completion import CompletionEngine
+    from src.core.executable_finder import ExecutableFinder
+
+    engine = CompletionEngine(ExecutableFinder())
+    with tempfile.TemporaryDirectory() as root:
+        for i in range(20000):
+            open(os.path.join(root, f"file{i:05d}.txt"), 'w').close()
+        prefix = os.path.join(root, 'file1')
+        return rate(lambda: engine.complete_path(prefix))
+
+@benchmark('completion.complete_path (20k entries, cold)', 'completions/sec')
+def bench_completion_cold():
+    from src.core.completion import CompletionEngine
+    from src.core.executable_finder import ExecutableFinder
+
+    engine = CompletionEngine(ExecutableFinder())
+    with tempfile.TemporaryDirectory() as root:
+        for i in range(20000):
+            open(os.path.join(root, f"file{i:05d}.txt"), 'w').close()
+        prefix = os.path.join(root, 'file1')
+
+        def cold():
+            engine.invalidate()
+            engine.complete_path(prefix)
+        return rate(cold, repeat=3)
+
+@benchmark('history load (100k-line file)', 'loads/sec')
+def bench_history_load():
+    from src.utils.history import HistoryManager
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'history')
+        with open(path, 'w') as f:
+            f.writelines(f"git commit -m 'change {i}'\n" for i in range(100000))
+        history = HistoryManager(path)
+        return rate(history.load_history)
+
+@benchmark('history add + save', 'commands/sec')
+def bench_history_save():
+    from src.utils.history import HistoryManager
+
+    with tempfile.TemporaryDirectory() as root:
+        history = HistoryManager(os.path.join(root, 'history'))
+        history.load_history()
+        commands = [f"make target{i}" for i in range(1000)]
+
+        def add_and_save():
+            for command in commands:
+                history.add_command(command)
+            history.save_history()
+        return rate(add_and_save, len(commands), repeat=3)
+
+@benchmark('gui TerminalWidget.write', 'lines/sec')
+def bench_terminal_write():
+    try:
+        import tkinter as tk
+        from src.gui.main_window import TerminalWidget
+        root = tk.Tk()
+    except Exception as e:
+        raise Skipped(f"needs Tk, ttkthemes and a display ({e.__class__.__name__})")
+    try:
+        from src.core.shell import Shell
+        from tests.bench_terminal_widget import LINE
+
+        terminal = TerminalWidget(root, Shell(interactive=False))
+        terminal.pack()
+        root.update()
+
+        def write_batch():
+            for _ in range(1000):
+                terminal.write(LINE)
+            terminal.flush()
+            root.update()
+        return rate(write_batch, 1000, repeat=3)
+    finally:
+        root.destroy()
+
+# Running and reporting
+
+def run(pattern: Optional[str] = None) -> Dict[str, dict]:
+    """Run the benchmarks whose name contains pattern"""
+    results = {}
+    for bench in BENCHMARKS:
+        if pattern and pattern not in bench.name:
+            continue
+        try:
+            value = bench.run()
+        except Skipped as e:
+            print(f"{bench.name:<46} skipped: {e}")
+            continue
+        results[bench.name] = {'value': value, 'unit': bench.unit}
+        print(f"{bench.name:<46} {value:>14,.1f} {bench.unit}")
+    return results
+
+def save(path: str, results: Dict[str, dict]):
+    """Store results as a baseline, along with where they were measured"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    document = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+
+def load(path: str) -> Dict[str, dict]:
+    with open(path) as f:
+        return json.load(f)['results']
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict],
+            threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Print a comparison report; returns the names of regressed benchmarks"""
+    regressions = []
+    print(f"\n{'benchmark':<46} {'baseline':>14} {'current':>14} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None or not before['value']:
+            print(f"{name:<46} {'-':>14} {result['value']:>14,.1f} {'new':>8}")
+            continue
+        change = (result['value'] - before['value']) / before['value'] * 100
+        status = ''
+        if change < -threshold:
+            status = '  REGRESSION'
+            regressions.append(name)
+        elif change > threshold:
+            status = '  improved'
+        print(f"{name:<46} {before['value']:>14,.1f} {result['value']:>14,.1f} {change:>+7.1f}%{status}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {threshold:g}%")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-k', dest='pattern', help="only run benchmarks whose name contains this")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline file")
+    parser.add_argument('--save', action='store_true', help="store the results as the baseline")
+    parser.add_argument('--compare', action='store_true', help="compare against the baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown in percent reported as a regression")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        try:
+            baseline = load(args.baseline)
+        except FileNotFoundError:
+            print(f"No baseline at {args.baseline}; run with --save first")
+            return 2
+    results = run(args.pattern)
+    status = 0
+    if baseline is not None and compare(results, baseline, args.threshold):
+        status = 1
+    if args.save:
+        save(args.baseline, results)
+        print(f"\nBaseline saved to {args.baseline}")
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
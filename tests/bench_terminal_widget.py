@@ -0,0 +1,62 @@
+"""Output rendering throughput of TerminalWidget against the original write path.
+
+Needs Tk, ttkthemes and a display. Run with: python -m tests.bench_terminal_widget
+or, on a machine without a display: xvfb-run python -m tests.bench_terminal_widget
+"""
+import sys
+import time
+import tkinter as tk
+from src.core.shell import Shell
+
+LINE = "drwxr-xr-x  2 user user  4096 Jan  1 00:00 some-directory-name\n"
+
+def legacy_write(terminal, text):
+    """The write path this widget replaced: insert, scroll and renumber every line"""
+    terminal.output.insert(tk.END, text)
+    terminal.output.see(tk.END)
+    lines = terminal.output.get('1.0', tk.END).count('\n')
+    terminal.linenumbers.config(state='normal')
+    terminal.linenumbers.delete('1.0', tk.END)
+    for i in range(1, lines + 1):
+        terminal.linenumbers.insert(tk.END, f'{i}\n')
+    terminal.linenumbers.config(state='disabled')
+
+def lines_per_second(root, write, count):
+    from src.gui.main_window import TerminalWidget
+
+    terminal = TerminalWidget(root, Shell(interactive=False))
+    terminal.pack()
+    root.update()
+    started = time.perf_counter()
+    for _ in range(count):
+        write(terminal, LINE)
+    terminal.flush()
+    root.update()
+    seconds = time.perf_counter() - started
+    terminal.destroy()
+    return count / seconds
+
+def run():
+    from src.gui.main_window import TerminalWidget
+
+    root = tk.Tk()
+    try:
+        results = {
+            # Quadratic, so measured over far fewer lines
+            'unbatched writes': lines_per_second(root, legacy_write, 2000),
+            'batched writes': lines_per_second(root, TerminalWidget.write, 100000),
+        }
+    finally:
+        root.destroy()
+    for name, rate in results.items():
+        print(f"{name:<18} {rate:>12,.0f} lines/sec")
+    return results
+
+if __name__ == '__main__':
+    try:
+        import ttkthemes  # noqa: F401  needed by src.gui.main_window
+        tk.Tk().destroy()
+    except (ImportError, tk.TclError) as e:
+        print(f"skipped: needs ttkthemes and a display, e.g. under xvfb-run ({e.__class__.__name__})")
+        sys.exit(0)
+    run()
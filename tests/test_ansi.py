@@ -0,0 +1,55 @@
+import pytest
+from src.gui.ansi import COLORS_16, DEFAULT_STYLE, MAX_PARTIAL, AnsiParser, Style
+
+RED = Style(fg=COLORS_16[1])
+
+class TestAnsiParser:
+    @pytest.fixture
+    def parser(self):
+        return AnsiParser()
+
+    def test_plain_text(self, parser):
+        assert parser.feed("hello\n") == [("hello\n", DEFAULT_STYLE)]
+        assert parser.feed("") == []
+
+    def test_sgr_colors(self, parser):
+        assert parser.feed("a\x1b[31mred\x1b[0mb") == [
+            ("a", DEFAULT_STYLE), ("red", RED), ("b", DEFAULT_STYLE)]
+
+    def test_attributes_combine(self, parser):
+        spans = parser.feed("\x1b[1;4;92;44mX\x1b[22mY")
+        assert spans == [
+            ("X", Style(fg=COLORS_16[10], bg=COLORS_16[4], bold=True, underline=True)),
+            ("Y", Style(fg=COLORS_16[10], bg=COLORS_16[4], underline=True)),
+        ]
+
+    def test_extended_colors(self, parser):
+        assert parser.feed("\x1b[38;5;196mX")[0][1].fg == '#FF0000'
+        assert parser.feed("\x1b[38;5;244mX")[0][1].fg == '#808080'
+        assert parser.feed("\x1b[48;2;1;2;3mX")[0][1].bg == '#010203'
+
+    def test_style_carries_across_chunks(self, parser):
+        parser.feed("\x1b[31m")
+        assert parser.feed("still red") == [("still red", RED)]
+
+    def test_sequence_split_across_chunks(self, parser):
+        assert parser.feed("ok\x1b[3") == [("ok", DEFAULT_STYLE)]
+        assert parser.feed("1mred") == [("red", RED)]
+        assert parser.feed("\x1b") == []
+        assert parser.feed("[0mplain") == [("plain", DEFAULT_STYLE)]
+
+    def test_other_sequences_are_dropped(self, parser):
+        text = "\x1b]0;title\x07a\x1b[2K\x1b[1Ab\x1b(Bc\x1b=d"
+        assert parser.feed(text) == [("abcd", DEFAULT_STYLE)]
+
+    def test_stray_escape(self, parser):
+        assert parser.feed("a\x1b\x01b") == [("a\x01b", DEFAULT_STYLE)]
+
+    def test_unterminated_sequence_is_flushed(self, parser):
+        # e.g. cat of a binary file: an OSC that never ends
+        assert parser.feed("a\x1b]0;") == [("a", DEFAULT_STYLE)]
+        for _ in range(MAX_PARTIAL // 1000):
+            assert parser.feed("x" * 1000) == []
+        spans = parser.feed("x" * 1000)
+        assert spans == [("]0;" + "x" * (1000 * (MAX_PARTIAL // 1000 + 1)), DEFAULT_STYLE)]
+        assert parser.feed("\x1b[31mred") == [("red", RED)]
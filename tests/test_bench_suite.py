@@ -0,0 +1,28 @@
+from tests import bench_suite
+
+class TestBenchSuite:
+    def test_baseline_round_trip(self, tmp_path):
+        path = str(tmp_path / "baseline.json")
+        results = {'parse': {'value': 100.0, 'unit': 'lines/sec'}}
+        bench_suite.save(path, results)
+        assert bench_suite.load(path) == results
+
+    def test_compare_reports_regressions(self, capsys):
+        baseline = {
+            'fast': {'value': 100.0, 'unit': 'ops/sec'},
+            'slow': {'value': 100.0, 'unit': 'ops/sec'},
+        }
+        results = {
+            'fast': {'value': 95.0, 'unit': 'ops/sec'},
+            'slow': {'value': 80.0, 'unit': 'ops/sec'},
+            'added': {'value': 1.0, 'unit': 'ops/sec'},
+        }
+        assert bench_suite.compare(results, baseline, threshold=10) == ['slow']
+        report = capsys.readouterr().out
+        assert "REGRESSION" in report
+        assert "new" in report
+
+    def test_selected_benchmark_runs(self, capsys):
+        results = bench_suite.run('parser.parse_line (cached)')
+        assert list(results) == ['parser.parse_line (cached)']
+        assert results['parser.parse_line (cached)']['value'] > 0
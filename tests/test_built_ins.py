@@ -1,5 +1,6 @@
 import pytest
 import os
+import stat
 import tempfile
 from src.commands.built_ins import BuiltInCommands
 
@@ -55,4 +56,163 @@ class TestBuiltIns:
             Shell.alias_manager.add_alias(name, command)
             return True, f"Alias added: {name}='{command}'"
             
-        return False, "Usage: aliases [-s name command]"
\ No newline at end of file
+        return False, "Usage: aliases [-s name command]"
+
+
+class TestHashBuiltin:
+    def test_hash_lists_and_resets(self):
+        from src.core.shell import Shell
+        if os.name == 'nt':
+            pytest.skip("uses POSIX commands")
+        BuiltInCommands.hash(['-r'])
+        success, output = BuiltInCommands.hash(['ls'])
+        assert success == True
+        assert output.splitlines()[0] == "hits\tcommand"
+        assert Shell.executable_finder.find_executable('ls') in output
+        BuiltInCommands.hash(['-r'])
+        assert BuiltInCommands.hash([]) == (True, "hash: hash table empty")
+
+    def test_hash_unknown_command(self):
+        success, output = BuiltInCommands.hash(['nonexistentcommand123'])
+        assert success == False
+        assert "not found" in output
+
+
+class TestHistoryBuiltin:
+    def test_history_search(self):
+        history = BuiltInCommands.history_manager
+        history.clear_history()
+        for command in ["ls -la", "git status", "git stash"]:
+            history.add_command(command)
+        success, output = BuiltInCommands.history(['-s', 'stat'])
+        assert success == True
+        assert output == "git status"
+        assert BuiltInCommands.history(['-s'])[0] == False
+        history.clear_history()
+
+
+class TestStreamingLs:
+    def test_listing_in_batches(self, tmp_path):
+        from src.commands import built_ins
+        names = [f"file{i:04d}" for i in range(built_ins.LS_BATCH + 10)]
+        for name in names:
+            (tmp_path / name).touch()
+        chunks = list(BuiltInCommands.iter_ls([str(tmp_path)]))
+        assert len(chunks) == 2
+        assert ''.join(chunks) == ''.join(name + '\n' for name in names)
+        assert BuiltInCommands.ls([str(tmp_path)]) == (True, '\n'.join(names))
+
+    def test_long_format(self, tmp_path):
+        (tmp_path / "data.txt").write_text("hello")
+        (tmp_path / "sub").mkdir()
+        success, output = BuiltInCommands.ls(['-l', str(tmp_path)])
+        assert success == True
+        data, sub = output.splitlines()
+        assert data.startswith('-rw') and data.endswith(' data.txt')
+        assert data.split()[4] == '5'
+        assert sub.startswith('d') and sub.endswith(' sub')
+
+    def test_missing_directory(self):
+        success, output = BuiltInCommands.ls(['nonexistent_dir_123'])
+        assert success == False
+        assert "No such directory" in output
+
+
+class TestFileOperations:
+    @pytest.fixture
+    def tree(self, tmp_path):
+        source = tmp_path / "src"
+        for i in range(5):
+            sub = source / f"dir{i}" / "nested"
+            sub.mkdir(parents=True)
+            for j in range(30):
+                (sub / f"file{j}.txt").write_text(f"{i}-{j}" * (j + 1))
+        (source / "big.bin").write_bytes(os.urandom(3 * 1024 * 1024))
+        return source
+
+    @staticmethod
+    def contents(root):
+        return {
+            path.relative_to(root): path.read_bytes()
+            for path in root.rglob('*') if path.is_file()
+        }
+
+    def test_copy_tree_in_parallel(self, tree, tmp_path):
+        dest = tmp_path / "dest"
+        success, output = BuiltInCommands.cp(['-j', '4', str(tree), str(dest)])
+        assert (success, output) == (True, "")
+        assert self.contents(dest) == self.contents(tree)
+        big = tree / "big.bin"
+        assert (dest / "big.bin").stat().st_mtime_ns == big.stat().st_mtime_ns
+
+    def test_directory_times_and_modes_survive_parallel_copy(self, tree, tmp_path):
+        directories = [tree] + [path for path in tree.rglob('*') if path.is_dir()]
+        for path in directories:
+            os.utime(path, ns=(10 ** 18, 10 ** 18))
+        read_only = tree / "dir0" / "nested"
+        read_only.chmod(0o555)
+        dest = tmp_path / "dest"
+        try:
+            assert BuiltInCommands.cp(['-j', '8', str(tree), str(dest)]) == (True, "")
+        finally:
+            read_only.chmod(0o755)
+        assert self.contents(dest) == self.contents(tree)
+        for path in directories:
+            assert (dest / path.relative_to(tree)).stat().st_mtime_ns == 10 ** 18
+        copied = dest / "dir0" / "nested"
+        assert stat.S_IMODE(copied.stat().st_mode) == 0o555
+        copied.chmod(0o755)
+
+    def test_copy_into_existing_directory(self, tree, tmp_path):
+        dest = tmp_path / "dest"
+        dest.mkdir()
+        assert BuiltInCommands.cp([str(tree), str(dest)]) == (True, "")
+        assert self.contents(dest / "src") == self.contents(tree)
+        assert not (dest / "big.bin").exists()
+        # Copying the contents merges into the directory instead
+        assert BuiltInCommands.cp([str(tree) + "/.", str(dest)]) == (True, "")
+        assert self.contents(dest) == {**self.contents(tree),
+                                       **{"src" / path: data for path, data in self.contents(tree).items()}}
+
+    def test_resume_completes_partial_copy(self, tree, tmp_path):
+        from src.commands import file_operations
+        dest = tmp_path / "dest"
+        BuiltInCommands.cp([str(tree), str(dest)])
+        data = (tree / "big.bin").read_bytes()
+        (dest / "big.bin").write_bytes(data[:1000])
+        (dest / "dir0" / "nested" / "file0.txt").unlink()
+
+        engine = file_operations.FileOperations(resume=True)
+        engine.copy(str(tree), str(dest))
+        assert engine.errors == []
+        assert self.contents(dest) == self.contents(tree)
+        # Only the missing file and the rest of the partial one were copied
+        assert engine.bytes == len(data) - 1000 + len("0-0")
+
+    def test_fallback_without_kernel_copy(self, tree, tmp_path, monkeypatch):
+        from src.commands import file_operations
+        monkeypatch.setattr(file_operations, '_copy_file_range', None)
+        monkeypatch.setattr(file_operations, '_sendfile', None)
+        dest = tmp_path / "dest"
+        assert BuiltInCommands.cp([str(tree), str(dest)]) == (True, "")
+        assert self.contents(dest) == self.contents(tree)
+
+    def test_copy_errors(self, tree, tmp_path):
+        success, output = BuiltInCommands.cp([str(tmp_path / "missing"), str(tmp_path / "x")])
+        assert success == False
+        assert "No such file or directory" in output
+        assert BuiltInCommands.cp([str(tree), str(tree / "inside")])[0] == False
+        assert BuiltInCommands.cp(['-j', 'x', 'a', 'b'])[0] == False
+
+    def test_move_and_remove(self, tree, tmp_path):
+        expected = self.contents(tree)
+        moved = tmp_path / "moved"
+        assert BuiltInCommands.mv([str(tree), str(moved)]) == (True, "")
+        assert not tree.exists()
+        assert self.contents(moved) == expected
+
+        success, output = BuiltInCommands.rm([str(moved)])
+        assert success == False
+        assert "Is a directory" in output
+        assert BuiltInCommands.rm(['-r', '-j', '8', str(moved)]) == (True, "")
+        assert not moved.exists()
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import pytest
+from src.commands.built_ins import BuiltInCommands
+from src.commands.command_executor import ParallelExecutor
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason="requires POSIX utilities")
+
+class TestParallelExecutor:
+    def test_build_commands(self):
+        commands = list(ParallelExecutor.build_commands(['gzip', '-k', '{}'], [['a', 'b']]))
+        assert commands == [(('a',), ['gzip', '-k', 'a']), (('b',), ['gzip', '-k', 'b'])]
+
+    def test_build_commands_appends_and_combines(self):
+        commands = list(ParallelExecutor.build_commands(['echo', '{#}'], [['a', 'b'], ['x']]))
+        assert [argv for _, argv in commands] == [['echo', '1', 'a', 'x'], ['echo', '2', 'b', 'x']]
+
+    def test_concurrency_is_bounded(self):
+        executor = ParallelExecutor(jobs=2)
+        script = "import time; time.sleep(0.2)"
+        commands = [((str(i),), [sys.executable, '-c', script]) for i in range(4)]
+        began = time.monotonic()
+        results = executor.run(commands)
+        elapsed = time.monotonic() - began
+        assert [job.returncode for job in results] == [0, 0, 0, 0]
+        # Two rounds of two jobs: clearly parallel, clearly not all at once
+        assert 0.35 < elapsed < 0.75
+
+    def test_keep_order_and_tag(self, capsys):
+        executor = ParallelExecutor(jobs=3, keep_order=True, tag=True)
+        commands = [((str(delay),), ['sh', '-c', f'sleep 0.{delay}; echo done'])
+                    for delay in (3, 1, 2)]
+        results = executor.run(commands)
+        assert capsys.readouterr().out == "3\tdone\n1\tdone\n2\tdone\n"
+        assert all(job.duration > 0 for job in results)
+
+    def test_builtin_reports_failures(self, tmp_path):
+        joblog = tmp_path / "jobs.tsv"
+        success, output = BuiltInCommands.parallel(['--joblog', str(joblog), 'sh', '-c', 'exit {}', ':::', '0', '3'])
+        assert success == False
+        assert output == "parallel: 1 of 2 jobs failed"
+        rows = [line.split('\t') for line in joblog.read_text().splitlines()]
+        assert rows[0] == ["Seq", "Starttime", "JobRuntime", "Exitval", "Command"]
+        assert [row[3] for row in rows[1:]] == ["0", "3"]
+
+    def test_builtin_usage(self):
+        assert BuiltInCommands.parallel(['echo'])[0] == False
+        assert BuiltInCommands.parallel(['-j', 'x', 'echo', ':::', 'a'])[0] == False
+
+    def test_shell_runs_jobs_through_launcher(self, tmp_path, monkeypatch):
+        from src.core.shell import Shell
+
+        shell = Shell(interactive=False)
+        spawned = []
+        spawn = shell.launcher.spawn
+
+        def recording_spawn(argv, **kwargs):
+            spawned.append(argv)
+            return spawn(argv, **kwargs)
+        monkeypatch.setattr(shell.launcher, 'spawn', recording_spawn)
+        target = tmp_path / "out.txt"
+        shell.execute_command(f"parallel -k echo {{}} ::: a b c > {target}")
+        assert shell.last_status == 0
+        # Output follows the redirection instead of going to sys.stdout
+        assert target.read_text() == "a\nb\nc\n"
+        assert len(spawned) == 3
+
+    def test_output_streams_into_pipeline(self, capsys):
+        from src.core.shell import Shell
+
+        Shell(interactive=False).execute_command("parallel -k echo {} ::: b a | sort -r")
+        assert capsys.readouterr().out == "b\na\n"
@@ -1,5 +1,5 @@
 import pytest
-from src.core.command_parser import CommandParser
+from src.core.command_parser import CommandParser, IncompleteInput, ParseError, LITERAL, SINGLE, DOUBLE
 
 class TestCommandParser:
     @pytest.fixture
@@ -24,4 +24,62 @@ class TestCommandParser:
         assert cmd == "ls"
         assert args == ["-l"]
         assert len(piped) == 1
-        assert piped[0] == ("grep", [".py"])
\ No newline at end of file
+        assert piped[0] == ("grep", [".py"])
+class TestCommandParserAST:
+    @pytest.fixture
+    def parser(self):
+        return CommandParser()
+
+    def test_quotes_and_escapes(self, parser):
+        command = parser.parse_line("echo 'a b' \"c d\" e\\ f").items[0][0].commands[0]
+        assert command.argv == ["echo", "a b", "c d", "e f"]
+
+    def test_redirections_with_fds(self, parser):
+        command = parser.parse_line("cmd < in >> out 2>&1").items[0][0].commands[0]
+        assert command.argv == ["cmd"]
+        assert [(r.fd, r.op, r.target.value) for r in command.redirects] == [
+            (0, '<', 'in'), (1, '>>', 'out'), (2, '>&', '1')
+        ]
+
+    def test_lists_and_background(self, parser):
+        items = parser.parse_line("a && b || c; d &").items
+        assert [(p.commands[0].argv[0], op) for p, op in items] == [
+            ('a', '&&'), ('b', '||'), ('c', ';'), ('d', '&')
+        ]
+
+    def test_operators_inside_quotes_and_substitutions(self, parser):
+        items = parser.parse_line("echo '|' \"&&\" $(ls | wc -l)").items
+        assert len(items) == 1
+        assert items[0][0].commands[0].argv == ["echo", "|", "&&", "$(ls | wc -l)"]
+
+    def test_word_kinds(self, parser):
+        word = parser.parse_line("echo a'$b'\"c\"").items[0][0].commands[0].words[1]
+        assert word.parts == ((LITERAL, 'a'), (SINGLE, '$b'), (DOUBLE, 'c'))
+        assert word.quoted
+
+    @pytest.mark.parametrize("line", ["ls | | sort", "a &&", "echo 'x", "ls >", "; ls"])
+    def test_syntax_errors(self, parser, line):
+        with pytest.raises(ParseError):
+            parser.parse_line(line)
+
+    def test_here_documents(self, parser):
+        items = parser.parse_line("cat <<EOF | wc -l\nhello $USER\nEOF\necho done").items
+        command = items[0][0].commands[0]
+        assert [(r.fd, r.op, r.target.parts) for r in command.redirects] == [
+            (0, '<<', ((DOUBLE, 'hello $USER\n'),))
+        ]
+        assert items[1][0].commands[0].argv == ["echo", "done"]
+
+    def test_quoted_and_tab_stripped_here_documents(self, parser):
+        command = parser.parse_line("cat <<-'END'\n\t$x\n\tEND").items[0][0].commands[0]
+        assert command.redirects[0].target.parts == ((SINGLE, '$x\n'),)
+
+    @pytest.mark.parametrize("line", ["cat <<EOF", "cat <<EOF\nbody\n"])
+    def test_unterminated_here_document(self, parser, line):
+        with pytest.raises(IncompleteInput):
+            parser.parse_line(line)
+
+    def test_parse_cache(self, parser):
+        first = parser.parse_line("ls -l | grep py")
+        assert parser.parse_line("ls -l | grep py") is first
+        assert parser.parse_line.cache_info().hits == 1
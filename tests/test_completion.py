@@ -0,0 +1,71 @@
+import os
+import pytest
+from src.core.completion import CompletionEngine
+from src.core.executable_finder import ExecutableFinder
+
+@pytest.fixture
+def bin_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "bin"
+    directory.mkdir()
+    for name in ("mytool", "mytask"):
+        tool = directory / name
+        tool.write_text("#!/bin/sh\n")
+        tool.chmod(0o755)
+    (directory / "mydata").write_text("not executable")
+    monkeypatch.setenv('PATH', str(directory))
+    return directory
+
+@pytest.fixture
+def engine(bin_dir):
+    return CompletionEngine(ExecutableFinder(check_interval=0),
+                            builtins={'mkdir': None, 'myecho': None},
+                            aliases={'myll': 'ls -l'})
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    directory = tmp_path / "work"
+    directory.mkdir()
+    (directory / "notes.txt").touch()
+    (directory / "notebooks").mkdir()
+    (directory / ".hidden").touch()
+    monkeypatch.chdir(directory)
+    return directory
+
+@pytest.mark.skipif(os.name == 'nt', reason="uses POSIX permissions")
+class TestCompletionEngine:
+    def test_commands_from_builtins_aliases_and_path(self, engine):
+        assert engine.candidates("my", 0, "my") == ["myecho ", "myll ", "mytask ", "mytool "]
+
+    def test_command_position_after_pipe(self, engine):
+        assert engine.candidates("ls | myt", 5, "myt") == ["mytask ", "mytool "]
+
+    def test_arguments_complete_paths(self, engine, workdir):
+        assert engine.candidates("cat note", 4, "note") == ["notebooks/", "notes.txt "]
+
+    def test_hidden_files_only_when_asked(self, engine, workdir):
+        assert engine.complete_path("") == ["notebooks/", "notes.txt "]
+        assert engine.complete_path(".h") == [".hidden "]
+
+    def test_paths_in_subdirectories(self, engine, workdir):
+        (workdir / "notebooks" / "draft.md").touch()
+        assert engine.complete_path("notebooks/d") == ["notebooks/draft.md "]
+        assert engine.complete_path(str(workdir) + "/notes") == [str(workdir) + "/notes.txt "]
+
+    def test_listing_is_reused_until_mtime_changes(self, engine, workdir, monkeypatch):
+        engine.complete_path("no")
+        calls = []
+        scandir = os.scandir
+        monkeypatch.setattr(os, 'scandir', lambda path: calls.append(path) or scandir(path))
+        engine.complete_path("no")
+        assert calls == []
+        (workdir / "novel.txt").touch()
+        os.utime(workdir, ns=(0, os.stat(workdir).st_mtime_ns + 10**9))
+        assert "novel.txt " in engine.complete_path("no")
+        assert len(calls) == 1
+
+    def test_new_executables_are_completed(self, engine, bin_dir):
+        tool = bin_dir / "mynew"
+        tool.write_text("#!/bin/sh\n")
+        tool.chmod(0o755)
+        os.utime(bin_dir, ns=(0, os.stat(bin_dir).st_mtime_ns + 10**9))
+        assert "mynew " in engine.complete_command("myn")
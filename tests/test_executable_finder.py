@@ -32,4 +32,28 @@ class TestExecutableFinder:
         else:
             cmd = '/bin/ls'
         path = finder.find_executable(cmd)
-        assert path is not None
\ No newline at end of file
+        assert path is not None
+
+    @pytest.mark.skipif(os.name == 'nt', reason="uses POSIX permissions")
+    def test_cache_and_invalidation(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('PATH', str(tmp_path))
+        finder = ExecutableFinder(check_interval=0)
+        assert finder.find_executable("mytool") is None
+
+        tool = tmp_path / "mytool"
+        tool.write_text("#!/bin/sh\n")
+        tool.chmod(0o755)
+        assert finder.find_executable("mytool") == str(tool)
+        assert finder.find_executable("mytool") == str(tool)
+        assert finder.hits["mytool"] == 2
+
+        # Removing the file changes the directory mtime
+        tool.unlink()
+        assert finder.find_executable("mytool") is None
+
+    def test_rehash(self, finder):
+        finder.find_executable('ls' if os.name != 'nt' else 'cmd')
+        assert finder.hashed()
+        finder.rehash()
+        assert finder.hashed() == {}
+        assert finder.hits == {}
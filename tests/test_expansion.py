@@ -0,0 +1,184 @@
+import os
+import pytest
+from src.core.command_parser import CommandParser
+from src.core.expansion import Expander, ExpansionError
+from src.core.shell import Shell
+from src.utils.environment import Environment
+
+class TestExpander:
+    @pytest.fixture
+    def expander(self):
+        environment = Environment()
+        environment.variables.update({'NAME': 'world', 'SPACED': 'a  b', 'EMPTY': '', 'N': '7'})
+        calls = []
+
+        def substitute(command):
+            calls.append(command)
+            return f"<{command}>\n\n"
+        expander = Expander(environment, substitute=substitute, status=lambda: 3)
+        expander.calls = calls
+        return expander
+
+    def expand(self, expander, line):
+        command = CommandParser(cache_size=0).parse_line(line).items[0][0].commands[0]
+        return expander.expand(command.words)
+
+    def test_variables(self, expander):
+        assert self.expand(expander, 'echo $NAME ${NAME}! $? ${#NAME}') == ['echo', 'world', 'world!', '3', '5']
+
+    def test_quoting(self, expander):
+        assert self.expand(expander, '''echo '$NAME' "$NAME" \\$NAME''') == ['echo', '$NAME', 'world', '$NAME']
+
+    def test_field_splitting(self, expander):
+        assert self.expand(expander, 'echo $SPACED "$SPACED" x$SPACED') == ['echo', 'a', 'b', 'a  b', 'xa', 'b']
+
+    def test_empty_expansion_drops_unquoted_word(self, expander):
+        assert self.expand(expander, 'echo $EMPTY $UNSET_VARIABLE_XYZ "$EMPTY"') == ['echo', '']
+
+    def test_defaults(self, expander):
+        assert self.expand(expander, 'echo ${EMPTY:-d} ${EMPTY-d} ${NAME:+alt} ${UNSET_VARIABLE_XYZ:+alt}') == \
+            ['echo', 'd', 'alt']
+        assert self.expand(expander, 'echo "${UNSET_VARIABLE_XYZ:-two words}"') == ['echo', 'two words']
+
+    def test_assign_default(self, expander):
+        try:
+            assert self.expand(expander, 'echo ${EXPANSION_TEST_XYZ:=set}') == ['echo', 'set']
+            assert expander.environment.get('EXPANSION_TEST_XYZ') == 'set'
+        finally:
+            expander.environment.unset('EXPANSION_TEST_XYZ')
+
+    def test_error_if_unset(self, expander):
+        with pytest.raises(ExpansionError, match='UNSET_VARIABLE_XYZ: missing'):
+            self.expand(expander, 'echo ${UNSET_VARIABLE_XYZ:?missing}')
+        with pytest.raises(ExpansionError, match='bad substitution'):
+            self.expand(expander, 'echo ${NAME%x}')
+
+    def test_positional_parameters(self, expander):
+        expander.parameters = lambda: ['prog', 'one', 'two words']
+        assert self.expand(expander, 'echo $0 $1 ${2} $# "$@" "x$*y" ${10:-unset}') == \
+            ['echo', 'prog', 'one', 'two', 'words', '2', 'one', 'two words', 'xone two wordsy', 'unset']
+        expander.parameters = lambda: ['prog']
+        assert self.expand(expander, 'echo "$@" $#') == ['echo', '0']
+
+    def test_arithmetic(self, expander):
+        assert self.expand(expander, 'echo $((1 + 2 * 3)) $((N / 2)) $((-7 / 2)) $((-7 % 2)) $(($N > 5 && 1))') == \
+            ['echo', '7', '3', '-3', '-1', '1']
+
+    def test_arithmetic_errors(self, expander):
+        with pytest.raises(ExpansionError, match='division by 0'):
+            expander.arithmetic('1 / 0')
+        with pytest.raises(ExpansionError, match='syntax error'):
+            expander.arithmetic('__import__("os")')
+        with pytest.raises(ExpansionError, match='exponent less than 0'):
+            expander.arithmetic('2 ** -1')
+        with pytest.raises(ExpansionError, match='negative shift count'):
+            expander.arithmetic('1 << -1')
+
+    def test_arithmetic_leading_zero_is_octal(self, expander):
+        expander.environment.variables['OCT'] = '010'
+        assert expander.arithmetic('010 + OCT') == 16
+        assert expander.arithmetic('0x10 + 0') == 16
+        with pytest.raises(ExpansionError, match='value too great for base'):
+            expander.arithmetic('08')
+
+    def test_arithmetic_wraps_to_64_bits(self, expander):
+        assert expander.arithmetic('2 ** 63') == -2 ** 63
+        assert expander.arithmetic('2 ** 64') == 0
+        # Would otherwise build numbers with billions of digits
+        assert expander.arithmetic('9 ** 9 ** 9') == -2123029214124047543
+        assert expander.arithmetic('1 << 10 ** 9') == 0
+        assert expander.arithmetic('-1 >> 100') == -1
+
+    def test_command_substitution(self, expander):
+        assert self.expand(expander, 'echo "$(ls -l | wc -l)" `pwd`') == ['echo', '<ls -l | wc -l>', '<pwd>']
+        assert expander.calls == ['ls -l | wc -l', 'pwd']
+
+    def test_static_words_are_cached(self, expander):
+        line = 'echo "plain" words'
+        assert self.expand(expander, line) == self.expand(expander, line) == ['echo', 'plain', 'words']
+
+class TestShellExpansion:
+    @pytest.fixture
+    def shell(self):
+        return Shell(interactive=False)
+
+    def test_assignment_and_expansion(self, shell, capsys):
+        try:
+            shell.execute_command('EXPANSION_TEST_XYZ=$((6 * 7))')
+            shell.execute_command('echo value=$EXPANSION_TEST_XYZ')
+            assert capsys.readouterr().out == "value=42\n"
+            assert 'EXPANSION_TEST_XYZ' not in os.environ
+        finally:
+            shell.environment.unset('EXPANSION_TEST_XYZ')
+
+    def test_only_exported_variables_reach_commands(self, shell, capsys):
+        if not shell.executor.find_executable('sh'):
+            pytest.skip("needs sh")
+        try:
+            shell.execute_command('EXPORT_TEST_XYZ=bar; sh -c \'echo "[$EXPORT_TEST_XYZ]"\'')
+            shell.execute_command('export EXPORT_TEST_XYZ; sh -c \'echo "[$EXPORT_TEST_XYZ]"\'')
+            # Once exported, later assignments are passed on too
+            shell.execute_command('EXPORT_TEST_XYZ=baz; sh -c \'echo "[$EXPORT_TEST_XYZ]"\'')
+            shell.execute_command('export EXPORT_TEST_2_XYZ=new; sh -c \'echo "[$EXPORT_TEST_2_XYZ]"\'')
+            assert capsys.readouterr().out == "[]\n[bar]\n[baz]\n[new]\n"
+            shell.execute_command('export 1bad')
+            assert shell.last_status == 1
+            assert "not a valid identifier" in capsys.readouterr().err
+        finally:
+            shell.environment.unset('EXPORT_TEST_XYZ')
+            shell.environment.unset('EXPORT_TEST_2_XYZ')
+
+    def test_positional_parameters(self, shell, capsys):
+        shell.run_string('echo "$0|$1|$2|$#|${3:-none}"; printf "<%s>" "$@"; echo; echo $*',
+                         ['script', 'a', 'b c'])
+        assert capsys.readouterr().out == "script|a|b c|2|none\n<a><b c>\na b c\n"
+
+    def test_builtin_substitution_runs_in_process(self, shell, capsys, tmp_path):
+        os.chdir(tmp_path)
+        shell.execute_command('echo "cwd: $(pwd)"')
+        assert capsys.readouterr().out == f"cwd: {tmp_path}\n"
+
+    def test_substitution_runs_in_a_subshell(self, shell, capsys, tmp_path):
+        os.chdir(tmp_path)
+        shell.execute_command('echo $(cd /; pwd); pwd')
+        assert capsys.readouterr().out == f"/\n{tmp_path}\n"
+        assert os.getcwd() == str(tmp_path)
+        try:
+            shell.execute_command('x=$(y=1; export SUBSHELL_TEST_XYZ=2); echo "[$y][$SUBSHELL_TEST_XYZ]"')
+            assert capsys.readouterr().out == "[][]\n"
+            assert 'SUBSHELL_TEST_XYZ' not in os.environ
+        finally:
+            shell.environment.unset('y')
+        shell.run_string('echo $(echo "$1")', ['prog', 'arg'])
+        assert capsys.readouterr().out == "arg\n"
+
+    def test_external_substitution(self, shell, capsys):
+        if not shell.executor.find_executable('printf'):
+            pytest.skip("needs printf")
+        shell.execute_command("echo [$(printf 'a\\nb\\n\\n')]")
+        assert capsys.readouterr().out == "[a b]\n"
+
+    def test_substitution_captures_stdout_only(self, shell, capsys):
+        if not shell.executor.find_executable('cat'):
+            pytest.skip("needs cat")
+        shell.execute_command('x=$(cat /nonexistent-file-xyz); echo "[$x]"')
+        shell.execute_command('echo "[$(cd /nonexistent-dir-xyz)]"')
+        shell.execute_command('echo "[$(missing-command-xyz)]"')
+        captured = capsys.readouterr()
+        assert captured.out == "[]\n[]\n[]\n"
+        assert "nonexistent-file-xyz" in captured.err
+        assert "nonexistent-dir-xyz" in captured.err
+        assert "missing-command-xyz" in captured.err
+
+    def test_expanded_redirect_target(self, shell, tmp_path):
+        shell.execute_command(f'OUT_DIR_XYZ={tmp_path}')
+        try:
+            shell.execute_command('echo hi > "$OUT_DIR_XYZ/out.txt"')
+            assert (tmp_path / 'out.txt').read_text() == "hi\n"
+        finally:
+            shell.environment.unset('OUT_DIR_XYZ')
+
+    def test_expansion_error_sets_status(self, shell, capsys):
+        shell.execute_command('echo ${UNSET_VARIABLE_XYZ:?not set}')
+        assert shell.last_status == 1
+        assert "not set" in capsys.readouterr().err
@@ -0,0 +1,125 @@
+import os
+import pytest
+from src.core.globbing import Globber, brace_expand, compile_component, escape, has_magic
+from src.core.launcher import argument_size, chunk_arguments
+from src.core.shell import Shell
+
+@pytest.fixture
+def tree(tmp_path):
+    for path in ('a.py', 'b.py', 'c.txt', '.hidden.py', 'src/x.py', 'src/y.txt',
+                 'src/deep/z.py', 'src/.cache/w.py', 'docs/[1].md'):
+        full = tmp_path / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text('')
+    old = os.getcwd()
+    os.chdir(tmp_path)
+    yield tmp_path
+    os.chdir(old)
+
+class TestPatterns:
+    def test_components(self):
+        assert compile_component('*.py').match('a.py')
+        assert not compile_component('*.py').match('.a.py')
+        assert compile_component('.*').match('.a')
+        assert compile_component('?.[ch]').match('x.c')
+        assert compile_component('[!a-c]*').match('d1')
+        assert not compile_component('[!a-c]*').match('b1')
+        assert compile_component('[]x]').match(']')
+        assert compile_component('\\*').match('*')
+        assert not compile_component('\\*').match('a')
+
+    def test_magic_and_escaping(self):
+        assert has_magic('*.py') and has_magic('a[b]')
+        assert not has_magic(escape('a*b?[c]'))
+        assert not has_magic('plain')
+
+    def test_brace_expand(self):
+        assert brace_expand('a{b,c{d,e}}f') == ['abf', 'acdf', 'acef']
+        assert brace_expand('f{1..3}') == ['f1', 'f2', 'f3']
+        assert brace_expand('{08..10}') == ['08', '09', '10']
+        assert brace_expand('{c..a}') == ['c', 'b', 'a']
+        assert brace_expand('{a}') == ['{a}']
+        assert brace_expand('-exec {} +') == ['-exec {} +']
+        assert brace_expand('${A:-x,y}') == ['${A:-x,y}']
+
+class TestGlobber:
+    def test_simple_and_nested(self, tree):
+        globber = Globber()
+        assert globber.glob('*.py') == ['a.py', 'b.py']
+        assert globber.glob('src/*.py') == ['src/x.py']
+        assert globber.glob('*/') == ['docs/', 'src/']
+        assert globber.glob('*.none') == []
+
+    def test_recursive(self, tree):
+        assert Globber().glob('**/*.py') == ['a.py', 'b.py', 'src/deep/z.py', 'src/x.py']
+        assert Globber().glob('src/**') == ['src/deep', 'src/deep/z.py', 'src/x.py', 'src/y.txt']
+
+    def test_parallel_walk_matches_serial(self, tree):
+        for i in range(40):
+            (tree / 'many' / f"d{i}").mkdir(parents=True)
+            (tree / 'many' / f"d{i}" / 'f.py').write_text('')
+        serial = Globber(jobs=1).glob('**/*.py')
+        assert Globber(jobs=4, parallel_threshold=2).glob('**/*.py') == serial
+        assert len(serial) == 44
+
+    def test_literal_components_are_not_listed(self, tree):
+        listings = {}
+        assert Globber().glob('src/deep/*.py', listings) == ['src/deep/z.py']
+        assert list(listings) == ['src/deep']
+
+    def test_absolute(self, tree):
+        assert Globber().glob(f"{tree}/*.txt") == [f"{tree}/c.txt"]
+
+class TestShellGlobbing:
+    @pytest.fixture
+    def shell(self):
+        return Shell(interactive=False)
+
+    def test_arguments_are_expanded(self, shell, tree, capsys):
+        shell.execute_command('echo *.py "*.py" \'*\' src/*.{py,txt} nothing*')
+        assert capsys.readouterr().out == "a.py b.py *.py * src/x.py src/y.txt nothing*\n"
+
+    def test_variables_are_globbed_unless_quoted(self, shell, tree, capsys):
+        shell.execute_command('GLOB_TEST_XYZ=*.py')
+        try:
+            shell.execute_command('echo $GLOB_TEST_XYZ "$GLOB_TEST_XYZ"')
+            assert capsys.readouterr().out == "a.py b.py *.py\n"
+        finally:
+            shell.environment.unset('GLOB_TEST_XYZ')
+
+    def test_escaped_brackets(self, shell, tree, capsys):
+        shell.execute_command('echo docs/\\[1].md docs/*')
+        assert capsys.readouterr().out == "docs/[1].md docs/[1].md\n"
+
+    def test_argument_list_too_long(self, shell, tree, capsys, monkeypatch):
+        if not shell.executor.find_executable('true'):
+            pytest.skip("needs 'true'")
+        monkeypatch.setattr(shell.launcher, 'argument_limit', lambda: 1000)
+        shell.execute_command('true ' + ' '.join(f"arg{i}" for i in range(100)))
+        assert shell.last_status == 126
+        assert "argument list too long" in capsys.readouterr().err
+
+    def test_chunked(self, shell, tree, capsys, monkeypatch):
+        if not shell.executor.find_executable('printf'):
+            pytest.skip("needs printf")
+        for i in range(100):
+            (tree / f"f{i:03d}.log").write_text('')
+        monkeypatch.setattr(shell.launcher, 'argument_limit', lambda: 1000)
+        shell.execute_command("chunked printf '%s\\n' *.log")
+        assert shell.last_status == 0
+        assert capsys.readouterr().out.split() == [f"f{i:03d}.log" for i in range(100)]
+
+class TestChunkArguments:
+    def test_batches_fit(self):
+        arguments = [f"file{i}" for i in range(1000)]
+        batches = list(chunk_arguments(['rm', '-f'], arguments, 2000))
+        assert len(batches) > 1
+        assert all(batch[:2] == ['rm', '-f'] and argument_size(batch) <= 2000 for batch in batches)
+        assert [arg for batch in batches for arg in batch[2:]] == arguments
+
+    def test_no_arguments_runs_once(self):
+        assert list(chunk_arguments(['ls'], [], 100)) == [['ls']]
+
+    def test_single_argument_too_long(self):
+        with pytest.raises(OSError):
+            list(chunk_arguments(['ls'], ['x' * 200], 100))
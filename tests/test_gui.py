@@ -1,11 +1,27 @@
 import pytest
-import tkinter as tk
 import time
+tk = pytest.importorskip("tkinter")
+pytest.importorskip("ttkthemes")
 from src.gui.main_window import MainWindow, TerminalWidget
 from src.core.shell import Shell
-pytest_plugins = ["pytest_asyncio"]
+
+def _has_display():
+    try:
+        tk.Tk().destroy()
+    except tk.TclError:
+        return False
+    return True
+
+# On a machine without one, run under a virtual display: xvfb-run python -m pytest tests/test_gui.py
+pytestmark = pytest.mark.skipif(not _has_display(), reason="needs a display (try xvfb-run)")
 
 class TestGUI:
+    @pytest.fixture(autouse=True)
+    def home_files(self, tmp_path, monkeypatch):
+        # The interactive shells below keep their rc and history files here
+        monkeypatch.setattr(Shell, 'RC_FILE', str(tmp_path / '.myshellrc'))
+        monkeypatch.setattr(Shell, 'HISTORY_FILE', str(tmp_path / '.myshell_history'))
+
     @pytest.fixture
     def gui(self):
         root = tk.Tk()
@@ -77,4 +93,45 @@ class TestGUI:
 
     def test_window_close(self, main_window):
         main_window.cleanup()
-        assert len(main_window.shell.background_processes) == 0
\ No newline at end of file
+        assert len(main_window.shell.background_processes) == 0
+
+    def test_writes_are_batched(self, gui):
+        gui.write("one\n")
+        gui.write("two\n", '31')
+        assert gui.output.get("1.0", tk.END).strip() == ""
+        gui.flush()
+        assert gui.output.get("1.0", tk.END) == "one\ntwo\n\n"
+        assert gui.linenumbers.get("1.0", tk.END).split() == ["1", "2", "3"]
+
+    def test_scrollback_is_capped(self):
+        root = tk.Tk()
+        try:
+            terminal = TerminalWidget(root, Shell(), max_scrollback=100)
+            for i in range(1, 501):
+                terminal.write(f"line {i}\n")
+            terminal.flush()
+            assert len(terminal.buffer) == 100
+            # Only the visible window is materialised in the Text widget
+            lines = terminal.output.get("1.0", "end-1c").split('\n')
+            assert len(lines) == terminal.visible_lines
+            assert lines[-2] == "line 500"
+            # Numbering continues from the start of the session
+            assert terminal.linenumbers.get("1.0", tk.END).split()[-1] == "501"
+        finally:
+            root.destroy()
+
+    def test_find_scrolls_to_match(self, gui):
+        for i in range(1000):
+            gui.write(f"line {i}\n")
+        assert gui.find("line 10\n") == 10
+        assert gui.top is not None
+        assert "line 10" in gui.output.get("1.0", tk.END)
+        gui.scroll_to_end()
+        assert "line 999" in gui.output.get("1.0", tk.END)
+
+    def test_ansi_output_reuses_tags(self, gui):
+        gui.write("\x1b[31mred\x1b[0m plain\n")
+        gui.write("\x1b[31mmore red\x1b[0m\n")
+        gui.flush()
+        assert gui.output.get("1.0", "3.0") == "red plain\nmore red\n"
+        assert len([tag for tag in gui.output.tag_names() if tag.startswith('ansi_')]) == 1
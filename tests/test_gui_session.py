@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+import pytest
+from src.core.shell import Shell
+from src.gui.session import DONE, ShellSession
+
+def output_of(session):
+    items = session.drain()
+    assert items and items[-1] is DONE
+    return ''.join(text for text, _ in items[:-1])
+
+@pytest.fixture
+def session():
+    session = ShellSession(Shell(interactive=False))
+    yield session
+    session.close()
+
+@pytest.mark.skipif(os.name == 'nt', reason="uses POSIX commands")
+class TestShellSession:
+    def test_output_is_queued(self, session):
+        session.submit("echo hello | cat").result(timeout=10)
+        assert output_of(session) == "hello\n"
+        assert not session.running
+
+    def test_sessions_have_their_own_directory(self, tmp_path):
+        first = ShellSession(Shell(interactive=False))
+        second = ShellSession(Shell(interactive=False))
+        try:
+            start = os.getcwd()
+            first.submit(f"cd {tmp_path}").result(timeout=10)
+            second.submit("pwd").result(timeout=10)
+            first.submit("pwd").result(timeout=10)
+            assert output_of(second).strip() == start
+            first.drain()
+            assert first.cwd == str(tmp_path)
+        finally:
+            first.close()
+            second.close()
+
+    def test_interrupt_stops_the_command_line(self, session):
+        future = session.submit("sleep 10 && echo not reached")
+        deadline = time.monotonic() + 5
+        while session.shell.foreground is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        started = time.monotonic()
+        assert session.interrupt()
+        future.result(timeout=5)
+        assert time.monotonic() - started < 2
+        assert "not reached" not in output_of(session)
+        assert session.shell.last_status == 130
+
+    def test_interrupt_when_idle(self, session):
+        assert not session.interrupt()
+
+    def test_sessions_run_concurrently(self, tmp_path):
+        first = ShellSession(Shell(interactive=False))
+        second = ShellSession(Shell(interactive=False))
+        try:
+            slow = first.submit("sleep 2 && echo slow")
+            started = time.monotonic()
+            second.submit("echo fast").result(timeout=10)
+            # The other tab's long command does not hold this one up
+            assert time.monotonic() - started < 1.5
+            assert output_of(second) == "fast\n"
+            slow.result(timeout=10)
+            assert output_of(first) == "slow\n"
+        finally:
+            first.close()
+            second.close()
+
+    def test_substitution_stays_in_its_session(self):
+        first = ShellSession(Shell(interactive=False))
+        second = ShellSession(Shell(interactive=False))
+        try:
+            captured = first.submit('echo "[$(sleep 0.5; echo inner)]"')
+            time.sleep(0.1)
+            second.submit("echo other").result(timeout=10)
+            captured.result(timeout=10)
+            assert output_of(first) == "[inner]\n"
+            assert output_of(second) == "other\n"
+        finally:
+            first.close()
+            second.close()
+
+    def test_interrupt_streaming_builtin(self, session):
+        def endless(args):
+            while True:
+                yield "y\n"
+        session.shell.built_ins['endless'] = lambda args: (True, "")
+        session.shell.streaming_builtins['endless'] = endless
+        future = session.submit("endless && echo not reached")
+        time.sleep(0.2)
+        assert session.interrupt()
+        future.result(timeout=5)
+        assert session.shell.last_status == 130
+        items = session.drain(limit=10 ** 9)
+        assert items[-1] is DONE
+        assert all(text == "y\n" for text, _ in items[:-1])
+
+    def test_interrupt_uncancellable_builtin(self, session):
+        release = threading.Event()
+        session.shell.built_ins['block'] = lambda args: (release.wait(10), "")
+        future = session.submit("block")
+        time.sleep(0.2)
+        try:
+            # Nothing can stop it, so the caller is told so
+            assert not session.interrupt()
+        finally:
+            release.set()
+        future.result(timeout=5)
+
+def test_tabs_share_one_history(tmp_path, monkeypatch):
+    import sys
+    from src.commands.built_ins import BuiltInCommands
+    from src.gui.session import session_shell
+    from src.utils.history import HistoryManager
+
+    history_file = tmp_path / "history"
+    history_file.write_text("ls -la\n")
+    monkeypatch.setattr(Shell, 'HISTORY_FILE', str(history_file))
+    monkeypatch.setattr(Shell, 'RC_FILE', str(tmp_path / "rc"))
+    monkeypatch.setattr(BuiltInCommands, 'history_manager', HistoryManager(history_file=None))
+    # Tabs never touch readline
+    monkeypatch.setitem(sys.modules, 'readline', None)
+    loads = []
+    load_history = HistoryManager.load_history
+    monkeypatch.setattr(HistoryManager, 'load_history',
+                        lambda self: loads.append(self) or load_history(self))
+
+    first, second = session_shell(), session_shell()
+    assert first.history is second.history
+    assert not first.interactive and not first.history.use_readline
+    first.history.add_command("git status")
+    third = session_shell()
+    assert third.history.get_history() == ["ls -la", "git status"]
+    assert loads == [first.history]
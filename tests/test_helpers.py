@@ -24,6 +24,12 @@ class TestShellPrompt:
         generated = prompt.generate_prompt()
         assert "~" in generated
     
+    def test_home_prefix_of_another_directory(self, prompt):
+        prompt.home = os.path.join(os.sep, 'home', 'alice')
+        assert prompt._render_cwd(prompt.home) == ":~"
+        assert prompt._render_cwd(os.path.join(prompt.home, 'src')) == f":~{os.sep}src"
+        assert prompt._render_cwd(prompt.home + '2') == f":{prompt.home}2"
+
     def test_long_path_shortening(self, prompt, tmp_path):
         # Create deep directory structure
         deep_path = tmp_path
@@ -33,4 +39,63 @@ class TestShellPrompt:
         
         os.chdir(deep_path)
         generated = prompt.generate_prompt()
-        assert "..." in generated
\ No newline at end of file
+        assert "..." in generated
+
+class TestPromptSegments:
+    @pytest.fixture
+    def prompt(self):
+        return ShellPrompt(git_timeout=5)
+
+    def test_status_jobs_and_duration(self, prompt, tmp_path):
+        os.chdir(tmp_path)
+        assert prompt.generate_prompt().endswith("]$ ")
+        generated = prompt.generate_prompt(status=127, jobs=2, duration=3.25)
+        assert generated.endswith(" jobs:2 3.2s !127]$ ")
+        # Quick commands do not show a duration
+        assert " 0.5s" not in prompt.generate_prompt(duration=0.5)
+
+    def test_segments_are_configurable(self, tmp_path):
+        os.chdir(tmp_path)
+        prompt = ShellPrompt(segments=['status'])
+        assert prompt.generate_prompt(status=1) == f"[{prompt.username}@{prompt.hostname} !1]$ "
+
+    def test_cwd_segment_is_cached(self, prompt, tmp_path, monkeypatch):
+        os.chdir(tmp_path)
+        prompt.generate_prompt()
+        calls = []
+        monkeypatch.setattr(prompt, '_render_cwd', lambda cwd: calls.append(cwd) or ":x")
+        prompt.generate_prompt()
+        assert calls == []
+        (tmp_path / "sub").mkdir()
+        os.chdir(tmp_path / "sub")
+        assert ":x]$ " in prompt.generate_prompt()
+        assert calls == [str(tmp_path / "sub")]
+
+    def test_git_branch(self, prompt, tmp_path):
+        git_dir = tmp_path / ".git"
+        git_dir.mkdir()
+        (git_dir / "HEAD").write_text("ref: refs/heads/feature\n")
+        (tmp_path / "src").mkdir()
+        os.chdir(tmp_path / "src")
+        assert "(feature" in prompt.generate_prompt()
+        (git_dir / "HEAD").write_text("0123456789abcdef\n")
+        os.utime(git_dir / "HEAD", ns=(0, os.stat(git_dir / "HEAD").st_mtime_ns + 10**9))
+        assert "(0123456" in prompt.generate_prompt()
+
+    def test_slow_git_status_never_blocks(self, prompt, tmp_path, monkeypatch):
+        import subprocess
+        import time
+
+        git_dir = tmp_path / ".git"
+        git_dir.mkdir()
+        (git_dir / "HEAD").write_text("ref: refs/heads/main\n")
+        os.chdir(tmp_path)
+
+        def slow_git(*args, **kwargs):
+            time.sleep(0.5)
+            raise subprocess.TimeoutExpired(args[0], kwargs.get('timeout'))
+
+        monkeypatch.setattr(subprocess, 'run', slow_git)
+        started = time.monotonic()
+        assert "(main)" in prompt.generate_prompt()
+        assert time.monotonic() - started < 0.25
@@ -1,6 +1,8 @@
 import pytest
 import os
-from src.utils.history import HistoryManager
+import threading
+import time
+from src.utils.history import HistoryIndex, HistoryManager
 
 class TestHistoryManager:
     @pytest.fixture
@@ -37,4 +39,138 @@ class TestHistoryManager:
     def test_get_last_command(self, history):
         history.add_command("first")
         history.add_command("last")
-        assert history.get_last_command() == "last"
\ No newline at end of file
+        assert history.get_last_command() == "last"
+
+
+class TestHistoryStore:
+    def test_ring_buffer_is_bounded(self, tmp_path):
+        history = HistoryManager(str(tmp_path / "h"), max_entries=3)
+        for i in range(10):
+            history.add_command(f"cmd {i}")
+        assert history.get_history() == ["cmd 7", "cmd 8", "cmd 9"]
+
+    def test_load_reads_only_the_tail(self, tmp_path):
+        history_file = tmp_path / "h"
+        history_file.write_text("".join(f"cmd {i}\n" for i in range(100000)))
+        history = HistoryManager(str(history_file), max_entries=5)
+        assert history.get_history() == [f"cmd {i}" for i in range(99995, 100000)]
+
+    def test_writes_are_appended_in_batches(self, tmp_path):
+        history_file = tmp_path / "h"
+        history_file.write_text("old\n")
+        history = HistoryManager(str(history_file), batch_size=3, sync_interval=3600)
+        history.add_command("one")
+        history.add_command("two")
+        assert history_file.read_text() == "old\n"
+        history.add_command("three")
+        assert history_file.read_text() == "old\none\ntwo\nthree\n"
+
+    def test_concurrent_sessions_are_merged(self, tmp_path):
+        history_file = str(tmp_path / "h")
+        first = HistoryManager(history_file, sync_interval=3600)
+        second = HistoryManager(history_file, sync_interval=3600)
+        first.get_history()
+        second.get_history()
+        first.add_command("from first")
+        second.add_command("from second")
+        first.save_history()
+        second.save_history()
+        assert second.get_history() == ["from first", "from second"]
+        with open(history_file) as f:
+            assert f.read() == "from first\nfrom second\n"
+
+    def test_appends_while_waiting_for_the_lock_are_merged(self, tmp_path):
+        fcntl = pytest.importorskip('fcntl')
+        history_file = tmp_path / "h"
+        history_file.write_text("")
+        history = HistoryManager(str(history_file), sync_interval=3600)
+        history.get_history()
+        history.add_command("ours")
+        with open(history_file, 'a') as other:
+            fcntl.flock(other, fcntl.LOCK_EX)
+            flusher = threading.Thread(target=history.flush)
+            flusher.start()
+            time.sleep(0.05)
+            # Another session appends while this one waits for the lock
+            other.write("theirs\n")
+            other.flush()
+            fcntl.flock(other, fcntl.LOCK_UN)
+        flusher.join(5)
+        assert history.get_history() == ["theirs", "ours"]
+        assert history_file.read_text() == "theirs\nours\n"
+        with open(history_file, 'a') as other:
+            other.write("later\n")
+        history.add_command("again")
+        history.flush()
+        assert history.get_history() == ["theirs", "ours", "later", "again"]
+
+    def test_multi_line_commands_stay_one_entry(self, tmp_path):
+        history_file = tmp_path / "h"
+        here_doc = "cat <<EOF\nline one\nC:\\dir\nEOF"
+        history = HistoryManager(str(history_file), sync_interval=3600)
+        history.add_command(here_doc)
+        history.add_command("echo a\\nb")
+        history.save_history()
+        assert history_file.read_text().count('\n') == 2
+        other = HistoryManager(str(history_file))
+        assert other.get_history() == [here_doc, "echo a\\nb"]
+        assert other.search("line one") == [here_doc]
+        # Merged in from another session as one entry too
+        history.add_command("ls")
+        history.flush()
+        other.add_command("pwd")
+        other.flush()
+        assert other.get_history() == [here_doc, "echo a\\nb", "ls", "pwd"]
+
+    def test_in_memory_history(self):
+        history = HistoryManager(history_file=None)
+        history.add_command("ls")
+        history.save_history()
+        assert history.get_history() == ["ls"]
+
+
+class TestHistoryIndex:
+    @pytest.fixture
+    def index(self):
+        index = HistoryIndex()
+        for command in ["git status", "git commit -m fix", "ls -la", "make test",
+                        "grep status log.txt", "git status", "docker ps"]:
+            index.add(command)
+        return index
+
+    def test_substring_uses_trigrams(self, index):
+        assert index.substring("status") == {"git status", "grep status log.txt"}
+        assert index.substring("nothing") == set()
+
+    def test_short_substring(self, index):
+        assert index.substring("ls") == {"ls -la"}
+
+    def test_prefix_matches_rank_first(self, index):
+        assert index.search("git", fuzzy=False)[:1] == ["git status"]
+        assert index.search("status", fuzzy=False) == ["git status", "grep status log.txt"]
+
+    def test_prefix_sees_commands_added_later(self, index):
+        assert index.prefix("ma") == ["make test"]
+        index.add("make install")
+        assert index.prefix("ma") == ["make install", "make test"]
+
+    def test_fuzzy_matches_subsequences(self, index):
+        assert "git status" in index.search("gst")
+        assert index.search("gst", fuzzy=False) == []
+
+    def test_frequent_and_recent_commands_rank_higher(self, index):
+        index.add("git commit -m fix")
+        index.add("git commit -m fix")
+        assert index.search("git")[0] == "git commit -m fix"
+
+    def test_limit(self, index):
+        assert len(index.search("s", limit=2)) == 2
+
+    def test_manager_search_covers_the_whole_file(self, tmp_path):
+        history_file = tmp_path / "h"
+        history_file.write_text("".join(f"cmd {i}\n" for i in range(1000)))
+        history = HistoryManager(str(history_file), max_entries=10)
+        assert "cmd 12" in history.search("cmd 12", limit=None)
+        assert "cmd 5" not in history.get_history()
+        history.add_command("cmd new")
+        assert history.search("new") == ["cmd new"]
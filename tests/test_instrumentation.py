@@ -0,0 +1,73 @@
+import json
+import os
+import pytest
+from src.utils.instrumentation import CommandTiming, Instrumentation, percentile
+
+class TestInstrumentation:
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+        assert percentile(values, 0.50) == 50
+        assert percentile(values, 0.90) == 90
+        assert percentile(values, 0.99) == 99
+        assert percentile([], 0.5) == 0.0
+
+    def test_summary_and_slowest(self):
+        instrumentation = Instrumentation(max_records=3)
+        for i, command in enumerate(["a", "b", "c", "d"]):
+            timing = CommandTiming(command)
+            timing.finish(0)
+            timing.wall = i + 1.0
+            instrumentation.record(timing)
+        assert [timing.command for timing in instrumentation.records] == ["b", "c", "d"]
+        assert instrumentation.summary()['wall'] == {'p50': 3.0, 'p90': 4.0, 'p99': 4.0, 'max': 4.0}
+        assert [timing.command for timing in instrumentation.slowest(2)] == ["d", "c"]
+
+    def test_json_lines_log(self, tmp_path):
+        path = tmp_path / "stats.jsonl"
+        instrumentation = Instrumentation(log_file=str(path))
+        for command in ["ls", "pwd"]:
+            timing = CommandTiming(command)
+            timing.finish(0)
+            instrumentation.record(timing)
+        instrumentation.close_log()
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [record['command'] for record in records] == ["ls", "pwd"]
+        assert set(records[0]) >= {'wall', 'parse', 'lookup', 'spawn', 'user', 'system', 'max_rss', 'status'}
+
+class TestShellTiming:
+    @pytest.fixture
+    def shell(self):
+        from src.core.shell import Shell
+        return Shell(interactive=False)
+
+    def test_commands_are_recorded(self, shell, capsys):
+        if os.name == 'nt':
+            pytest.skip("uses POSIX commands")
+        shell.execute_command("printf hello | cat")
+        timing = shell.instrumentation.records[-1]
+        assert timing.command == "printf hello | cat"
+        assert timing.status == 0
+        assert timing.wall >= timing.spawn > 0
+        assert timing.lookup > 0 and timing.parse > 0
+        assert timing.max_rss > 0
+
+    def test_time_keyword(self, shell, capsys):
+        if os.name == 'nt':
+            pytest.skip("uses POSIX commands")
+        shell.execute_command("time echo hi | cat")
+        captured = capsys.readouterr()
+        assert captured.out == "hi\n"
+        assert captured.err.startswith("real\t0m")
+        assert "\nuser\t" in captured.err and "\nsys\t" in captured.err
+        assert shell.last_status == 0
+
+    def test_stats_builtin(self, shell, capsys):
+        shell.execute_command("pwd")
+        shell.execute_command("stats")
+        output = capsys.readouterr().out
+        assert "1 commands" in output
+        assert "wall" in output and "max_rss" in output
+        shell.execute_command("stats -r")
+        # Only the reset itself, recorded once it finished
+        assert [timing.command for timing in shell.instrumentation.records] == ["stats -r"]
+        assert shell.built_ins['stats'](['-x'])[0] == False
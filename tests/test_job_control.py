@@ -0,0 +1,80 @@
+import os
+import subprocess
+import time
+import pytest
+from src.core.launcher import Launcher
+from src.core.shell import Shell
+from src.utils.job_control import JobControl
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason="requires POSIX job control")
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+class TestJobControl:
+    @pytest.fixture
+    def shell(self):
+        shell = Shell(interactive=False)
+        yield shell
+        shell.stop()
+
+    def test_background_pipeline_is_one_job(self, shell):
+        shell.execute_command("sleep 5 | sleep 5 &")
+        jobs = shell.job_control.list_jobs()
+        assert len(jobs) == 1
+        assert len(jobs[0].processes) == 2
+        assert jobs[0].stage_statuses() == ['Running', 'Running']
+        # All stages share the job's process group
+        assert {os.getpgid(p.pid) for p in jobs[0].processes} == {jobs[0].pgid}
+
+    def test_finished_jobs_are_reaped(self, shell):
+        shell.execute_command("true &")
+        job = shell.job_control.list_jobs()[0]
+        # Reaped by the SIGCHLD handler; nothing calls poll() here
+        assert wait_until(lambda: job.done)
+        assert job.status == 'Done'
+        assert shell.job_control.take_finished() == [job]
+        assert shell.background_processes == {}
+
+    def test_kill_and_wait_builtins(self, shell, capsys):
+        shell.execute_command("sleep 30 &")
+        shell.execute_command("kill %1")
+        shell.execute_command("wait %1")
+        assert shell.last_status == 1
+        assert shell.job_control.list_jobs() == []
+
+    def test_jobs_builtin(self, shell, capsys):
+        shell.execute_command("sleep 30 &")
+        capsys.readouterr()
+        shell.execute_command("jobs")
+        assert capsys.readouterr().out == "[1]+  Running                 sleep 30 &\n"
+
+    def test_unknown_job(self, shell, capsys):
+        shell.execute_command("fg %7")
+        assert "no such job" in capsys.readouterr().err
+
+    def test_stop_kills_jobs(self, shell):
+        shell.execute_command("sleep 30 &")
+        process = next(iter(shell.background_processes.values()))
+        shell.stop()
+        assert process.returncode is not None
+        assert shell.background_processes == {}
+
+    def test_fallback_waiter_thread(self):
+        job_control = JobControl()
+        job_control._use_sigchld = False
+        process = subprocess.Popen(['true'])
+        job = job_control.add_job([process], 'true')
+        assert wait_until(lambda: job.done)
+
+    def test_job_reaped_elsewhere_has_unknown_status(self):
+        job_control = JobControl()
+        process = Launcher().spawn(['true'])
+        os.waitpid(process.pid, 0)
+        job = job_control.add_job([process], 'true')
+        assert wait_until(lambda: job.done)
+        assert job.status == 'Unknown'
+        assert job.returncode is None
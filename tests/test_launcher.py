@@ -0,0 +1,73 @@
+import os
+import signal
+import subprocess
+import pytest
+from src.core.launcher import Launcher, SpawnedProcess
+from src.utils.environment import Environment
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'posix_spawn'), reason="requires posix_spawn")
+
+class TestLauncher:
+    @pytest.fixture
+    def launcher(self):
+        return Launcher(Environment())
+
+    def test_spawn_with_pipes(self, launcher):
+        process = launcher.spawn(['sh', '-c', 'echo out; echo err >&2; exit 3'],
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        assert isinstance(process, SpawnedProcess)
+        assert process.stdout.read() == b"out\n"
+        assert process.stderr.read() == b"err\n"
+        assert process.wait() == 3
+        process.stdout.close()
+        process.stderr.close()
+
+    def test_environment_block_follows_export(self, launcher):
+        launcher.environment.export('LAUNCHER_TEST_VAR', 'first')
+        first = Environment.block()
+        assert Environment.block() is first
+        # Exported already, so assigning passes the new value on
+        launcher.environment.set('LAUNCHER_TEST_VAR', 'second')
+        process = launcher.spawn(['sh', '-c', 'printf %s "$LAUNCHER_TEST_VAR"'], stdout=subprocess.PIPE)
+        assert process.stdout.read() == b"second"
+        process.wait()
+        process.stdout.close()
+        launcher.environment.unset('LAUNCHER_TEST_VAR')
+        assert b'LAUNCHER_TEST_VAR' not in Environment.block()
+
+    def test_sigpipe_is_restored(self, launcher):
+        # Python ignores SIGPIPE; the child must not inherit that
+        read_fd, write_fd = os.pipe()
+        os.close(read_fd)
+        try:
+            process = launcher.spawn(['sh', '-c', 'while :; do echo y; done'], stdout=write_fd)
+            assert process.wait(timeout=10) == -signal.SIGPIPE
+        finally:
+            os.close(write_fd)
+
+    def test_process_group_and_kill(self, launcher):
+        process = launcher.spawn(['sleep', '10'], process_group=0)
+        assert os.getpgid(process.pid) == process.pid
+        assert process.poll() is None
+        process.kill()
+        assert process.wait() == -signal.SIGKILL
+
+    def test_missing_executable(self, launcher):
+        with pytest.raises(OSError):
+            launcher.spawn(['/nonexistent/command'])
+
+    def test_popen_fallback(self, launcher):
+        process = launcher.spawn(['cat'], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        assert isinstance(process, subprocess.Popen)
+        assert process.communicate(b"hi")[0] == b"hi"
+
+    def test_status_of_child_reaped_elsewhere_is_unknown(self, launcher):
+        process = launcher.spawn(['sh', '-c', 'exit 5'])
+        os.waitpid(process.pid, 0)
+        assert process.wait(timeout=10) is None
+        assert process.finished and process.poll() is None
+
+    def test_usage_is_kept(self, launcher):
+        process = launcher.spawn(['sh', '-c', 'exit 2'])
+        assert process.wait() == 2
+        assert process.usage is not None or not hasattr(os, 'wait4')
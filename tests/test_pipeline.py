@@ -0,0 +1,127 @@
+import io
+import os
+import sys
+import pytest
+from src.core.pipeline import BuiltinStage, Pipeline
+
+pytestmark = pytest.mark.skipif(os.name == 'nt', reason="requires POSIX utilities")
+
+class TestPipeline:
+    def test_streams_last_stage_output(self, capsys):
+        pipeline = Pipeline([
+            ('printf', ['printf', 'b\\na\\n']),
+            ('sort', ['sort']),
+        ])
+        pipeline.start()
+        assert pipeline.wait() == True
+        assert capsys.readouterr().out == "a\nb\n"
+
+    def test_large_stderr_does_not_deadlock(self, capsys):
+        # Far more stderr than a pipe buffer holds, from an early stage
+        script = "import sys; sys.stderr.write('x' * 1000000 + '\\n'); print('done')"
+        pipeline = Pipeline([
+            ('python', [sys.executable, '-c', script]),
+            ('cat', ['cat']),
+        ])
+        pipeline.start()
+        assert pipeline.wait() == True
+        captured = capsys.readouterr()
+        assert "Error in python: " in captured.err
+        assert captured.out == "done\n"
+
+    def test_stderr_does_not_decide_success(self, capsys):
+        pipeline = Pipeline([('sh', ['sh', '-c', 'echo warn >&2; echo out'])])
+        pipeline.start()
+        assert pipeline.wait() == True
+        captured = capsys.readouterr()
+        assert captured.out == "out\n"
+        assert captured.err == "warn\n"
+
+    def test_output_to_file(self, tmp_path):
+        target = tmp_path / "out.txt"
+        with open(target, 'wb') as f:
+            pipeline = Pipeline([('echo', ['echo', 'hello'])], stdout=f)
+            pipeline.start()
+            assert pipeline.wait() == True
+        assert target.read_text() == "hello\n"
+
+    def test_binary_output_is_not_decoded(self, tmp_path):
+        source = tmp_path / "blob.bin"
+        data = bytes(range(256)) * 1024
+        source.write_bytes(data)
+        target = tmp_path / "copy.bin"
+        with open(target, 'wb') as f:
+            pipeline = Pipeline([('cat', ['cat', str(source)]), ('cat', ['cat'])], stdout=f)
+            pipeline.start()
+            assert pipeline.wait() == True
+        assert target.read_bytes() == data
+
+    def test_text_stream_without_buffer(self, monkeypatch):
+        # The GUI captures output in a StringIO, which has no byte buffer
+        stream = io.StringIO()
+        monkeypatch.setattr(sys, 'stdout', stream)
+        pipeline = Pipeline([('printf', ['printf', 'caf\\303\\251\\n'])])
+        pipeline.start()
+        assert pipeline.wait() == True
+        assert stream.getvalue() == "café\n"
+
+class TestBuiltinStages:
+    @staticmethod
+    def producer(*lines):
+        def run(write):
+            for line in lines:
+                write(line + '\n')
+            return True, ""
+        return run
+
+    def test_builtin_feeds_external_stage(self, capsys):
+        pipeline = Pipeline([
+            ('gen', BuiltinStage(['gen'], self.producer('b', 'a'))),
+            ('sort', ['sort']),
+        ])
+        pipeline.start()
+        assert pipeline.wait() == True
+        assert capsys.readouterr().out == "a\nb\n"
+
+    def test_builtin_as_last_stage(self, tmp_path):
+        target = tmp_path / "out.txt"
+        with open(target, 'wb') as f:
+            pipeline = Pipeline([
+                ('printf', ['printf', 'ignored\\n']),
+                ('gen', BuiltinStage(['gen'], self.producer('café'))),
+            ], stdout=f)
+            pipeline.start()
+            assert pipeline.wait() == True
+        assert target.read_text(encoding='utf-8') == "café\n"
+
+    def test_builtin_error_is_reported(self, capsys):
+        pipeline = Pipeline([
+            ('fail', BuiltinStage(['fail'], lambda write: (False, "no such thing"))),
+            ('cat', ['cat']),
+        ])
+        pipeline.start()
+        # As in other shells, the last stage decides the status
+        assert pipeline.wait() == True
+        assert "Error in fail: no such thing" in capsys.readouterr().err
+
+    def test_failing_last_stage(self, capsys):
+        pipeline = Pipeline([
+            ('cat', ['cat', '/nonexistent/file']),
+        ])
+        pipeline.start()
+        assert pipeline.wait() == False
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert "/nonexistent/file" in captured.err
+
+    def test_closed_reader_stops_builtin(self, capsys):
+        def endless(write):
+            while True:
+                write('y\n')
+        pipeline = Pipeline([
+            ('yes', BuiltinStage(['yes'], endless)),
+            ('head', ['head', '-n', '2']),
+        ])
+        pipeline.start()
+        assert pipeline.wait() == True
+        assert capsys.readouterr().out == "y\ny\n"
@@ -1,11 +1,15 @@
-import pytest
+import io
 import os
+import sys
+import pytest
 from src.core.shell import Shell
 
 class TestRedirection:
     @pytest.fixture
-    def shell(self):
+    def shell(self, tmp_path, monkeypatch):
         """Create a shell instance for testing"""
+        monkeypatch.setattr(Shell, 'RC_FILE', str(tmp_path / '.myshellrc'))
+        monkeypatch.setattr(Shell, 'HISTORY_FILE', str(tmp_path / '.myshell_history'))
         shell = Shell()
         yield shell
         # Cleanup any running processes
@@ -34,4 +38,108 @@ class TestRedirection:
         input_file.write_text("test data")
         shell.execute_command(f"cat < {str(input_file)} > {str(output_file)}")
         assert output_file.exists()
-        assert output_file.read_text().strip() == "test data"
\ No newline at end of file
+        assert output_file.read_text().strip() == "test data"
+def _open_fds():
+    return len(os.listdir('/proc/self/fd'))
+
+class TestRedirectionEngine:
+    @pytest.fixture
+    def shell(self, tmp_path):
+        old = os.getcwd()
+        os.chdir(tmp_path)
+        yield Shell(interactive=False)
+        os.chdir(old)
+
+    @pytest.fixture
+    def external(self, shell):
+        for name in ('cat', 'sh'):
+            if not shell.executor.find_executable(name):
+                pytest.skip(f"needs {name}")
+
+    def test_append(self, shell, tmp_path):
+        shell.execute_command("echo one > out.txt")
+        shell.execute_command("echo two >> out.txt")
+        assert (tmp_path / "out.txt").read_text() == "one\ntwo\n"
+
+    def test_stderr_and_duplication(self, shell, external, tmp_path):
+        shell.execute_command("sh -c 'echo out; echo err >&2' > both.txt 2>&1")
+        assert (tmp_path / "both.txt").read_text() == "out\nerr\n"
+        shell.execute_command("sh -c 'echo out; echo err >&2' 2> err.txt > out.txt")
+        assert (tmp_path / "err.txt").read_text() == "err\n"
+        assert (tmp_path / "out.txt").read_text() == "out\n"
+        shell.execute_command("sh -c 'echo out; echo err >&2' &> all.txt")
+        assert (tmp_path / "all.txt").read_text() == "out\nerr\n"
+
+    def test_stderr_into_pipe(self, shell, external, capsys):
+        shell.execute_command("sh -c 'echo err >&2' 2>&1 | cat")
+        assert capsys.readouterr().out == "err\n"
+
+    def test_builtin_error_redirected(self, shell, tmp_path, capsys):
+        shell.execute_command("cd /nonexistent-dir 2> err.txt")
+        assert "nonexistent-dir" in (tmp_path / "err.txt").read_text()
+        assert capsys.readouterr().out == ""
+
+    def test_duplicating_stderr_without_descriptor(self, shell, external, monkeypatch, capsys):
+        # As under the GUI, where sys.stderr is an in-memory stream
+        err = io.StringIO()
+        monkeypatch.setattr(sys, 'stderr', err)
+        shell.execute_command("echo builtin >&2")
+        shell.execute_command("sh -c 'echo external' >&2")
+        shell.execute_command("sh -c 'echo piped' >&2 | cat")
+        shell.execute_command("echo stage >&2 | cat")
+        assert err.getvalue() == "builtin\nexternal\npiped\nstage\n"
+        assert capsys.readouterr().out == ""
+
+    def test_builtin_stage_errors_follow_redirection(self, shell, external, tmp_path, capsys):
+        shell.execute_command("ls /nonexistent-dir-xyz 2>&1 | cat")
+        shell.execute_command("ls /nonexistent-dir-xyz 2>/dev/null | cat")
+        shell.execute_command("ls /nonexistent-dir-xyz 2>err.txt | cat")
+        shell.execute_command("ls /nonexistent-dir-xyz 2>&1")
+        captured = capsys.readouterr()
+        assert captured.out.count("nonexistent-dir-xyz") == 2
+        assert captured.err == ""
+        assert "nonexistent-dir-xyz" in (tmp_path / "err.txt").read_text()
+
+    def test_here_string_and_document(self, shell, external, capsys):
+        shell.execute_command("REDIRECT_TEST_XYZ=value")
+        try:
+            shell.execute_command("cat <<< \"it is $REDIRECT_TEST_XYZ\"")
+            shell.run_lines(["cat <<EOF", "expanded $REDIRECT_TEST_XYZ", "EOF",
+                             "cat <<'EOF'", "literal $REDIRECT_TEST_XYZ", "EOF"])
+        finally:
+            shell.environment.unset('REDIRECT_TEST_XYZ')
+        assert capsys.readouterr().out == "it is value\nexpanded value\nliteral $REDIRECT_TEST_XYZ\n"
+
+    def test_large_here_document(self, shell, external, tmp_path):
+        body = ["x" * 99] * 2000  # larger than a pipe buffer
+        shell.run_lines(["cat > big.txt <<EOF"] + body + ["EOF"])
+        assert (tmp_path / "big.txt").read_text() == "\n".join(body) + "\n"
+
+    def test_missing_input_file(self, shell, capsys):
+        shell.execute_command("cat < missing.txt")
+        assert shell.last_status == 1
+        assert "missing.txt" in capsys.readouterr().err
+
+    def test_redirection_only_creates_file(self, shell, tmp_path):
+        shell.execute_command("> created.txt")
+        assert (tmp_path / "created.txt").exists()
+
+    def test_builtin_output_is_buffered(self, shell, tmp_path):
+        for i in range(3000):
+            (tmp_path / f"file{i:04d}").touch()
+        shell.execute_command("ls > listing.txt")
+        lines = (tmp_path / "listing.txt").read_text().split()
+        assert len(lines) == 3001 and "file2999" in lines
+
+    @pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason="needs /proc")
+    def test_descriptors_are_not_leaked(self, shell, external, capsys):
+        for _ in range(3):
+            shell.execute_command("cat <<< warmup > warm.txt 2>&1")
+        before = _open_fds()
+        for i in range(100):
+            shell.execute_command(f"echo {i} > a.txt 2> b.txt")
+            shell.execute_command("cat < a.txt >> c.txt 2>&1 | cat")
+            shell.execute_command("cat <<< here 3> d.txt")
+            shell.execute_command("cat < missing.txt")
+        capsys.readouterr()
+        assert _open_fds() <= before
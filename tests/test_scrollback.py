@@ -0,0 +1,63 @@
+import pytest
+from src.gui.scrollback import ScrollbackBuffer
+
+class TestScrollbackBuffer:
+    @pytest.fixture
+    def buffer(self):
+        return ScrollbackBuffer()
+
+    def test_lines(self, buffer):
+        buffer.append("one\ntw")
+        buffer.append("o\nthree")
+        assert len(buffer) == 3
+        assert buffer.lines(0, 3) == ["one", "two", "three"]
+        buffer.append("\n")
+        assert buffer.lines(2, 4) == ["three", ""]
+
+    def test_styles_split_into_spans(self, buffer):
+        buffer.append("$ ", '36')
+        buffer.append("ls\nfile")
+        buffer.append(" error\n", '31')
+        assert buffer.spans(0) == [("$ ", '36'), ("ls", None)]
+        assert buffer.spans(1) == [("file", None), (" error", '31')]
+        assert buffer.spans(2) == []
+
+    def test_max_lines_drops_oldest(self):
+        buffer = ScrollbackBuffer(max_lines=3)
+        for i in range(1, 11):
+            buffer.append(f"line {i}\n", 'red' if i % 2 else None)
+        assert buffer.lines(0, 3) == ["line 9", "line 10", ""]
+        assert buffer.line_number(0) == 9
+        assert buffer.spans(0) == [("line 9", 'red')]
+        assert buffer.size == len(b"line 9\nline 10\n")
+
+    def test_max_bytes_drops_oldest(self):
+        buffer = ScrollbackBuffer(max_bytes=20)
+        for i in range(100):
+            buffer.append(f"{i:04d}\n")
+        assert buffer.size <= 20
+        assert buffer.line(len(buffer) - 2) == "0099"
+
+    def test_compaction_keeps_lines(self):
+        buffer = ScrollbackBuffer(max_lines=10)
+        for i in range(20000):
+            buffer.append(f"{i}\n", str(i % 3))
+        assert buffer.lines(0, 3) == ["19991", "19992", "19993"]
+        assert buffer.spans(0) == [("19991", str(19991 % 3))]
+        assert buffer.line_number(0) == 19992
+
+    def test_unicode(self, buffer):
+        buffer.append("héllo\nwörld\n")
+        assert buffer.lines(0, 2) == ["héllo", "wörld"]
+        assert buffer.search("wö") == 1
+
+    def test_search(self, buffer):
+        buffer.append("".join(f"line {i}\n" for i in range(100)))
+        assert buffer.search("line 42") == 42
+        assert buffer.search("line 4", start=50) is None
+        assert buffer.search("line 4", backwards=True) == 49
+        assert buffer.search("line 4", start=45, backwards=True) == 44
+        assert buffer.search("LINE 7", ignore_case=True) == 7
+        assert buffer.search(r"line 9\d", regex=True) == 90
+        assert buffer.search_all("line 1") == [1] + list(range(10, 20))
+        assert buffer.search("missing") is None
@@ -4,7 +4,10 @@ from src.core.shell import Shell
 
 class TestShell:
     @pytest.fixture
-    def shell(self):
+    def shell(self, tmp_path, monkeypatch):
+        # Interactive, with its rc and history files kept out of $HOME
+        monkeypatch.setattr(Shell, 'RC_FILE', str(tmp_path / '.myshellrc'))
+        monkeypatch.setattr(Shell, 'HISTORY_FILE', str(tmp_path / '.myshell_history'))
         return Shell()
     
     def test_shell_initialization(self, shell):
@@ -47,7 +50,7 @@ class TestShell:
         """Test error handling for nonexistent commands in pipe"""
         shell.execute_command('echo test | nonexistentcmd')
         captured = capsys.readouterr()
-        assert "Command not found: nonexistentcmd" in captured.out
+        assert "Command not found: nonexistentcmd" in captured.err
         
     def test_pipe_background(self, shell):
         # Test piped command in background
@@ -70,9 +73,73 @@ class TestShell:
     def test_io_redirection_errors(self, shell, capsys):
         shell.execute_command("cat < nonexistent.txt")
         captured = capsys.readouterr()
-        assert "No such file" in captured.out
+        assert "No such file" in captured.err
 
     def test_pipe_chain_errors(self, shell, capsys):
         shell.execute_command("ls | | sort")
         captured = capsys.readouterr()
-        assert "Invalid pipe syntax" in captured.out
\ No newline at end of file
+        assert "Invalid pipe syntax" in captured.err
+
+    def test_builtins_in_pipeline_are_not_forked(self, shell, tmp_path, capsys, monkeypatch):
+        if os.name == 'nt':
+            pytest.skip("uses POSIX commands")
+        for name in ("apple", "banana", "cherry"):
+            (tmp_path / name).touch()
+        spawned = []
+        spawn = shell.launcher.spawn
+
+        def tracking_spawn(argv, *args, **kwargs):
+            spawned.append(argv[0])
+            return spawn(argv, *args, **kwargs)
+
+        monkeypatch.setattr(shell.launcher, 'spawn', tracking_spawn)
+        shell.execute_command(f"ls {tmp_path} | grep an")
+        assert capsys.readouterr().out == "banana\n"
+        assert len(spawned) == 1 and spawned[0].endswith('grep')
+        assert shell.last_status == 0
+
+    def test_ls_streams_to_file(self, shell, tmp_path):
+        (tmp_path / "a").touch()
+        (tmp_path / "b").touch()
+        target = tmp_path / "out.txt"
+        shell.execute_command(f"ls {tmp_path} > {target}")
+        # The shell creates the target before ls runs
+        assert target.read_text() == "a\nb\nout.txt\n"
+
+
+class TestBatchMode:
+    @pytest.fixture
+    def shell(self):
+        return Shell(interactive=False)
+
+    def test_no_prompt_setup(self, shell):
+        assert shell.prompt_generator is None
+
+    def test_run_string(self, shell, capsys):
+        status = shell.run_string("echo one; echo two")
+        assert status == 0
+        assert capsys.readouterr().out == "one\ntwo\n"
+
+    def test_run_script(self, shell, tmp_path, capsys):
+        script = tmp_path / "script.sh"
+        script.write_text("#!/usr/bin/env pyalx\n# comment\necho first\n\necho second\n")
+        assert shell.run_script(str(script)) == 0
+        assert capsys.readouterr().out == "first\nsecond\n"
+
+    def test_exit_stops_script(self, shell, capsys):
+        status = shell.run_string("echo before\nexit 3\necho after")
+        assert status == 3
+        assert capsys.readouterr().out == "before\n"
+
+    def test_exit_stops_rest_of_line(self, shell, capsys):
+        status = shell.run_string("echo a; exit 3; echo b\necho c")
+        assert status == 3
+        assert capsys.readouterr().out == "a\n"
+
+    def test_status_of_external_commands(self, shell, capsys, tmp_path):
+        shell.run_string('sh -c "exit 3"; echo $?\nsh -c "exit 4" || echo failed $?')
+        shell.run_string(f'sh -c "echo warn >&2; echo out" > {tmp_path / "f"} && echo rc=$?')
+        shell.run_string('sh -c \'kill -TERM $$\'; echo $?')
+        assert capsys.readouterr().out == "3\nfailed 4\nrc=0\n143\n"
+        shell.execute_command('no_such_command_xyz')
+        assert shell.last_status == 127
@@ -33,4 +33,96 @@ class TestShellFeatures:
     def test_config_loading(self, tmp_path):
         config_file = tmp_path / "test_config"
         config = ShellConfig(str(config_file))
-        assert isinstance(config.config, configparser.ConfigParser)
\ No newline at end of file
+        assert isinstance(config.config, configparser.ConfigParser)
+
+class TestAliasExpansion:
+    @pytest.fixture
+    def aliases(self):
+        return AliasManager()
+
+    def parse(self, aliases, line):
+        from src.core.command_parser import CommandParser
+
+        command_list = CommandParser(aliases=aliases).parse_line(line)
+        return [[command.argv for command in pipeline.commands] for pipeline, _ in command_list.items]
+
+    def test_expands_in_command_position(self, aliases):
+        aliases.add_alias('ll', 'ls -l')
+        assert self.parse(aliases, 'll /tmp | ll; echo ll && ll') == \
+            [[['ls', '-l', '/tmp'], ['ls', '-l']], [['echo', 'll']], [['ls', '-l']]]
+
+    def test_quoted_words_are_not_expanded(self, aliases):
+        aliases.add_alias('ll', 'ls -l')
+        assert self.parse(aliases, "'ll' \\ll") == [[['ll', 'll']]]
+
+    def test_recursive_and_cycles(self, aliases):
+        aliases.add_alias('ls', 'ls -F')
+        aliases.add_alias('ll', 'ls -l')
+        aliases.add_alias('a', 'b 1')
+        aliases.add_alias('b', 'a 2')
+        assert self.parse(aliases, 'll x') == [[['ls', '-F', '-l', 'x']]]
+        assert self.parse(aliases, 'a') == [[['a', '2', '1']]]
+
+    def test_trailing_blank_expands_next_word(self, aliases):
+        aliases.add_alias('sudo', 'sudo ')
+        aliases.add_alias('ll', 'ls -l')
+        assert self.parse(aliases, 'sudo ll') == [[['sudo', 'ls', '-l']]]
+
+    def test_body_with_operators(self, aliases):
+        aliases.add_alias('count', 'wc -l |')
+        assert self.parse(aliases, 'count cat') == [[['wc', '-l'], ['cat']]]
+
+    def test_cached_parses_follow_changes(self, aliases):
+        from src.core.command_parser import CommandParser
+
+        parser = CommandParser(aliases=aliases)
+        assert parser.parse_line('ll').items[0][0].commands[0].argv == ['ll']
+        aliases.add_alias('ll', 'ls -l')
+        assert parser.parse_line('ll').items[0][0].commands[0].argv == ['ls', '-l']
+        aliases.remove_alias('ll')
+        assert parser.parse_line('ll').items[0][0].commands[0].argv == ['ll']
+
+    def test_persisted_to_config(self, aliases, tmp_path):
+        config_file = str(tmp_path / 'rc')
+        aliases.load(ShellConfig(config_file))
+        aliases.add_alias('Gs', 'git status --short')
+        aliases.add_alias('pct', "printf '%d%%'")
+        assert aliases.save()
+
+        loaded = AliasManager()
+        loaded.load(ShellConfig(config_file))
+        assert loaded.aliases == {'Gs': 'git status --short', 'pct': "printf '%d%%'"}
+        assert self.parse(loaded, 'Gs') == [[['git', 'status', '--short']]]
+
+    def test_whitespace_survives_the_config(self, aliases, tmp_path):
+        config_file = str(tmp_path / 'rc')
+        aliases.load(ShellConfig(config_file))
+        bodies = {'sudo': 'sudo ', 'ql': '"quoted"', 'pad': '  ls  ', 'plain': 'ls -l'}
+        for name, body in bodies.items():
+            aliases.add_alias(name, body)
+        aliases.save()
+
+        loaded = AliasManager()
+        loaded.load(ShellConfig(config_file))
+        assert loaded.aliases == bodies
+        # The trailing blank still makes the next word eligible
+        assert self.parse(loaded, 'sudo plain') == [[['sudo', 'ls', '-l']]]
+
+    def test_shell_runs_aliases(self, capsys):
+        from src.core.shell import Shell
+
+        shell = Shell(interactive=False)
+        shell.execute_command('aliases -s greet echo hello')
+        capsys.readouterr()
+        shell.execute_command('greet world')
+        assert capsys.readouterr().out == "hello world\n"
+
+    def test_aliases_belong_to_one_shell(self, capsys):
+        from src.core.shell import Shell
+
+        first, second = Shell(interactive=False), Shell(interactive=False)
+        first.execute_command('aliases -s greet echo hello')
+        assert 'greet' not in second.alias_manager.aliases
+        capsys.readouterr()
+        second.execute_command('aliases')
+        assert capsys.readouterr().out == "No aliases defined\n"
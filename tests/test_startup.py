@@ -0,0 +1,53 @@
+import os
+import re
+import subprocess
+import sys
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Total import time allowed for `main.py -c true`, in milliseconds. Cold start
+# is measured at roughly 45 ms on a developer machine; the budget leaves room
+# for slow CI runners. Override with PYALX_STARTUP_BUDGET_MS.
+STARTUP_BUDGET_MS = float(os.environ.get('PYALX_STARTUP_BUDGET_MS', 250))
+
+# Modules that only the GUI or the interactive prompt need
+DEFERRED_MODULES = ['tkinter', 'ttkthemes', 'PIL', 'readline', 'socket']
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+def import_times(args):
+    """Run main.py under -X importtime; returns {module: (cumulative_us, depth)}"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', 'main.py'] + args,
+        cwd=PROJECT_ROOT,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            cumulative, indent, name = int(match.group(2)), match.group(3), match.group(4)
+            modules[name] = (cumulative, len(indent) // 2)
+    return modules
+
+@pytest.fixture(scope='module')
+def modules():
+    return import_times(['-c', 'true'])
+
+@pytest.mark.skipif(os.name == 'nt', reason="runs the POSIX 'true' command")
+class TestStartup:
+    def test_cli_does_not_import_deferred_modules(self, modules):
+        loaded = [name for name in modules
+                  if name.split('.')[0] in DEFERRED_MODULES]
+        assert loaded == []
+
+    def test_import_time_budget(self, modules):
+        total_ms = sum(cumulative for cumulative, depth in modules.values() if depth == 0) / 1000
+        assert total_ms < STARTUP_BUDGET_MS, (
+            f"cold start imports took {total_ms:.1f} ms (budget {STARTUP_BUDGET_MS:.0f} ms)"
+        )